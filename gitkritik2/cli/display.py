@@ -78,6 +78,17 @@ def render_review_result(final_state: ReviewState, side_by_side: bool = False, s
         console.print("[yellow]No summary review generated.[/yellow]")
 
 
+def render_streamed_comment(comment: Dict) -> None:
+    """Prints one comment as soon as an agent has streamed it; the full review is rendered at the end."""
+    agent = comment.get("agent") or "AI"
+    console.print(Text.assemble(
+        ("💬 ", "default"),
+        (f"[{agent.capitalize()}]", AGENT_PREFIX_STYLES.get(agent, DEFAULT_AGENT_STYLE)),
+        (f" {comment.get('file')}:{comment.get('line')} ", Style(dim=True)),
+        (comment.get("message", ""), COMMENT_MESSAGE_STYLE),
+    ))
+
+
 def _render_inline_comments(comments: List[Dict], diff_chunk_map: Dict[str, str], side_by_side: bool):
     """Renders inline comments, grouping by file."""
     if not comments:
@@ -1,11 +1,24 @@
 # cli/main.py
 import os
+import json
+import time
+import asyncio
 import subprocess
 import typer
 from typing import Optional
 from gitkritik2.core.models import ReviewState # Import for type hinting
-from gitkritik2.graph.build_graph import build_review_graph
-from gitkritik2.cli.display import render_review_result
+from gitkritik2.graph.build_graph import build_review_graph, build_collect_graph
+from gitkritik2.cli.display import render_review_result, render_streamed_comment
+from gitkritik2.core.config import load_config_file
+from gitkritik2.core.concurrency import resolve_max_concurrency
+from gitkritik2.core.telemetry import build_report
+from gitkritik2.core.providers import aclose_clients
+from gitkritik2.core.streaming import add_comment_listener, resolve_stream_comments
+from gitkritik2.core.batch import BATCH_COMPLETED, BATCH_FAILED, get_batch_client, load_job, delete_job
+from gitkritik2.core.checkpoint import (
+    resolve_checkpoint_path, review_thread_id, open_checkpointer, aopen_checkpointer,
+    run_checkpointed, arun_checkpointed,
+)
 # Removed config import, handled by init_state now
 # from gitkritik2.core.config import load_kritik_config
 from dotenv import load_dotenv
@@ -14,19 +27,90 @@ load_dotenv() # Load .env before accessing env vars
 
 app = typer.Typer()
 
+REPORT_FORMATS = ("json",)
+# `collect` exit code while the batch job is still running (EX_TEMPFAIL): try again later
+EXIT_BATCH_PENDING = 75
+
 # Keep inspect_git_state as before
 
-@app.command()
+def _check_report_format(report: Optional[str]) -> None:
+    if report and report.lower() not in REPORT_FORMATS:
+        typer.secho(f"Error: Unsupported --report format '{report}'. Use one of: {', '.join(REPORT_FORMATS)}.", fg=typer.colors.RED)
+        raise typer.Exit(code=2)
+
+def _configure_environment(ci: bool, dry_run: bool, inline: bool) -> bool:
+    """Sets the env vars the posting nodes check. Returns whether this is a CI run."""
+    is_ci_mode = ci or os.getenv("GITHUB_ACTIONS") == "true" or os.getenv("GITLAB_CI") == "true"
+    os.environ["GITKRITIK_CI_MODE"] = "true" if is_ci_mode else "false"
+
+    if dry_run:
+        os.environ["GITKRITIK_DRY_RUN"] = "true"
+        typer.secho("Dry run mode enabled: Comments will not be posted.", fg=typer.colors.YELLOW)
+
+    # Set env var for inline *posting* control based on --inline flag
+    # The post_inline node checks this env var
+    os.environ["GITKRITIK_INLINE"] = "true" if inline else "false"
+    return is_ci_mode
+
+def _show_results(final_state_dict, yaml_config: dict, report: Optional[str], report_file: Optional[str]) -> None:
+    """Renders the final review state locally (outside CI) and outputs the --report."""
+    # Ensure final state is a dict before creating the Pydantic model
+    if not isinstance(final_state_dict, dict):
+         typer.secho(f"Error: Graph did not return a dictionary state. Got: {type(final_state_dict)}", fg=typer.colors.RED)
+         raise typer.Exit(code=1)
+
+    try:
+        # Create the final state model for easier access and display
+        final_state = ReviewState(**final_state_dict)
+    except Exception as e:
+        typer.secho(f"Error creating final ReviewState model: {e}", fg=typer.colors.RED)
+        print("Final state dictionary received from graph:")
+        print(json.dumps(final_state_dict, indent=2)) # Print state for debugging
+        raise typer.Exit(code=1)
+
+    # --- Display Locally ---
+    if not final_state.is_ci_mode:
+        typer.echo("\n--- Review Results ---")
+        render_review_result(
+            final_state,
+            side_by_side=final_state.side_by_side_display,
+            show_inline=final_state.show_inline_locally # Use the specific flag
+        )
+    else:
+         typer.echo("CI mode: Skipping local display. Check PR/MR for comments.")
+
+    # --- Usage Report ---
+    if report:
+        report_json = json.dumps(build_report(final_state, yaml_config.get("prices")), indent=2)
+        if report_file:
+            with open(report_file, "w", encoding="utf-8") as f:
+                f.write(report_json + "\n")
+            typer.echo(f"Usage report written to {report_file}")
+        else:
+            typer.echo(report_json)
+
+@app.callback(invoke_without_command=True)
 def main(
+    ctx: typer.Context,
     unstaged: bool = typer.Option(False, "--unstaged", "-u", help="Review unstaged changes."),
     all_files: bool = typer.Option(False, "--all", "-a", help="Review all changes (staged + unstaged)."),
     ci: bool = typer.Option(False, "--ci", help="Run in CI mode (auto-detects if GITHUB_ACTIONS or GITLAB_CI is true)."),
     dry_run: bool = typer.Option(False, "--dry-run", help="Run review but skip posting comments to platform."),
     side_by_side: bool = typer.Option(False, "--side-by-side", "-s", help="Display side-by-side diff view locally."),
     inline: bool = typer.Option(False, "--inline", "-i", help="Enable posting inline comments (requires --ci usually) AND render inline locally."),
-    config: Optional[str] = typer.Option(None, "--config", "-c", help="Path to config file (e.g., .kritikrc.yaml) (optional).")
+    config: Optional[str] = typer.Option(None, "--config", "-c", help="Path to config file (e.g., .kritikrc.yaml) (optional)."),
+    use_async: bool = typer.Option(False, "--async", help="Run the asyncio-native graph (overlaps git I/O, LLM calls and platform posting)."),
+    resume: bool = typer.Option(False, "--resume", help="Continue an interrupted review of the same commit from its last checkpoint."),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Don't reuse or store LLM responses or per-file review results from earlier runs."),
+    report: Optional[str] = typer.Option(None, "--report", help="After the review, output per-agent and per-file LLM tokens, latency, cache hits and estimated cost. Format: json."),
+    report_file: Optional[str] = typer.Option(None, "--report-file", help="Write the --report output to this file instead of stdout."),
+    batch: bool = typer.Option(False, "--batch", help="Submit the review prompts as one provider batch job (cheaper, finishes within 24h); fetch and post the results later with `collect`.")
 ):
     """Runs AI code review on Git changes."""
+    if ctx.invoked_subcommand is not None:
+        return
+
+    _check_report_format(report)
 
     # --- Capture Target Directory ---
     target_repo_dir = os.getcwd()
@@ -34,16 +118,7 @@ def main(
     # --- End Capture ---
 
     # --- Environment Setup ---
-    is_ci_mode = ci or os.getenv("GITHUB_ACTIONS") == "true" or os.getenv("GITLAB_CI") == "true"
-    os.environ["GITKRITIK_CI_MODE"] = "true" if is_ci_mode else "false"
-
-    if dry_run:
-        os.environ["GITKRITIK_DRY_RUN"] = "true"
-        typer.secho("Dry run mode enabled: Comments will not be posted.", fg=typer.colors.YELLOW)
-
-    # Set env var for inline *posting* control based on --inline flag
-    # The post_inline node checks this env var
-    os.environ["GITKRITIK_INLINE"] = "true" if inline else "false"
+    is_ci_mode = _configure_environment(ci, dry_run, inline)
 
     if not is_ci_mode:
         # Only inspect git state if not in CI (CI runners often have detached HEADs)
@@ -66,6 +141,9 @@ def main(
         "dry_run": dry_run,
         "show_inline_locally": inline,
         "side_by_side_display": side_by_side,
+        "llm_cache": not no_cache,
+        "review_cache": not no_cache,
+        "batch": batch,
         # Initialize empty containers
         "changed_files": [],
         "file_contexts": {},
@@ -75,38 +153,53 @@ def main(
 
     # --- Build and Run Graph ---
     typer.echo("Building review graph...")
-    graph = build_review_graph().compile()
+    graph_builder = build_review_graph(use_async=use_async)
+
+    # Checkpoint every step so an interrupted run can continue with --resume
+    yaml_config = load_config_file(config)
+    checkpoint_path = resolve_checkpoint_path(yaml_config, target_repo_dir)
+    run_config = {
+        # Bounds how many per-file review_file tasks the graph runs at once
+        "max_concurrency": resolve_max_concurrency(yaml_config),
+        "configurable": {"thread_id": review_thread_id(target_repo_dir, unstaged, all_files)},
+    }
+    if batch:
+        # A submitted batch run ends before the review agents; keep it apart from live runs' checkpoints
+        run_config["configurable"]["thread_id"] += ":batch"
+    print(f"[CLI Main] Checkpoints: {checkpoint_path} (thread {run_config['configurable']['thread_id']})")
+
+    # Locally, show each comment as soon as an agent has streamed it instead of only after the run
+    if not is_ci_mode and not batch and resolve_stream_comments(yaml_config):
+        add_comment_listener(render_streamed_comment)
 
     typer.echo("Invoking review graph...")
     # LangSmith Integration: If env vars are set, tracing happens automatically here.
-    final_state_dict = graph.invoke(initial_state_dict)
+    if use_async:
+        async def _run_async():
+            async with aopen_checkpointer(checkpoint_path) as checkpointer:
+                graph = graph_builder.compile(checkpointer=checkpointer)
+                try:
+                    return await arun_checkpointed(graph, initial_state_dict, run_config, resume)
+                finally:
+                    await aclose_clients() # Pooled provider connections are bound to this loop
+        final_state_dict = asyncio.run(_run_async())
+    else:
+        with open_checkpointer(checkpoint_path) as checkpointer:
+            graph = graph_builder.compile(checkpointer=checkpointer)
+            final_state_dict = run_checkpointed(graph, initial_state_dict, run_config, resume)
     typer.echo("Review graph execution finished.")
 
-    # --- Process Final State ---
-    # Ensure final state is a dict before creating the Pydantic model
-    if not isinstance(final_state_dict, dict):
-         typer.secho(f"Error: Graph did not return a dictionary state. Got: {type(final_state_dict)}", fg=typer.colors.RED)
-         raise typer.Exit(code=1)
-
-    try:
-        # Create the final state model for easier access and display
-        final_state = ReviewState(**final_state_dict)
-    except Exception as e:
-        typer.secho(f"Error creating final ReviewState model: {e}", fg=typer.colors.RED)
-        print("Final state dictionary received from graph:")
-        import json; print(json.dumps(final_state_dict, indent=2)) # Print state for debugging
-        raise typer.Exit(code=1)
+    # --- Batch Mode: results come later ---
+    if batch:
+        job_id = final_state_dict.get("batch_job_id") if isinstance(final_state_dict, dict) else None
+        if not job_id:
+            typer.secho("Error: Batch job was not submitted, see the log above.", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        typer.echo(f"Batch job {job_id} submitted. Run `git kritik collect --job {job_id}` once it has completed.")
+        return
 
-    # --- Display Locally ---
-    if not final_state.is_ci_mode:
-        typer.echo("\n--- Review Results ---")
-        render_review_result(
-            final_state,
-            side_by_side=final_state.side_by_side_display,
-            show_inline=final_state.show_inline_locally # Use the specific flag
-        )
-    else:
-         typer.echo("CI mode: Skipping local display. Check PR/MR for comments.")
+    # --- Process Final State ---
+    _show_results(final_state_dict, yaml_config, report, report_file)
 
     # Optional: Add exit code based on findings?
     # num_bug_comments = len(final_state.agent_results.get("bug", AgentResult(agent_name="bug", comments=[])).comments)
@@ -114,5 +207,76 @@ def main(
     #     typer.secho(f"Found {num_bug_comments} potential bugs.", fg=typer.colors.RED)
     #     # raise typer.Exit(code=1) # Optionally fail CI build
 
+@app.command()
+def collect(
+    job: Optional[str] = typer.Option(None, "--job", "-j", help="Batch job ID (default: the most recently submitted job)."),
+    wait: bool = typer.Option(False, "--wait", "-w", help="Poll until the batch job has completed instead of exiting."),
+    poll_interval: float = typer.Option(60.0, "--poll-interval", help="Seconds between status checks with --wait."),
+    ci: bool = typer.Option(False, "--ci", help="Run in CI mode (auto-detects if GITHUB_ACTIONS or GITLAB_CI is true)."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Collect results but skip posting comments to platform."),
+    side_by_side: bool = typer.Option(False, "--side-by-side", "-s", help="Display side-by-side diff view locally."),
+    inline: bool = typer.Option(False, "--inline", "-i", help="Enable posting inline comments (requires --ci usually) AND render inline locally."),
+    config: Optional[str] = typer.Option(None, "--config", "-c", help="Path to config file (default: the one the batch review used)."),
+    use_async: bool = typer.Option(False, "--async", help="Post results with the asyncio-native nodes."),
+    report: Optional[str] = typer.Option(None, "--report", help="Output per-agent and per-file LLM tokens and estimated cost (batch discount applied). Format: json."),
+    report_file: Optional[str] = typer.Option(None, "--report-file", help="Write the --report output to this file instead of stdout.")
+):
+    """Fetches the results of a --batch review, then merges and posts them like a normal run."""
+    _check_report_format(report)
+    target_repo_dir = os.getcwd()
+    record = load_job(job, target_repo_dir)
+    if record is None:
+        typer.secho(f"Error: No submitted batch job{f' {job}' if job else 's'} found.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    job_id = record["job_id"]
+
+    # The state saved at submission time, with this run's flags and the API keys (never saved) from env
+    state = ReviewState(**record["state"])
+    state = state.model_copy(update={
+        "openai_api_key": os.getenv("OPENAI_API_KEY"),
+        "anthropic_api_key": os.getenv("ANTHROPIC_API_KEY"),
+        "gemini_api_key": os.getenv("GEMINI_API_KEY"),
+    })
+    try:
+        client = get_batch_client(state, target_repo_dir)
+        status = client.status(job_id)
+        while wait and status not in (BATCH_COMPLETED, BATCH_FAILED):
+            typer.echo(f"Batch job {job_id} is still running, checking again in {poll_interval:g}s...")
+            time.sleep(poll_interval)
+            status = client.status(job_id)
+    except ValueError as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    if status == BATCH_FAILED:
+        typer.secho(f"Error: Batch job {job_id} failed or expired. Submit the review again.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    if status != BATCH_COMPLETED:
+        typer.echo(f"Batch job {job_id} has not completed yet. Run collect again later, or with --wait.")
+        raise typer.Exit(code=EXIT_BATCH_PENDING)
+
+    is_ci_mode = _configure_environment(ci, dry_run, inline)
+    initial_state_dict = {
+        **state.model_dump(), "target_repo_dir": target_repo_dir, "batch_job_id": job_id,
+        "is_ci_mode": is_ci_mode, "dry_run": dry_run,
+        "show_inline_locally": inline, "side_by_side_display": side_by_side,
+    }
+    yaml_config = load_config_file(config or state.config_file_path)
+
+    typer.echo(f"Collecting batch job {job_id}...")
+    graph = build_collect_graph(use_async=use_async).compile()
+    if use_async:
+        async def _run_async():
+            try:
+                return await graph.ainvoke(initial_state_dict)
+            finally:
+                await aclose_clients()
+        final_state_dict = asyncio.run(_run_async())
+    else:
+        final_state_dict = graph.invoke(initial_state_dict)
+    delete_job(job_id, target_repo_dir)
+    typer.echo("Review graph execution finished.")
+
+    _show_results(final_state_dict, yaml_config, report, report_file)
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
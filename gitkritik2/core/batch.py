@@ -0,0 +1,283 @@
+# core/batch.py
+import os
+import re
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from gitkritik2.core.models import ReviewState
+from gitkritik2.core.providers import EPHEMERAL_CACHE, anthropic_client, openai_client, pool_size
+from gitkritik2.core.utils import git_dir_file
+
+BATCH_DIRNAME = "kritik-batches"
+# Normalized job states; each backend maps its own onto these
+BATCH_IN_PROGRESS = "in_progress"
+BATCH_COMPLETED = "completed"
+BATCH_FAILED = "failed"
+
+_OPENAI_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class BatchRequest(NamedTuple):
+    custom_id: str # [A-Za-z0-9_-], at most 64 characters (Anthropic's limit)
+    messages: List[BaseMessage]
+
+
+class BatchResult(NamedTuple):
+    text: Optional[str]
+    error: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+
+class BatchClient(ABC):
+    """
+    Provider batch API: submit all requests as one job, check on it later, fetch its results.
+    Batch jobs finish within a day at roughly half the interactive price.
+    """
+    backend: str
+
+    @abstractmethod
+    def submit(self, requests: List[BatchRequest], model: str, temperature: float, max_tokens: int) -> str:
+        """Submits the requests and returns the provider's job ID."""
+
+    @abstractmethod
+    def status(self, job_id: str) -> str:
+        """BATCH_IN_PROGRESS, BATCH_COMPLETED or BATCH_FAILED."""
+
+    @abstractmethod
+    def results(self, job_id: str) -> Dict[str, BatchResult]:
+        """Results of a completed job by custom_id. Requests that failed have `error` set."""
+
+
+class OpenAIBatchClient(BatchClient):
+    """OpenAI Batch API: requests are uploaded as a JSONL file of /v1/chat/completions calls."""
+    backend = "openai"
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def submit(self, requests: List[BatchRequest], model: str, temperature: float, max_tokens: int) -> str:
+        lines = [json.dumps({
+            "custom_id": request.custom_id, "method": "POST", "url": "/v1/chat/completions",
+            "body": {
+                "model": model, "temperature": temperature, "max_tokens": max_tokens,
+                "messages": [{"role": _OPENAI_ROLES.get(m.type, "user"), "content": m.content} for m in request.messages],
+            },
+        }) for request in requests]
+        input_file = self.client.files.create(file=("kritik-batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+        batch = self.client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+        return batch.id
+
+    def status(self, job_id: str) -> str:
+        status = self.client.batches.retrieve(job_id).status
+        if status == "completed":
+            return BATCH_COMPLETED
+        if status in ("failed", "expired", "cancelled"):
+            return BATCH_FAILED
+        return BATCH_IN_PROGRESS
+
+    def results(self, job_id: str) -> Dict[str, BatchResult]:
+        batch = self.client.batches.retrieve(job_id)
+        results: Dict[str, BatchResult] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                body = response.get("body") or {}
+                if entry.get("error") or response.get("status_code") != 200:
+                    error = entry.get("error") or body.get("error") or f"status {response.get('status_code')}"
+                    results[entry["custom_id"]] = BatchResult(None, error=str(error))
+                    continue
+                usage = body.get("usage") or {}
+                results[entry["custom_id"]] = BatchResult(
+                    body["choices"][0]["message"]["content"],
+                    prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+                    cache_read_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+                )
+        return results
+
+
+class AnthropicBatchClient(BatchClient):
+    """Anthropic Message Batches API."""
+    backend = "anthropic"
+
+    def __init__(self, client: Any, cache_system_prompt: bool = True):
+        self.client = client
+        self.cache_system_prompt = cache_system_prompt
+
+    def _params(self, request: BatchRequest, model: str, temperature: float, max_tokens: int) -> dict:
+        params = {
+            "model": model, "temperature": temperature, "max_tokens": max_tokens,
+            "messages": [{"role": "assistant" if m.type == "ai" else "user", "content": m.content}
+                         for m in request.messages if m.type != "system"],
+        }
+        system = "\n\n".join(str(m.content) for m in request.messages if m.type == "system")
+        if system:
+            # Same breakpoint as PooledChatAnthropic: requests for one file share the system prompt
+            block = {"type": "text", "text": system}
+            params["system"] = [{**block, "cache_control": EPHEMERAL_CACHE} if self.cache_system_prompt else block]
+        return params
+
+    def submit(self, requests: List[BatchRequest], model: str, temperature: float, max_tokens: int) -> str:
+        batch = self.client.messages.batches.create(requests=[
+            {"custom_id": request.custom_id, "params": self._params(request, model, temperature, max_tokens)}
+            for request in requests
+        ])
+        return batch.id
+
+    def status(self, job_id: str) -> str:
+        # Individual requests can still fail in an ended batch; results() reports those
+        return BATCH_COMPLETED if self.client.messages.batches.retrieve(job_id).processing_status == "ended" else BATCH_IN_PROGRESS
+
+    def results(self, job_id: str) -> Dict[str, BatchResult]:
+        results: Dict[str, BatchResult] = {}
+        for entry in self.client.messages.batches.results(job_id):
+            result = entry.result
+            if result.type != "succeeded":
+                error = getattr(result, "error", None)
+                results[entry.custom_id] = BatchResult(None, error=str(error) if error else result.type)
+                continue
+            message = result.message
+            text = "".join(block.text for block in message.content if getattr(block, "type", None) == "text")
+            usage = message.usage
+            # input_tokens only counts the uncached part of the prompt
+            cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+            cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+            results[entry.custom_id] = BatchResult(
+                text, prompt_tokens=usage.input_tokens + cache_read + cache_write, completion_tokens=usage.output_tokens,
+                cache_read_tokens=cache_read, cache_write_tokens=cache_write)
+        return results
+
+
+class LocalBatchClient(BatchClient):
+    """
+    File-based stand-in for a provider batch API, for testing and offline runs.
+    submit() writes <job>.requests.jsonl; the job is complete once <job>.results.jsonl
+    exists with one {"custom_id", "text" | "error", "usage"} line per request.
+    With a `responder`, submit() answers every request right away.
+    """
+    backend = "local"
+
+    def __init__(self, directory: str, responder: Optional[Callable[[BatchRequest], str]] = None):
+        self.directory = directory
+        self.responder = responder
+
+    def _path(self, job_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.{kind}.jsonl")
+
+    def submit(self, requests: List[BatchRequest], model: str, temperature: float, max_tokens: int) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        job_id = f"local_{uuid.uuid4().hex[:12]}"
+        with open(self._path(job_id, "requests"), "w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps({
+                    "custom_id": request.custom_id, "model": model, "temperature": temperature, "max_tokens": max_tokens,
+                    "messages": [message_to_dict(m) for m in request.messages],
+                }) + "\n")
+        if self.responder:
+            self.complete(job_id, self.responder)
+        return job_id
+
+    def requests(self, job_id: str) -> List[BatchRequest]:
+        with open(self._path(job_id, "requests"), encoding="utf-8") as f:
+            return [BatchRequest(entry["custom_id"], messages_from_dict(entry["messages"]))
+                    for entry in map(json.loads, filter(str.strip, f))]
+
+    def complete(self, job_id: str, responder: Callable[[BatchRequest], str]) -> None:
+        """Answers every request of a submitted job with `responder` and writes the results file."""
+        lines = []
+        for request in self.requests(job_id):
+            try:
+                lines.append({"custom_id": request.custom_id, "text": responder(request)})
+            except Exception as e:
+                lines.append({"custom_id": request.custom_id, "error": f"{type(e).__name__}: {e}"})
+        with open(self._path(job_id, "results"), "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(line) + "\n" for line in lines))
+
+    def status(self, job_id: str) -> str:
+        return BATCH_COMPLETED if os.path.exists(self._path(job_id, "results")) else BATCH_IN_PROGRESS
+
+    def results(self, job_id: str) -> Dict[str, BatchResult]:
+        results: Dict[str, BatchResult] = {}
+        with open(self._path(job_id, "results"), encoding="utf-8") as f:
+            for entry in map(json.loads, filter(str.strip, f)):
+                usage = entry.get("usage") or {}
+                results[entry["custom_id"]] = BatchResult(
+                    entry.get("text"), error=entry.get("error"),
+                    prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+                )
+        return results
+
+
+def batch_dir(cwd: str) -> str:
+    """Where batch job records (and the local backend's files) are kept: inside .git, never committed."""
+    return git_dir_file(BATCH_DIRNAME, cwd)
+
+
+def get_batch_client(_state: ReviewState, cwd: str) -> BatchClient:
+    """Batch client for batch_backend (default: the review's llm_provider). Raises ValueError if unsupported."""
+    backend = _state.batch_backend or _state.llm_provider
+    if backend == "openai":
+        api_key = _state.openai_api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key: raise ValueError("OPENAI_API_KEY is missing.")
+        return OpenAIBatchClient(openai_client(api_key, _state.base_url, pool_size(_state, "openai")))
+    if backend == "anthropic":
+        api_key = _state.anthropic_api_key or os.getenv("ANTHROPIC_API_KEY")
+        if not api_key: raise ValueError("ANTHROPIC_API_KEY is missing.")
+        return AnthropicBatchClient(anthropic_client(api_key, _state.base_url, pool_size(_state, "anthropic")),
+                                    cache_system_prompt=_state.prompt_caching)
+    if backend == "local":
+        return LocalBatchClient(os.path.join(batch_dir(cwd), "local"))
+    raise ValueError(f"No batch API for '{backend}'. Set batch_backend to openai, anthropic or local.")
+
+
+# --- Job records ---
+
+def _record_path(job_id: str, cwd: str) -> str:
+    return os.path.join(batch_dir(cwd), re.sub(r"[^A-Za-z0-9_.-]", "_", job_id) + ".json")
+
+
+def save_job(record: dict, cwd: str) -> str:
+    """
+    Persists a submitted job: its ID, backend, what each custom_id is for, and the review
+    state needed to continue after collecting (API keys are excluded). Returns the path.
+    """
+    path = _record_path(record["job_id"], cwd)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**record, "submitted_at": time.time()}, f)
+    return path
+
+
+def load_job(job_id: Optional[str], cwd: str) -> Optional[dict]:
+    """The record for `job_id`, or the most recently submitted job when None."""
+    if job_id:
+        path = _record_path(job_id, cwd)
+        if not os.path.exists(path):
+            return None
+    else:
+        directory = batch_dir(cwd)
+        records = [os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.endswith(".json")] if os.path.isdir(directory) else []
+        if not records:
+            return None
+        path = max(records, key=os.path.getmtime)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def delete_job(job_id: str, cwd: str) -> None:
+    path = _record_path(job_id, cwd)
+    if os.path.exists(path):
+        os.remove(path)
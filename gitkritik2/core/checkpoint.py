@@ -0,0 +1,208 @@
+# core/checkpoint.py
+import os
+import hashlib
+import zlib
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, AsyncIterator, Iterator, Sequence, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.constants import Send
+
+from gitkritik2.core.utils import run_subprocess_command, git_dir_file
+
+CHECKPOINT_FILENAME = "kritik-checkpoints.sqlite"
+# Graph channels never written to the checkpoint file; get_llm falls back to the env on resume
+SECRET_CHANNELS = ("openai_api_key", "anthropic_api_key", "gemini_api_key")
+# Only compress payloads where zlib actually pays off
+MIN_COMPRESS_BYTES = 512
+COMPRESSED_SUFFIX = "+zlib"
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Wraps LangGraph's JsonPlusSerializer and zlib-compresses large payloads.
+    Checkpoints carry full file contents and diffs in file_contexts, which compress well.
+    """
+
+    def __init__(self, level: int = 6):
+        self._inner = JsonPlusSerializer()
+        self._level = level
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self._inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self._inner.dumps_typed(obj)
+        if len(data) < MIN_COMPRESS_BYTES:
+            return type_, data
+        return type_ + COMPRESSED_SUFFIX, zlib.compress(data, self._level)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(COMPRESSED_SUFFIX):
+            return self._inner.loads_typed((type_[:-len(COMPRESSED_SUFFIX)], zlib.decompress(payload)))
+        return self._inner.loads_typed((type_, payload))
+
+
+def _without_secrets(values: dict) -> dict:
+    return {k: v for k, v in values.items() if k not in SECRET_CHANNELS}
+
+
+def _redact_value(value: Any) -> Any:
+    # Send packets (per-file pipeline) carry a copy of the whole state
+    if isinstance(value, Send) and isinstance(value.arg, dict):
+        return Send(value.node, _without_secrets(value.arg))
+    return value
+
+
+def _redact_checkpoint(checkpoint: dict) -> dict:
+    return {
+        **checkpoint,
+        "channel_values": _without_secrets(checkpoint.get("channel_values") or {}),
+        "pending_sends": [_redact_value(send) for send in checkpoint.get("pending_sends") or []],
+    }
+
+
+def _redact_update(update: Any) -> Any:
+    # A node's state update (or the run input), as recorded in the checkpoint metadata
+    if isinstance(update, dict):
+        return {k: _redact_value(v) for k, v in _without_secrets(update).items()}
+    if isinstance(update, (list, tuple)):
+        return [_redact_update(item) for item in update]
+    return _redact_value(update)
+
+
+def _redact_metadata(metadata: dict) -> dict:
+    # LangGraph copies each step's writes, including init_state's API keys, into the metadata
+    writes = metadata.get("writes")
+    if not isinstance(writes, dict):
+        return metadata
+    return {**metadata, "writes": {node: _redact_update(update) for node, update in writes.items()}}
+
+
+def _redact_writes(writes: Sequence[Tuple[str, Any]]) -> list:
+    return [(channel, _redact_value(value)) for channel, value in writes if channel not in SECRET_CHANNELS]
+
+
+class ReviewCheckpointSaver(SqliteSaver):
+    """SqliteSaver that compresses snapshots and never persists API keys."""
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return super().put(config, _redact_checkpoint(checkpoint), _redact_metadata(metadata), new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path: str = ""):
+        return super().put_writes(config, _redact_writes(writes), task_id, task_path)
+
+
+class AsyncReviewCheckpointSaver(AsyncSqliteSaver):
+    """Async counterpart of ReviewCheckpointSaver (its sync put/put_writes delegate to these)."""
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await super().aput(config, _redact_checkpoint(checkpoint), _redact_metadata(metadata), new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = ""):
+        return await super().aput_writes(config, _redact_writes(writes), task_id, task_path)
+
+
+def resolve_checkpoint_path(yaml_config: dict, cwd: str) -> str:
+    """
+    Env (GITKRITIK_CHECKPOINT_PATH) > YAML (checkpoint_path) > <git dir>/kritik-checkpoints.sqlite.
+    The default lives inside .git so it is never committed; CI runners that don't keep the
+    checkout between attempts should point this at a cached path instead.
+    """
+    configured = os.getenv("GITKRITIK_CHECKPOINT_PATH") or yaml_config.get("checkpoint_path")
+    return configured or git_dir_file(CHECKPOINT_FILENAME, cwd)
+
+
+# Uncommitted changes each review scope covers; they don't move HEAD, so they're hashed into the thread
+SCOPE_DIFF_COMMANDS = {
+    "staged": ["git", "diff", "--cached"],
+    "unstaged": ["git", "diff"],
+    "all": ["git", "diff", "HEAD"],
+}
+
+
+def review_thread_id(cwd: str, review_unstaged: bool = False, review_all_files: bool = False) -> str:
+    """
+    Checkpoint thread for this review: repo + head SHA + which changes are reviewed + a hash
+    of the uncommitted diff in that scope. A rerun of the same job maps to the same thread;
+    a new commit or an edit to the reviewed working tree/index starts a new one.
+    """
+    remote_url, _ = run_subprocess_command(["git", "remote", "get-url", "origin"], cwd=cwd)
+    if not remote_url:
+        remote_url, _ = run_subprocess_command(["git", "rev-parse", "--show-toplevel"], cwd=cwd)
+    head_sha, _ = run_subprocess_command(["git", "rev-parse", "HEAD"], cwd=cwd)
+    scope = "all" if review_all_files else "unstaged" if review_unstaged else "staged"
+    diff, _ = run_subprocess_command(SCOPE_DIFF_COMMANDS[scope], cwd=cwd)
+    repo_key = hashlib.sha256((remote_url or cwd).encode("utf-8")).hexdigest()[:16]
+    diff_key = hashlib.sha256((diff or "").encode("utf-8")).hexdigest()[:16]
+    return f"{repo_key}:{head_sha or 'no-head'}:{scope}:{diff_key}"
+
+
+def _prepare_checkpoint_dir(path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+
+@contextmanager
+def open_checkpointer(path: str) -> Iterator[ReviewCheckpointSaver]:
+    """Opens the SQLite checkpoint file for graph.compile(checkpointer=...)."""
+    _prepare_checkpoint_dir(path)
+    with ReviewCheckpointSaver.from_conn_string(path) as saver:
+        saver.serde = CompressedSerializer()
+        yield saver
+
+
+@asynccontextmanager
+async def aopen_checkpointer(path: str) -> AsyncIterator[AsyncReviewCheckpointSaver]:
+    """Async counterpart of open_checkpointer, for graphs run with ainvoke."""
+    _prepare_checkpoint_dir(path)
+    async with AsyncReviewCheckpointSaver.from_conn_string(path) as saver:
+        saver.serde = CompressedSerializer()
+        yield saver
+
+
+def run_checkpointed(graph, initial_state: dict, config: dict, resume: bool = False) -> Any:
+    """
+    Runs a graph compiled with a checkpointer on config's thread.
+    With resume=True an interrupted run continues from its last checkpoint: finished nodes
+    are skipped, and per-file tasks that completed in the interrupted step keep their
+    saved results. Without it (or with nothing to resume) the thread starts over.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    snapshot = graph.get_state(config)
+    if resume and snapshot.values:
+        if snapshot.next:
+            print(f"[checkpoint] Resuming review {thread_id} at: {', '.join(snapshot.next)}")
+            return graph.invoke(None, config)
+        print(f"[checkpoint] Review {thread_id} already completed, reusing its results.")
+        return snapshot.values
+    if resume:
+        print(f"[checkpoint] No checkpoint found for {thread_id}, starting a new review.")
+    if snapshot.values:
+        # Stale channels from an earlier run would merge into the reducers, start clean
+        graph.checkpointer.delete_thread(thread_id)
+    return graph.invoke(initial_state, config)
+
+
+async def arun_checkpointed(graph, initial_state: dict, config: dict, resume: bool = False) -> Any:
+    """Async counterpart of run_checkpointed."""
+    thread_id = config["configurable"]["thread_id"]
+    snapshot = await graph.aget_state(config)
+    if resume and snapshot.values:
+        if snapshot.next:
+            print(f"[checkpoint] Resuming review {thread_id} at: {', '.join(snapshot.next)}")
+            return await graph.ainvoke(None, config)
+        print(f"[checkpoint] Review {thread_id} already completed, reusing its results.")
+        return snapshot.values
+    if resume:
+        print(f"[checkpoint] No checkpoint found for {thread_id}, starting a new review.")
+    if snapshot.values:
+        await graph.checkpointer.adelete_thread(thread_id)
+    return await graph.ainvoke(initial_state, config)
@@ -0,0 +1,71 @@
+# core/concurrency.py
+import os
+from typing import Any, Dict, List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def resolve_max_concurrency(yaml_config: dict) -> int:
+    """Env (GITKRITIK_MAX_CONCURRENCY) > YAML (max_concurrency) > default. Invalid values fall back to the default."""
+    try:
+        value = int(os.getenv("GITKRITIK_MAX_CONCURRENCY") or yaml_config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+        if value < 1:
+            raise ValueError
+        return value
+    except (TypeError, ValueError):
+        print(f"[WARN] Invalid max_concurrency value, using default {DEFAULT_MAX_CONCURRENCY}")
+        return DEFAULT_MAX_CONCURRENCY
+
+
+def largest_diff_first(inputs: Dict[str, dict]) -> List[str]:
+    """
+    Returns the filenames of a per-file input mapping ordered by diff size, largest first.
+    The biggest files are the slowest LLM calls, so starting them first shortens the tail.
+    Ties keep their original order (sorted() is stable).
+    """
+    return sorted(inputs, key=lambda filename: len(inputs[filename].get("diff") or ""), reverse=True)
+
+
+def _per_file_configs(files: List[str], config: Optional[RunnableConfig], max_concurrency: int) -> List[RunnableConfig]:
+    # Each call is tagged with its file so telemetry can attribute it
+    base = config or {}
+    return [
+        {**base, "max_concurrency": max(1, max_concurrency), "metadata": {**(base.get("metadata") or {}), "file": filename}}
+        for filename in files
+    ]
+
+
+def run_chain_per_file(chain: Runnable, inputs: Dict[str, dict], max_concurrency: int,
+                       config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """
+    Runs `chain` once per file with at most `max_concurrency` calls in flight.
+    Returns a mapping filename -> chain output, or the raised Exception for that file,
+    so one failing file doesn't discard the others. Callers iterate their own file order
+    over the result to keep comment order deterministic. `config` (callbacks, metadata)
+    applies to every call, with the filename added to its metadata.
+    """
+    if not inputs:
+        return {}
+    ordered_files = largest_diff_first(inputs)
+    outputs = chain.batch(
+        [inputs[filename] for filename in ordered_files],
+        config=_per_file_configs(ordered_files, config, max_concurrency),
+        return_exceptions=True,
+    )
+    return dict(zip(ordered_files, outputs))
+
+
+async def arun_chain_per_file(chain: Runnable, inputs: Dict[str, dict], max_concurrency: int,
+                              config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """Async counterpart of run_chain_per_file, using Runnable.abatch (ainvoke under a semaphore)."""
+    if not inputs:
+        return {}
+    ordered_files = largest_diff_first(inputs)
+    outputs = await chain.abatch(
+        [inputs[filename] for filename in ordered_files],
+        config=_per_file_configs(ordered_files, config, max_concurrency),
+        return_exceptions=True,
+    )
+    return dict(zip(ordered_files, outputs))
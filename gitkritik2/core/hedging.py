@@ -0,0 +1,206 @@
+# core/hedging.py
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import ensure_config
+
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_MIN_SAMPLES = 10
+DEFAULT_HEDGE_INITIAL_DELAY_S = 30.0 # Used until enough latencies are recorded for a percentile
+DEFAULT_HEDGE_MIN_DELAY_S = 2.0
+LATENCY_WINDOW = 200
+
+
+class HedgePolicy:
+    """
+    When to send a hedge request: once a call has run longer than the given percentile
+    of recent successful calls for the same agent. Latencies are kept per agent because
+    a summary call and a style call have very different normal durations.
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES, initial_delay: float = DEFAULT_HEDGE_INITIAL_DELAY_S,
+                 min_delay: float = DEFAULT_HEDGE_MIN_DELAY_S):
+        self.enabled = enabled
+        self.percentile = min(max(percentile, 1.0), 100.0)
+        self.min_samples = max(1, min_samples)
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """Seconds to wait for a response before hedging, or None when hedging is off."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100.0))
+        return max(self.min_delay, samples[index])
+
+    def record(self, key: str, latency: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+
+class Candidate(NamedTuple):
+    name: str # provider/model, for logs
+    llm: BaseChatModel
+    available: Callable[[], bool] # False once the provider's circuit breaker is open
+
+
+class HedgeSetup(NamedTuple):
+    candidates: List[Candidate] # Primary first, then fallbacks in order
+    policy: HedgePolicy
+
+
+class HedgedRunnable(Runnable):
+    """
+    Runs the same chain on several models: the first starts right away; the next one
+    starts when the current calls pass the hedge delay (hedging) or all of them fail
+    (fallback). The first call that completes with a parsed result wins and the rest
+    are cancelled. Async losers are cancelled mid-request; sync losers can't be
+    interrupted, so their result is discarded when they finish.
+    """
+
+    def __init__(self, chains: List[Runnable], names: List[str], available: List[Callable[[], bool]], policy: HedgePolicy):
+        self.chains = chains
+        self.names = names
+        self.available = available
+        self.policy = policy
+
+    def _order(self) -> List[int]:
+        usable = [i for i, available in enumerate(self.available) if available()]
+        # All providers tripped: still try the primary, which raises the circuit breaker error
+        return usable or [0]
+
+    @staticmethod
+    def _key(config: RunnableConfig) -> str:
+        return (config.get("metadata") or {}).get("agent") or "default"
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        config = ensure_config(config)
+        key = self._key(config)
+        order = self._order()
+        delay = self.policy.hedge_delay(key)
+        pool = ThreadPoolExecutor(max_workers=len(order), thread_name_prefix="hedge")
+        pending: Dict[Any, tuple] = {}
+        errors: List[BaseException] = []
+        launched = 0
+
+        def launch() -> None:
+            nonlocal launched
+            index = order[launched]
+            launched += 1
+            pending[pool.submit(self.chains[index].invoke, input, config, **kwargs)] = (index, time.monotonic())
+
+        try:
+            launch()
+            hedge_at = time.monotonic() + delay if delay is not None else None
+            while pending:
+                timeout = max(0.0, hedge_at - time.monotonic()) if hedge_at is not None and launched < len(order) else None
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    print(f"[hedging] {key}: no response after {delay:.1f}s, sending hedge request to {self.names[order[launched]]}")
+                    launch()
+                    hedge_at = time.monotonic() + delay
+                    continue
+                for future in done:
+                    index, started = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"[hedging] {key}: {self.names[index]} failed: {e}")
+                        errors.append(e)
+                        continue
+                    self.policy.record(key, time.monotonic() - started)
+                    return result
+                if not pending and launched < len(order):
+                    print(f"[hedging] {key}: falling back to {self.names[order[launched]]}")
+                    launch()
+            raise errors[-1]
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        config = ensure_config(config)
+        key = self._key(config)
+        order = self._order()
+        delay = self.policy.hedge_delay(key)
+        pending: Dict[asyncio.Task, tuple] = {}
+        errors: List[BaseException] = []
+        launched = 0
+
+        def launch() -> None:
+            nonlocal launched
+            index = order[launched]
+            launched += 1
+            task = asyncio.ensure_future(self.chains[index].ainvoke(input, config, **kwargs))
+            pending[task] = (index, time.monotonic())
+
+        try:
+            launch()
+            hedge_at = time.monotonic() + delay if delay is not None else None
+            while pending:
+                timeout = max(0.0, hedge_at - time.monotonic()) if hedge_at is not None and launched < len(order) else None
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"[hedging] {key}: no response after {delay:.1f}s, sending hedge request to {self.names[order[launched]]}")
+                    launch()
+                    hedge_at = time.monotonic() + delay
+                    continue
+                for task in done:
+                    index, started = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        print(f"[hedging] {key}: {self.names[index]} failed: {e}")
+                        errors.append(e)
+                        continue
+                    self.policy.record(key, time.monotonic() - started)
+                    return result
+                if not pending and launched < len(order):
+                    print(f"[hedging] {key}: falling back to {self.names[order[launched]]}")
+                    launch()
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+# Hedge/fallback setup per primary model returned by get_llm (which keeps those models alive for the run)
+_setups: Dict[int, HedgeSetup] = {}
+
+
+def register_hedging(llm: BaseChatModel, setup: HedgeSetup) -> None:
+    _setups[id(llm)] = setup
+
+
+def hedged_chain(llm: BaseChatModel, build_chain: Callable[[BaseChatModel], Runnable]) -> Runnable:
+    """
+    build_chain(llm), or a HedgedRunnable racing it against the same chain built on the
+    fallback models when get_llm set up hedging or fallbacks for `llm`. Racing whole
+    chains means a response only wins once the agent's parser accepts it.
+    """
+    setup = _setups.get(id(llm))
+    if setup is None or (len(setup.candidates) < 2 and not setup.policy.enabled):
+        return build_chain(llm)
+    candidates = list(setup.candidates)
+    if len(candidates) == 1:
+        # Hedging without fallbacks on an uncached model: the duplicate request goes to the same model
+        # (get_llm adds the uncached model as the hedge candidate when the response cache is on)
+        candidates.append(candidates[0])
+    return HedgedRunnable(
+        [build_chain(c.llm) for c in candidates], [c.name for c in candidates],
+        [c.available for c in candidates], setup.policy,
+    )
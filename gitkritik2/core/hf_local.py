@@ -0,0 +1,184 @@
+# core/hf_local.py
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# transformers/torch are optional and imported when the first engine loads
+DEFAULT_HF_MAX_BATCH_SIZE = 4
+DEFAULT_HF_BATCH_WAIT_MS = 50 # How long the first request of a batch waits for others to join
+HF_QUANTIZATIONS = ("none", "int8", "bf16")
+
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class HFSettings(NamedTuple):
+    model_id: str
+    threads: Optional[int] = None # torch intra-op threads; None keeps torch's default (all cores)
+    quantization: str = "none" # 'int8': dynamic int8 Linear layers (CPU), 'bf16': bfloat16 weights
+    max_batch_size: int = DEFAULT_HF_MAX_BATCH_SIZE
+    batch_wait_ms: int = DEFAULT_HF_BATCH_WAIT_MS
+
+
+class _Request(NamedTuple):
+    prompt: str
+    max_new_tokens: int
+    temperature: float
+    future: Future
+
+
+class HFBatchEngine:
+    """
+    One resident Hugging Face causal LM plus a worker thread that micro-batches generate
+    calls: requests arriving within batch_wait_ms of each other (from different files and
+    agents) are left-padded into one batch, up to max_batch_size prompts per forward pass.
+    """
+
+    def __init__(self, settings: HFSettings):
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError as e:
+            raise ValueError("The huggingface local backend needs `transformers` and `torch` installed.") from e
+        self.settings = settings
+        self._torch = torch
+        if settings.threads:
+            torch.set_num_threads(settings.threads)
+        print(f"[hf_local] Loading {settings.model_id} (quantization: {settings.quantization}, "
+              f"threads: {settings.threads or torch.get_num_threads()}, max batch: {settings.max_batch_size})")
+        self.tokenizer = AutoTokenizer.from_pretrained(settings.model_id)
+        # Decoder-only models continue from the last token, so pad on the left
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        dtype = torch.bfloat16 if settings.quantization == "bf16" else None
+        model = AutoModelForCausalLM.from_pretrained(settings.model_id, torch_dtype=dtype, low_cpu_mem_usage=True)
+        if settings.quantization == "int8":
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model.eval()
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        threading.Thread(target=self._worker, name=f"hf-batch-{settings.model_id}", daemon=True).start()
+
+    def render(self, messages: List[BaseMessage]) -> str:
+        """The model's chat template applied to `messages`, or plain role-prefixed text without one."""
+        turns = [{"role": _ROLES.get(m.type, "user"), "content": str(m.content)} for m in messages]
+        if getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template(turns, tokenize=False, add_generation_prompt=True)
+        return "\n\n".join(f"{turn['role'].capitalize()}: {turn['content']}" for turn in turns) + "\n\nAssistant:"
+
+    def submit(self, prompt: str, max_new_tokens: int, temperature: float) -> Future:
+        """Queues one prompt; the future resolves to (text, prompt_tokens, completion_tokens)."""
+        future: Future = Future()
+        self._queue.put(_Request(prompt, max_new_tokens, temperature, future))
+        return future
+
+    def _next_batch(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.settings.batch_wait_ms / 1000
+        while len(batch) < self.settings.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._next_batch()
+            # One generate call per sampling setting; agents normally share one
+            groups: Dict[Tuple[int, float], List[_Request]] = {}
+            for request in batch:
+                groups.setdefault((request.max_new_tokens, request.temperature), []).append(request)
+            for (max_new_tokens, temperature), requests in groups.items():
+                try:
+                    outputs = self._generate([r.prompt for r in requests], max_new_tokens, temperature)
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+                for request, output in zip(requests, outputs):
+                    request.future.set_result(output)
+
+    def _generate(self, prompts: List[str], max_new_tokens: int, temperature: float) -> List[Tuple[str, int, int]]:
+        torch = self._torch
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        sampling = {"do_sample": True, "temperature": temperature} if temperature > 0 else {"do_sample": False}
+        with torch.inference_mode():
+            output_ids = self.model.generate(
+                **inputs, max_new_tokens=max_new_tokens, pad_token_id=self.tokenizer.pad_token_id, **sampling)
+        prompt_length = inputs["input_ids"].shape[1]
+        results = []
+        for row, new_ids in enumerate(output_ids[:, prompt_length:]):
+            # Rows that stopped early are padded to the longest completion in the batch
+            completion = new_ids[new_ids != self.tokenizer.pad_token_id]
+            text = self.tokenizer.decode(completion, skip_special_tokens=True).strip()
+            results.append((text, int(inputs["attention_mask"][row].sum()), int(completion.shape[0])))
+        return results
+
+
+_engines: Dict[HFSettings, HFBatchEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def hf_engine(settings: HFSettings) -> HFBatchEngine:
+    """The resident engine for these settings, loaded on first use and kept for the process."""
+    with _engines_lock:
+        if settings not in _engines:
+            _engines[settings] = HFBatchEngine(settings)
+        return _engines[settings]
+
+
+class ChatHuggingFaceLocal(BaseChatModel):
+    """Chat model over a shared HFBatchEngine: concurrent calls are batched into one forward pass."""
+    model_id: str
+    threads: Optional[int] = None
+    quantization: str = "none"
+    max_batch_size: int = DEFAULT_HF_MAX_BATCH_SIZE
+    batch_wait_ms: int = DEFAULT_HF_BATCH_WAIT_MS
+    temperature: float = 0.3
+    max_tokens: int = 2048
+
+    @property
+    def _llm_type(self) -> str:
+        return "huggingface-local"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_id, "quantization": self.quantization}
+
+    def _engine(self) -> HFBatchEngine:
+        return hf_engine(HFSettings(self.model_id, self.threads, self.quantization, self.max_batch_size, self.batch_wait_ms))
+
+    def _submit(self, messages: List[BaseMessage], **kwargs: Any) -> Future:
+        engine = self._engine()
+        return engine.submit(engine.render(messages), int(kwargs.get("max_tokens", self.max_tokens)),
+                             float(kwargs.get("temperature", self.temperature)))
+
+    @staticmethod
+    def _result(output: Tuple[str, int, int]) -> ChatResult:
+        text, prompt_tokens, completion_tokens = output
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return self._result(self._submit(messages, **kwargs).result())
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        # Loading the model on first use blocks, keep it off the event loop
+        future = await asyncio.to_thread(self._submit, messages, **kwargs)
+        return self._result(await asyncio.wrap_future(future))
@@ -0,0 +1,113 @@
+# core/impact.py
+import os
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from gitkritik2.core.models import FileContext
+from gitkritik2.core.symbol_extractors import Reference, Symbol, extractor_for
+from gitkritik2.core.symbol_index import SymbolIndex
+from gitkritik2.core.tokens import HUNK_HEADER_RE, estimate_tokens
+
+DEFAULT_CALL_SITES_MAX_TOKENS = 1500
+MAX_CALL_SITES_PER_SYMBOL = 8 # Leaves room for other changed symbols within the token cap
+# Definitions whose callers can break when they change
+IMPACT_KINDS = ("function", "method", "class", "struct", "interface", "type")
+# Removed symbols break every caller, a changed signature most of them
+CHANGE_RANK = {"removed": 0, "signature": 1, "body": 2}
+
+
+class ChangedSymbol(NamedTuple):
+    symbol: Symbol
+    change: str # removed, signature or body
+
+
+def changed_line_numbers(diff: str) -> Set[int]:
+    """New-file line numbers of added lines, plus the positions where lines were removed."""
+    lines: Set[int] = set()
+    new_line = 0
+    for line in diff.splitlines():
+        header = HUNK_HEADER_RE.match(line)
+        if header:
+            new_line = int(header.group(1))
+        elif line.startswith(("+++", "---")) or not new_line:
+            continue
+        elif line.startswith("+"):
+            lines.add(new_line)
+            new_line += 1
+        elif line.startswith("-"):
+            lines.add(new_line)
+        elif not line.startswith("\\"):
+            new_line += 1
+    return lines
+
+
+def _symbols(filename: str, source: Optional[str]) -> List[Symbol]:
+    extractor = extractor_for(filename)
+    if extractor is None or not source:
+        return []
+    try:
+        return [s for s in extractor(filename, source) if s.kind in IMPACT_KINDS]
+    except (SyntaxError, ValueError, RecursionError):
+        return []
+
+
+def changed_symbols(filename: str, context: FileContext) -> List[ChangedSymbol]:
+    """
+    Functions, methods and types of the file that the diff touches: a changed line between
+    a definition and the next one, a changed signature, or a definition that was removed.
+    """
+    after = sorted(_symbols(filename, context.after), key=lambda s: s.line)
+    before = {s.qualname: s for s in _symbols(filename, context.before)}
+    lines = changed_line_numbers(context.diff or "")
+    changed: List[ChangedSymbol] = []
+    for i, symbol in enumerate(after):
+        end = after[i + 1].line if i + 1 < len(after) else float("inf")
+        previous = before.get(symbol.qualname)
+        if previous is not None and previous.signature != symbol.signature:
+            changed.append(ChangedSymbol(symbol, "signature"))
+        elif any(symbol.line <= line < end for line in lines):
+            changed.append(ChangedSymbol(symbol, "body"))
+    current = {s.qualname for s in after}
+    changed.extend(ChangedSymbol(s, "removed") for s in before.values() if s.qualname not in current)
+    return sorted(changed, key=lambda c: (CHANGE_RANK[c.change], c.symbol.line))
+
+
+def _rank_sites(index: SymbolIndex, filename: str, symbol: Symbol) -> List[Reference]:
+    """
+    Calls of the symbol's name in other files, most likely to be real callers first: files
+    importing the changed file (or its package), then files in the same directory. Other
+    files only count when no other file defines a symbol of that name.
+    """
+    sites = index.call_sites(symbol.name, exclude_path=filename)
+    if not sites:
+        return []
+    importers = index.importers(filename)
+    directory = os.path.dirname(filename)
+    unique_name = index.defining_files(symbol.name) <= {filename}
+    ranked = []
+    for site in sites:
+        score = 2 if site.path in importers else 1 if os.path.dirname(site.path) == directory else 0
+        if score or unique_name:
+            ranked.append((-score, site.path, site.line, site))
+    return [site for *_, site in sorted(ranked)]
+
+
+def call_sites(index: SymbolIndex, filename: str, context: FileContext, max_tokens: int) -> Dict[str, List[str]]:
+    """
+    {changed symbol: ["path:line (in caller): code", ...]} for the functions and types the
+    file's diff changes or removes, ranked by kind of change and likelihood of being a real
+    caller, and cut off once the entries reach `max_tokens`.
+    """
+    result: Dict[str, List[str]] = {}
+    if max_tokens <= 0:
+        return result
+    used = 0
+    for changed in changed_symbols(filename, context):
+        label = changed.symbol.qualname + (" (removed)" if changed.change == "removed" else "")
+        for site in _rank_sites(index, filename, changed.symbol)[:MAX_CALL_SITES_PER_SYMBOL]:
+            entry = f"{site.path}:{site.line}" + (f" (in {site.caller})" if site.caller else "") + f": {site.text}"
+            tokens = estimate_tokens(entry)
+            if used + tokens > max_tokens:
+                return result
+            used += tokens
+            result.setdefault(label, []).append(entry)
+    return result
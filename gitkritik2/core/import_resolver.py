@@ -0,0 +1,462 @@
+# core/import_resolver.py
+import ast
+import io
+import os
+import re
+import tokenize
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from gitkritik2.core.symbol_extractors import go_symbols, strip_comments_and_strings
+
+# Directories (besides the project root) that commonly hold top-level packages
+SOURCE_ROOTS = ("", "src", "lib")
+# Upper bound on lookups per file; the first uses in the diff win
+MAX_SYMBOLS_PER_FILE = 12
+
+_NAME_PATTERN = re.compile(r"[A-Za-z_]\w*(?:\s*\.\s*[A-Za-z_]\w*)*")
+
+
+class ImportedName(NamedTuple):
+    module: str # Dotted module path as written, without the leading dots
+    level: int # Leading dots of a relative import
+    attribute: Optional[str] # 'name' of `from module import name`; None for `import module`
+
+
+def parse_imports(source: str) -> Dict[str, ImportedName]:
+    """
+    Names bound by the file's import statements (at any depth), by the dotted name code
+    uses to refer to them: `import a.b` is referred to as `a.b`, `import a.b as c` as `c`.
+    Star imports are skipped: the names they bind aren't known without the target file.
+    Raises SyntaxError if the file doesn't parse.
+    """
+    imports: Dict[str, ImportedName] = {}
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports[alias.asname or alias.name] = ImportedName(alias.name, 0, None)
+                if not alias.asname and "." in alias.name:
+                    # `import a.b` also binds `a`
+                    top = alias.name.split(".")[0]
+                    imports.setdefault(top, ImportedName(top, 0, None))
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.name != "*":
+                    imports[alias.asname or alias.name] = ImportedName(node.module or "", node.level, alias.name)
+    return imports
+
+
+def added_lines(diff: str) -> List[str]:
+    return [line[1:] for line in diff.splitlines() if line.startswith("+") and not line.startswith("+++")]
+
+
+def used_names(lines: List[str]) -> List[str]:
+    """
+    Dotted names (e.g. `helpers.parse`, `Config`) used in code lines, in order of first use.
+    Strings and comments are skipped. Lines from a diff need not form valid code on their own.
+    """
+    names: List[str] = []
+    for line in lines:
+        try:
+            tokens = list(tokenize.generate_tokens(io.StringIO(line.strip() + "\n").readline))
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            # Unbalanced brackets or an unterminated string: fall back to a plain scan
+            names.extend(re.sub(r"\s+", "", name) for name in _NAME_PATTERN.findall(line.split("#", 1)[0]))
+            continue
+        current: List[str] = []
+        expect_name = False
+        for token in tokens:
+            if token.type == tokenize.NAME and (not current or expect_name):
+                current.append(token.string)
+                expect_name = False
+            elif token.type == tokenize.OP and token.string == "." and current and not expect_name:
+                expect_name = True
+            else:
+                if current:
+                    names.append(".".join(current))
+                current = [token.string] if token.type == tokenize.NAME else []
+                expect_name = False
+        if current:
+            names.append(".".join(current))
+    return list(dict.fromkeys(names))
+
+
+def _module_file(project_root: str, parts: List[str], roots: List[str]) -> Optional[str]:
+    """Project-relative path of the module `parts` under one of `roots`, or None."""
+    if not parts:
+        return None
+    for root in roots:
+        base = os.path.join(project_root, root, *parts)
+        for candidate in (base + ".py", os.path.join(base, "__init__.py")):
+            if os.path.isfile(candidate):
+                return os.path.relpath(candidate, project_root).replace(os.sep, "/")
+    return None
+
+
+def _package_roots(filename: str, project_root: str) -> List[str]:
+    """SOURCE_ROOTS plus the directory above the importing file's top-level package."""
+    roots = list(SOURCE_ROOTS)
+    directory = os.path.dirname(filename)
+    while directory and os.path.isfile(os.path.join(project_root, directory, "__init__.py")):
+        directory = os.path.dirname(directory)
+    if directory not in roots:
+        roots.append(directory)
+    return roots
+
+
+def resolve_module(imported: ImportedName, filename: str, project_root: str,
+                   roots: Optional[List[str]] = None) -> Optional[str]:
+    """Project file the import refers to, or None for external libraries and unresolvable imports."""
+    module_parts = [part for part in imported.module.split(".") if part]
+    if imported.level:
+        # Relative: one dot is the importing file's own package, each further dot goes up one level
+        package = os.path.dirname(filename).split("/") if os.path.dirname(filename) else []
+        if imported.level - 1 > len(package):
+            return None
+        package = package[:len(package) - (imported.level - 1)]
+        return _module_file(project_root, package + module_parts, [""])
+    return _module_file(project_root, module_parts, roots or _package_roots(filename, project_root))
+
+
+def _python_project_imports(filename: str, source: str, project_root: str) -> Dict[str, Tuple[str, Optional[str]]]:
+    """{local name: (project file, imported attribute or None for a module)} of a Python file."""
+    try:
+        imports = parse_imports(source)
+    except SyntaxError as e:
+        print(f"[import_resolver][WARN] Cannot parse imports of {filename}: {e}")
+        return {}
+    roots = _package_roots(filename, project_root)
+    project_imports = {}
+    for local_name, imported in imports.items():
+        if imported.attribute is not None:
+            # `from pkg import name`: name may itself be a submodule of pkg
+            submodule = ImportedName(".".join(filter(None, [imported.module, imported.attribute])), imported.level, None)
+            submodule_file = resolve_module(submodule, filename, project_root, roots)
+            if submodule_file:
+                project_imports[local_name] = (submodule_file, None)
+                continue
+        module_file = resolve_module(imported, filename, project_root, roots)
+        if module_file:
+            project_imports[local_name] = (module_file, imported.attribute)
+    return project_imports
+
+
+def _resolve_python(filename: str, source: str, diff: str, project_root: str) -> List[Tuple[str, str]]:
+    project_imports = _python_project_imports(filename, source, project_root)
+    if not project_imports:
+        return []
+    return _match_imports(used_names(added_lines(diff)), project_imports)
+
+
+def _match_imports(names: List[str], project_imports: Dict[str, Tuple[str, Optional[str]]]) -> List[Tuple[str, str]]:
+    """
+    (symbol, file) pairs for the dotted `names` that refer to project imports, given as
+    {local name: (file, imported attribute or None for a module/namespace)}.
+    """
+    symbols: List[Tuple[str, str]] = []
+    for name in names:
+        parts = name.split(".")
+        # The longest imported prefix wins: with `import a` and `import a.b`, a.b.f is f in a.b
+        for length in range(len(parts), 0, -1):
+            prefix = ".".join(parts[:length])
+            if prefix not in project_imports:
+                continue
+            module_file, attribute = project_imports[prefix]
+            if attribute is not None:
+                symbol = attribute # `from m import f` (possibly `as g`): f in m
+            elif length < len(parts):
+                symbol = parts[length] # A module, then `module.f`: f in the module
+            else:
+                break # The module object itself
+            symbols.append((symbol, module_file))
+            break
+    return symbols
+
+
+# --- JavaScript / TypeScript ---
+
+JS_EXTENSIONS = (".ts", ".tsx", ".d.ts", ".mts", ".cts", ".js", ".jsx", ".mjs", ".cjs")
+_JS_IMPORT = re.compile(r"\bimport\s+(?:type\s+)?([\w$\s{},*]+?)\s*from\s*['\"]([^'\"]+)['\"]")
+_JS_REQUIRE = re.compile(r"\b(?:const|let|var)\s+(\{[^}]*\}|[\w$]+)\s*=\s*require\(\s*['\"]([^'\"]+)['\"]\s*\)")
+_JS_NAMED = re.compile(r"(?:type\s+)?([\w$]+)(?:\s*(?:as|:)\s*([\w$]+))?")
+_CODE_NAME_PATTERN = re.compile(r"(?<![\w$.])[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*")
+
+
+def code_names(lines: List[str]) -> List[str]:
+    """Dotted names used in lines of C-family code (JS/TS, Go, Java), comments and strings skipped."""
+    return list(dict.fromkeys(_CODE_NAME_PATTERN.findall(strip_comments_and_strings("\n".join(lines)))))
+
+
+def _js_module_file(filename: str, specifier: str, project_root: str) -> Optional[str]:
+    """Project file of a relative import specifier; packages and path aliases aren't resolved."""
+    if not specifier.startswith("."):
+        return None
+    base = os.path.normpath(os.path.join(os.path.dirname(filename), specifier)).replace(os.sep, "/")
+    if base.startswith(".."):
+        return None
+    stem, extension = os.path.splitext(base)
+    candidates = [base] if extension in JS_EXTENSIONS else []
+    if extension in (".js", ".jsx", ".mjs", ".cjs"):
+        # TypeScript ESM imports name the compiled file: './x.js' is x.ts
+        candidates += [stem + ts_extension for ts_extension in (".ts", ".tsx", ".mts", ".cts")]
+    candidates += [base + e for e in JS_EXTENSIONS] + [f"{base}/index{e}" for e in JS_EXTENSIONS]
+    return next((c for c in candidates if os.path.isfile(os.path.join(project_root, c))), None)
+
+
+def _js_bindings(clause: str) -> Dict[str, Optional[str]]:
+    """{local name: exported name, or None for a namespace} of an import clause or require target."""
+    bindings: Dict[str, Optional[str]] = {}
+    named = re.search(r"\{([^}]*)\}", clause)
+    if named:
+        for item in named.group(1).split(","):
+            match = _JS_NAMED.fullmatch(item.strip())
+            if match:
+                bindings[match.group(2) or match.group(1)] = match.group(1)
+    rest = re.sub(r"\{[^}]*\}", "", clause)
+    namespace = re.search(r"\*\s*as\s+([\w$]+)", rest)
+    if namespace:
+        bindings[namespace.group(1)] = None
+    default = re.match(r"\s*([\w$]+)", rest)
+    if default:
+        # A default import (or a whole `require`) is looked up under its local name
+        bindings[default.group(1)] = default.group(1)
+    return bindings
+
+
+def _js_project_imports(filename: str, source: str, project_root: str) -> Dict[str, Tuple[str, Optional[str]]]:
+    """{local name: (project file, exported name or None for a namespace)} of a JS/TS file."""
+    project_imports: Dict[str, Tuple[str, Optional[str]]] = {}
+    for pattern, whole_module_default in ((_JS_IMPORT, False), (_JS_REQUIRE, True)):
+        for match in pattern.finditer(source):
+            module_file = _js_module_file(filename, match.group(2), project_root)
+            if not module_file:
+                continue
+            for local_name, exported in _js_bindings(match.group(1)).items():
+                if whole_module_default and exported == local_name:
+                    exported = None # `const m = require('./m')` binds the module object
+                project_imports[local_name] = (module_file, exported)
+    return project_imports
+
+
+def _resolve_js(filename: str, source: str, diff: str, project_root: str) -> List[Tuple[str, str]]:
+    project_imports = _js_project_imports(filename, source, project_root)
+    if not project_imports:
+        return []
+    return _match_imports(code_names(added_lines(diff)), project_imports)
+
+
+# --- Go ---
+
+_GO_MODULE = re.compile(r"^module\s+(\S+)", re.MULTILINE)
+_GO_PACKAGE = re.compile(r"^package\s+(\w+)", re.MULTILINE)
+_GO_IMPORT_BLOCK = re.compile(r"^import\s*\((.*?)^\)", re.MULTILINE | re.DOTALL)
+_GO_IMPORT_SPEC = re.compile(r"^\s*(?:import\s+)?([\w.]+\s+)?\"([^\"]+)\"", re.MULTILINE)
+
+
+def _read(project_root: str, path: str) -> str:
+    try:
+        with open(os.path.join(project_root, path), "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _go_module(filename: str, project_root: str) -> Optional[Tuple[str, str]]:
+    """(module path, project-relative directory) of the go.mod the file belongs to."""
+    directory = os.path.dirname(filename)
+    while True:
+        match = _GO_MODULE.search(_read(project_root, os.path.join(directory, "go.mod")))
+        if match:
+            return match.group(1), directory
+        if not directory:
+            return None
+        directory = os.path.dirname(directory)
+
+
+def _go_imports(source: str, filename: str, project_root: str) -> Dict[str, str]:
+    """{package name used in the file: project-relative package directory} for imports inside the module."""
+    module = _go_module(filename, project_root)
+    if module is None:
+        return {}
+    module_path, module_dir = module
+    header = source[:source.find("\nfunc ")] if "\nfunc " in source else source
+    specs = []
+    for block in _GO_IMPORT_BLOCK.findall(header):
+        specs.extend(_GO_IMPORT_SPEC.findall(block))
+    specs.extend(_GO_IMPORT_SPEC.findall(re.sub(r"^import\s*\(.*?^\)", "", header, flags=re.MULTILINE | re.DOTALL)))
+    imports: Dict[str, str] = {}
+    for alias, import_path in specs:
+        alias = alias.strip()
+        if alias in ("_", ".") or not (import_path == module_path or import_path.startswith(module_path + "/")):
+            continue
+        package_dir = "/".join(filter(None, [module_dir, import_path[len(module_path):].strip("/")]))
+        if not os.path.isdir(os.path.join(project_root, package_dir)):
+            continue
+        if not alias:
+            # The package clause names it; by convention that's the last path element
+            files = _go_files(project_root, package_dir)
+            match = _GO_PACKAGE.search(_read(project_root, files[0])) if files else None
+            alias = match.group(1) if match else import_path.rsplit("/", 1)[-1]
+        imports[alias] = package_dir
+    return imports
+
+
+def _go_files(project_root: str, package_dir: str, tests: bool = False) -> List[str]:
+    try:
+        entries = sorted(os.listdir(os.path.join(project_root, package_dir)))
+    except OSError:
+        return []
+    return ["/".join(filter(None, [package_dir, entry])) for entry in entries
+            if entry.endswith(".go") and (tests or not entry.endswith("_test.go"))]
+
+
+def _go_package_symbols(project_root: str, package_dir: str, exclude: Optional[str] = None) -> Dict[str, str]:
+    """{top-level name: defining file} of a package directory's Go files."""
+    definitions: Dict[str, str] = {}
+    for path in _go_files(project_root, package_dir, tests=bool(exclude and exclude.endswith("_test.go"))):
+        if path != exclude:
+            for symbol in go_symbols(path, _read(project_root, path)):
+                if symbol.qualname == symbol.name:
+                    definitions.setdefault(symbol.name, path)
+    return definitions
+
+
+def _resolve_go(filename: str, source: str, diff: str, project_root: str) -> List[Tuple[str, str]]:
+    imports = _go_imports(source, filename, project_root)
+    packages: Dict[str, Dict[str, str]] = {}
+    symbols: List[Tuple[str, str]] = []
+    for name in code_names(added_lines(diff)):
+        parts = name.split(".")
+        if len(parts) > 1 and parts[0] in imports:
+            package_dir, symbol = imports[parts[0]], parts[1] # pkg.Name
+            exclude = None
+        elif parts[0] not in imports:
+            # Unqualified: defined in another file of the same package
+            package_dir, symbol, exclude = os.path.dirname(filename), parts[0], filename
+        else:
+            continue
+        if package_dir not in packages:
+            packages[package_dir] = _go_package_symbols(project_root, package_dir, exclude)
+        if symbol in packages[package_dir]:
+            symbols.append((symbol, packages[package_dir][symbol]))
+    return symbols
+
+
+# --- Java ---
+
+# Where the package tree starts, besides the directory derived from the file's own package clause
+JAVA_SOURCE_ROOTS = ("src/main/java", "src/test/java", "src", "")
+_JAVA_PACKAGE = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.MULTILINE)
+_JAVA_IMPORT = re.compile(r"^\s*import\s+(static\s+)?([\w.]+?)(\.\*)?\s*;", re.MULTILINE)
+
+
+def _java_roots(filename: str, package: str) -> List[str]:
+    roots = list(JAVA_SOURCE_ROOTS)
+    directory, package_path = os.path.dirname(filename), package.replace(".", "/")
+    if package_path and (directory == package_path or directory.endswith("/" + package_path)):
+        roots.insert(0, directory[:len(directory) - len(package_path)].rstrip("/"))
+    return list(dict.fromkeys(roots))
+
+
+def _java_class(parts: List[str], roots: List[str], project_root: str) -> Optional[Tuple[str, str]]:
+    """(file, class qualname within it) of a dotted class name, e.g. a.b.Outer.Inner -> (a/b/Outer.java, Outer.Inner)."""
+    for length in range(len(parts), 0, -1):
+        for root in roots:
+            path = "/".join(filter(None, [root, *parts[:length]])) + ".java"
+            if os.path.isfile(os.path.join(project_root, path)):
+                return path, ".".join(parts[length - 1:])
+    return None
+
+
+def _java_imports(filename: str, source: str, project_root: str) -> Tuple[Dict[str, Tuple[str, str]], List[str], List[str]]:
+    """
+    ({simple name: (file, qualname)} of imported classes and static members, packages whose
+    classes need no import (the file's own package first, then wildcard imports), source roots).
+    """
+    package_match = _JAVA_PACKAGE.search(source)
+    package = package_match.group(1) if package_match else ""
+    roots = _java_roots(filename, package)
+    classes: Dict[str, Tuple[str, str]] = {}
+    wildcard_packages = [package]
+    for static, name, wildcard in _JAVA_IMPORT.findall(source):
+        parts = name.split(".")
+        if wildcard:
+            if not static:
+                wildcard_packages.append(name)
+            continue
+        target = _java_class(parts[:-1] if static else parts, roots, project_root)
+        if target:
+            classes[parts[-1]] = (target[0], f"{target[1]}.{parts[-1]}" if static else target[1])
+    return classes, wildcard_packages, roots
+
+
+def _resolve_java(filename: str, source: str, diff: str, project_root: str) -> List[Tuple[str, str]]:
+    classes, wildcard_packages, roots = _java_imports(filename, source, project_root)
+    symbols: List[Tuple[str, str]] = []
+    for name in code_names(added_lines(diff)):
+        parts = name.split(".")
+        if parts[0] not in classes and parts[0][:1].isupper():
+            # Same package or a wildcard import: one file per top-level class
+            for wildcard_package in wildcard_packages:
+                target = _java_class(wildcard_package.split(".") + [parts[0]] if wildcard_package else [parts[0]], roots, project_root)
+                if target and target[1] == parts[0] and target[0] != filename:
+                    classes[parts[0]] = target
+                    break
+        if parts[0] in classes:
+            path, qualname = classes[parts[0]]
+            symbols.append((".".join([qualname] + parts[1:2]), path))
+    return symbols
+
+
+# Import resolvers by file extension: (filename, source, diff, project_root) -> [(symbol, file)]
+RESOLVERS: Dict[str, Callable[[str, str, str, str], List[Tuple[str, str]]]] = {
+    ".py": _resolve_python,
+    **{extension: _resolve_js for extension in (".ts", ".tsx", ".mts", ".cts", ".js", ".jsx", ".mjs", ".cjs")},
+    ".go": _resolve_go,
+    ".java": _resolve_java,
+}
+RESOLVED_EXTENSIONS = tuple(RESOLVERS)
+
+
+def resolve_symbols(filename: str, source: str, diff: str, project_root: str) -> List[Tuple[str, str]]:
+    """
+    (symbol_name, project-relative file) pairs for the project symbols used on the diff's
+    added lines, at most MAX_SYMBOLS_PER_FILE. Python and JS/TS files that import nothing
+    from the project return before the diff is looked at; Go and Java also resolve names
+    defined elsewhere in the file's own package. Empty for unsupported languages.
+    """
+    resolver = RESOLVERS.get(os.path.splitext(filename)[1].lower())
+    if resolver is None:
+        return []
+    return list(dict.fromkeys(resolver(filename, source, diff, project_root)))[:MAX_SYMBOLS_PER_FILE]
+
+
+def _java_package_dir(package: str, roots: List[str], project_root: str) -> Optional[str]:
+    for root in roots:
+        directory = "/".join(filter(None, [root, *package.split(".")]))
+        if os.path.isdir(os.path.join(project_root, directory)):
+            return directory
+    return None
+
+
+def _java_import_targets(filename: str, source: str, project_root: str) -> List[str]:
+    classes, wildcard_packages, roots = _java_imports(filename, source, project_root)
+    # The own package (first entry) is not an import
+    directories = [_java_package_dir(package, roots, project_root) for package in wildcard_packages[1:]]
+    return [path for path, _ in classes.values()] + [d for d in directories if d]
+
+
+# Project files (or, for Go packages and Java wildcard imports, directories) a file imports,
+# by file extension: (filename, source, project_root) -> paths. Feeds the symbol index's import graph.
+IMPORT_TARGETS: Dict[str, Callable[[str, str, str], List[str]]] = {
+    ".py": lambda filename, source, root: [f for f, _ in _python_project_imports(filename, source, root).values()],
+    **{extension: lambda filename, source, root: [f for f, _ in _js_project_imports(filename, source, root).values()]
+       for extension in (".ts", ".tsx", ".mts", ".cts", ".js", ".jsx", ".mjs", ".cjs")},
+    ".go": lambda filename, source, root: list(_go_imports(source, filename, root).values()),
+    ".java": _java_import_targets,
+}
+
+
+def import_targets(filename: str, source: str, project_root: str) -> List[str]:
+    """The project files and package directories `filename` imports; empty for unsupported languages."""
+    targets = IMPORT_TARGETS.get(os.path.splitext(filename)[1].lower())
+    return list(dict.fromkeys(targets(filename, source, project_root))) if targets else []
@@ -0,0 +1,272 @@
+# core/llm_cache.py
+import os
+import json
+import time
+import zlib
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_chunk_to_message, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import ConfigDict, Field
+
+from gitkritik2.core.rate_limit import astream_chunks, result_chunk, stream_chunks
+
+DEFAULT_CACHE_MAX_MB = 256
+DEFAULT_CACHE_MAX_AGE_DAYS = 7
+
+
+def default_cache_path() -> str:
+    """$XDG_CACHE_HOME/gitkritik/llm_responses.sqlite (~/.cache when unset), shared by all repos."""
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "gitkritik", "llm_responses.sqlite")
+
+
+class ResponseCache:
+    """
+    SQLite store for chat responses keyed by request hash.
+    Entries older than max_age_days are dropped when the cache is opened, and the
+    least recently used entries are dropped while the file holds more than max_mb.
+    Also tracks in-flight requests so identical concurrent calls share one response.
+    """
+
+    def __init__(self, path: str, max_mb: int = DEFAULT_CACHE_MAX_MB, max_age_days: int = DEFAULT_CACHE_MAX_AGE_DAYS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        # Agents call the model from worker threads (Runnable.batch), one connection guarded by _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.evict(max_mb * 1024 * 1024, max_age_days * 86400)
+
+    @staticmethod
+    def make_key(namespace: str, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> str:
+        """Hash of the model settings (namespace) and the fully rendered request."""
+        payload = json.dumps(
+            {"namespace": namespace, "messages": [message_to_dict(m) for m in messages], "stop": stop, "kwargs": kwargs},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[ChatResult]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        try:
+            data = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+            generations = [
+                ChatGeneration(message=message, generation_info=info)
+                for message, info in zip(messages_from_dict(data["messages"]), data["generation_info"])
+            ]
+            return ChatResult(generations=generations, llm_output=_mark_cache_hit(data.get("llm_output")))
+        except Exception as e:
+            print(f"[llm_cache][WARN] Dropping unreadable cache entry: {e}")
+            with self._lock:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._conn.commit()
+            return None
+
+    def put(self, key: str, result: ChatResult) -> None:
+        try:
+            value = zlib.compress(json.dumps({
+                "messages": [message_to_dict(g.message) for g in result.generations],
+                "generation_info": [g.generation_info for g in result.generations],
+                "llm_output": result.llm_output,
+            }, default=str).encode("utf-8"))
+        except Exception as e:
+            print(f"[llm_cache][WARN] Response not cacheable: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._conn.commit()
+
+    def evict(self, max_bytes: int, max_age_seconds: float) -> None:
+        """Drops expired entries, then least recently used ones until the total size fits."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (time.time() - max_age_seconds,))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+            if total > max_bytes:
+                doomed = []
+                for key, size in self._conn.execute("SELECT key, size FROM llm_responses ORDER BY accessed_at"):
+                    if total <= max_bytes:
+                        break
+                    doomed.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", doomed)
+            self._conn.commit()
+
+    def claim(self, key: str) -> Tuple[bool, Future]:
+        """Returns (True, future) for the first caller of a key; later callers get (False, leader's future)."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return False, future
+            future = Future()
+            self._inflight[key] = future
+            return True, future
+
+    def release(self, key: str, future: Future, result: Optional[ChatResult] = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def _mark_cache_hit(llm_output: Optional[dict]) -> dict:
+    # Read by the telemetry handler: no provider call (and so no retry) was made for this response
+    return {**(llm_output or {}), "cache_hit": True, "retries": 0}
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path: Optional[str] = None, max_mb: int = DEFAULT_CACHE_MAX_MB,
+                       max_age_days: int = DEFAULT_CACHE_MAX_AGE_DAYS) -> Optional[ResponseCache]:
+    """One ResponseCache per file for the whole process. Returns None if the file can't be opened."""
+    path = os.path.expanduser(path) if path else default_cache_path()
+    with _caches_lock:
+        if path not in _caches:
+            try:
+                _caches[path] = ResponseCache(path, max_mb, max_age_days)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[llm_cache][WARN] Response cache disabled, cannot open {path}: {e}")
+                return None
+        return _caches[path]
+
+
+class CachedChatModel(BaseChatModel):
+    """
+    Chat model wrapper returned by get_llm: answers repeated requests from the
+    ResponseCache and lets identical concurrent requests share one provider call.
+    `namespace` carries provider, model, temperature and max_tokens into the key.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    response_cache: Any = Field(exclude=True)
+    namespace: str
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"namespace": self.namespace, **self.inner._identifying_params}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        # Bound tools reach _generate as kwargs, which are part of the cache key
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        cache: ResponseCache = self.response_cache
+        key = cache.make_key(self.namespace, messages, stop, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        is_leader, future = cache.claim(key)
+        if not is_leader:
+            try:
+                shared = future.result()
+                return ChatResult(generations=shared.generations, llm_output=_mark_cache_hit(shared.llm_output))
+            except Exception:
+                pass  # The leader's call failed, make our own
+            is_leader, future = cache.claim(key)
+        try:
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except BaseException as e:
+            if is_leader:
+                cache.release(key, future, error=e)
+            raise
+        cache.put(key, result)
+        if is_leader:
+            cache.release(key, future, result=result)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        cache: ResponseCache = self.response_cache
+        key = cache.make_key(self.namespace, messages, stop, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        is_leader, future = cache.claim(key)
+        if not is_leader:
+            try:
+                shared = await asyncio.wrap_future(future)
+                return ChatResult(generations=shared.generations, llm_output=_mark_cache_hit(shared.llm_output))
+            except Exception:
+                pass
+            is_leader, future = cache.claim(key)
+        try:
+            result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except BaseException as e:
+            if is_leader:
+                cache.release(key, future, error=e)
+            raise
+        cache.put(key, result)
+        if is_leader:
+            cache.release(key, future, result=result)
+        return result
+
+    # Streaming: a hit is sent as one chunk; a miss streams from the provider and is stored once complete.
+    # Identical in-flight streams don't share a call, each consumer needs its own chunks.
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        cache: ResponseCache = self.response_cache
+        key = cache.make_key(self.namespace, messages, stop, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            yield result_chunk(cached)
+            return
+        aggregated = None
+        for chunk in stream_chunks(self.inner, messages, stop, **kwargs):
+            aggregated = chunk if aggregated is None else aggregated + chunk
+            yield chunk
+        if aggregated is not None:
+            cache.put(key, _chunk_result(aggregated))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        cache: ResponseCache = self.response_cache
+        key = cache.make_key(self.namespace, messages, stop, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            yield result_chunk(cached)
+            return
+        aggregated = None
+        async for chunk in astream_chunks(self.inner, messages, stop, **kwargs):
+            aggregated = chunk if aggregated is None else aggregated + chunk
+            yield chunk
+        if aggregated is not None:
+            cache.put(key, _chunk_result(aggregated))
+
+
+def _chunk_result(aggregated: ChatGenerationChunk) -> ChatResult:
+    # Per-call details (retries) don't belong in the stored response
+    info = {k: v for k, v in (aggregated.generation_info or {}).items() if k not in ("retries", "cache_hit")}
+    return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(aggregated.message), generation_info=info or None)])
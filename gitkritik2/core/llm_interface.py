@@ -1,23 +1,34 @@
 # core/llm_interface.py
-import os
 from gitkritik2.core.models import ReviewState
 from typing import Dict, Any, Optional
 
 # LangChain imports
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.chat_models import ChatOllama
+from gitkritik2.core.providers import build_chat_model
+from gitkritik2.core.llm_cache import CachedChatModel, get_response_cache
+from gitkritik2.core.model_limits import output_token_limit, prompt_token_budget
+from gitkritik2.core.rate_limit import RateLimitedChatModel, get_scheduler
+from gitkritik2.core.structured import NATIVE_OUTPUT_PROVIDERS, register_native_output, uses_native_output
+from gitkritik2.core.routing import RoutingSetup, register_routing, model_name as routing_model_name
+from gitkritik2.core.hedging import (
+    Candidate, HedgePolicy, HedgeSetup, register_hedging,
+    DEFAULT_HEDGE_PERCENTILE, DEFAULT_HEDGE_MIN_SAMPLES, DEFAULT_HEDGE_INITIAL_DELAY_S, DEFAULT_HEDGE_MIN_DELAY_S,
+)
 
 # Simple cache for initialized models within a single run
 _llm_cache: Dict[str, BaseChatModel] = {}
 
+def model_namespace(state: ReviewState) -> str:
+    """Model settings that change responses; part of every response/review cache key."""
+    namespace = f"{state.llm_provider}|{state.model}|{state.temperature}|{state.max_tokens}"
+    # A different endpoint (gateway, local fake) may answer differently
+    return f"{namespace}|{state.base_url}" if state.base_url else namespace
+
 def get_llm(state: ReviewState) -> Optional[BaseChatModel]:
     """Gets an initialized LangChain ChatModel based on ReviewState."""
     provider = state.llm_provider
     model_name = state.model
-    cache_key = f"{provider}_{model_name}"
+    cache_key = f"{provider}_{model_name}_{state.base_url or ''}_{'cached' if state.llm_cache else 'uncached'}"
 
     if cache_key in _llm_cache:
         return _llm_cache[cache_key]
@@ -30,50 +41,107 @@ def get_llm(state: ReviewState) -> Optional[BaseChatModel]:
         return None
 
     llm: BaseChatModel | None = None
+    max_tokens = output_token_limit(state)
+    if max_tokens < state.max_tokens:
+        print(f"[LLM] max_tokens {state.max_tokens} exceeds {model_name}'s output limit, using {max_tokens}")
     try:
-        if provider == "openai":
-            api_key = state.openai_api_key # Loaded during init_state
-            if not api_key: raise ValueError("OPENAI_API_KEY is missing.")
-            llm = ChatOpenAI(
-                model=model_name, api_key=api_key,
-                temperature=state.temperature, max_tokens=state.max_tokens,
-            )
-        elif provider == "anthropic": # Changed from 'claude' to match langchain pkg
-            api_key = state.anthropic_api_key
-            if not api_key: raise ValueError("ANTHROPIC_API_KEY is missing.")
-            llm = ChatAnthropic(
-                model=model_name, api_key=api_key,
-                temperature=state.temperature, max_tokens=state.max_tokens,
-            )
-        elif provider == "gemini":
-            api_key = state.gemini_api_key
-            if not api_key: raise ValueError("GEMINI_API_KEY is missing.")
-            llm = ChatGoogleGenerativeAI(
-                model=model_name, google_api_key=api_key,
-                temperature=state.temperature, max_output_tokens=state.max_tokens,
-                # safety_settings=... # Adjust safety settings if needed
-                # convert_system_message_to_human=True # May be needed
+        llm = build_chat_model(state, max_tokens)
+
+        if llm:
+            # Shared per-provider limits, retries and backoff for every agent's calls
+            llm = RateLimitedChatModel(
+                inner=llm, max_output_tokens=max_tokens,
+                scheduler=get_scheduler(provider, state.rate_limits, state.max_retries, state.circuit_breaker_threshold),
             )
-        elif provider == "local":
-            backend = os.getenv("GITKRITIK_LOCAL_BACKEND", "ollama").lower()
-            local_model_name = os.getenv("GITKRITIK_LOCAL_MODEL", model_name)
-            if backend == "ollama":
-                base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-                print(f"[LLM] Using Ollama backend: model={local_model_name}, base_url={base_url}")
-                llm = ChatOllama(
-                    base_url=base_url, model=local_model_name,
-                    temperature=state.temperature,
-                    # Consider adding num_ctx, top_k, top_p if needed
+
+        # Cache outside the rate limiter, so cache hits don't wait for or use up provider quota
+        if llm and state.llm_cache:
+            response_cache = get_response_cache(state.llm_cache_path, state.llm_cache_max_mb, state.llm_cache_max_age_days)
+            if response_cache:
+                llm = CachedChatModel(
+                    inner=llm, response_cache=response_cache,
+                    namespace=model_namespace(state),
                 )
-            else:
-                 raise ValueError(f"Unsupported local backend '{backend}'. Use 'ollama'.")
-        else:
-            raise ValueError(f"Unsupported LLM provider: {provider}")
 
         if llm:
             _llm_cache[cache_key] = llm
+            if state.structured_output and provider in NATIVE_OUTPUT_PROVIDERS:
+                register_native_output(llm)
+            if state.fallback_models or state.hedging.get("enabled"):
+                _setup_hedging(state, llm)
+            if state.routing.get("rules"):
+                _setup_routing(state, llm)
         return llm
 
     except Exception as e:
         print(f"[ERROR] Failed to initialize LLM ({provider}/{model_name}): {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def _candidate(provider: str, model_name: str, llm: BaseChatModel) -> Candidate:
+    scheduler = get_scheduler(provider)
+    return Candidate(f"{provider}/{model_name}", llm, lambda: not scheduler.breaker.is_open)
+
+
+def _setup_hedging(state: ReviewState, llm: BaseChatModel) -> None:
+    """Builds the fallback models for `llm` and registers them with the hedge policy, see core/hedging.py."""
+    candidates = [_candidate(state.llm_provider, state.model, llm)]
+    for entry in state.fallback_models:
+        provider, model_name = entry["llm_provider"], entry["model"]
+        fallback_state = state.model_copy(update={
+            "llm_provider": provider, "model": model_name,
+            # The primary's endpoint only applies to a fallback on the same provider
+            "base_url": entry.get("base_url") or (state.base_url if provider == state.llm_provider else None),
+            "fallback_models": [], "hedging": {},
+        })
+        fallback = get_llm(fallback_state)
+        if fallback is None or fallback is llm:
+            print(f"[LLM][WARN] Skipping fallback model {provider}/{model_name}")
+            continue
+        candidates.append(_candidate(provider, model_name, fallback))
+
+    hedging = state.hedging
+    try:
+        policy = HedgePolicy(
+            enabled=bool(hedging.get("enabled")),
+            percentile=float(hedging.get("percentile", DEFAULT_HEDGE_PERCENTILE)),
+            min_samples=int(hedging.get("min_samples", DEFAULT_HEDGE_MIN_SAMPLES)),
+            initial_delay=float(hedging.get("initial_delay_s", DEFAULT_HEDGE_INITIAL_DELAY_S)),
+            min_delay=float(hedging.get("min_delay_s", DEFAULT_HEDGE_MIN_DELAY_S)),
+        )
+    except (TypeError, ValueError):
+        print("[LLM][WARN] Invalid hedging settings, using defaults")
+        policy = HedgePolicy(enabled=bool(hedging.get("enabled")))
+    if policy.enabled and len(candidates) == 1 and isinstance(llm, CachedChatModel):
+        # Hedging without fallbacks sends the duplicate request to the same model. It has to
+        # skip the response cache: its in-flight sharing would make the hedge wait on the slow call
+        uncached = llm.inner
+        if uses_native_output(llm):
+            register_native_output(uncached)
+        candidates.append(_candidate(state.llm_provider, state.model, uncached))
+    register_hedging(llm, HedgeSetup(candidates, policy))
+    print(f"[LLM] Hedging {'on' if policy.enabled else 'off'}, candidates: {', '.join(c.name for c in candidates)}")
+
+
+def _model_state(state: ReviewState, spec: dict) -> ReviewState:
+    """
+    State for another provider/model; the primary's endpoint only applies on the same provider,
+    and its context_window override only to the same model.
+    """
+    return state.model_copy(update={
+        "llm_provider": spec["llm_provider"], "model": spec["model"],
+        "base_url": spec.get("base_url") or (state.base_url if spec["llm_provider"] == state.llm_provider else None),
+        "context_window": state.context_window if spec["model"] == state.model else None,
+        "routing": {},
+    })
+
+
+def _setup_routing(state: ReviewState, llm: BaseChatModel) -> None:
+    """Registers the per-agent/per-file routing rules for `llm`, see core/routing.py."""
+    default = {"llm_provider": state.llm_provider, "model": state.model}
+    escalate_to = state.routing.get("escalate_to") or default
+    rules = state.routing["rules"]
+    register_routing(llm, RoutingSetup(rules, default, escalate_to, lambda spec: get_llm(_model_state(state, spec)),
+                                       lambda spec: prompt_token_budget(_model_state(state, spec))))
+    targets = ", ".join(dict.fromkeys(routing_model_name(rule) for rule in rules))
+    print(f"[LLM] Routing {len(rules)} rules to: {targets}; escalation: {routing_model_name(escalate_to)}")
@@ -1,12 +1,15 @@
-from anthropic import Anthropic
+import anthropic
 from gitkritik2.core.models import ReviewState
+from gitkritik2.core.providers import anthropic_client, pool_size
 from typing import Dict, Any
 
 def call_claude(system_prompt: str, user_prompt: str, state: ReviewState, common: Dict[str, Any]) -> str:
     if not state.anthropic_api_key:
         raise ValueError("Anthropic API key is not configured.")
 
-    client = Anthropic(api_key=state.anthropic_api_key)
+    # Shared keep-alive client from the provider registry, with the SDK's default retries
+    client = anthropic_client(state.anthropic_api_key, state.base_url, pool_size(state, "anthropic")).with_options(
+        max_retries=anthropic.DEFAULT_MAX_RETRIES)
 
     response = client.messages.create(
         model=state.model,
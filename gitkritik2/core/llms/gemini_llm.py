@@ -1,5 +1,6 @@
 import google.generativeai as genai
 from gitkritik2.core.models import ReviewState
+from gitkritik2.core.providers import gemini_model
 from typing import Dict, Any
 
 def call_gemini(
@@ -13,9 +14,8 @@ def call_gemini(
     if not state.gemini_api_key:
         raise ValueError("Gemini API key is not configured.")
 
-    genai.configure(api_key=state.gemini_api_key)
-
     if debug_models:
+        genai.configure(api_key=state.gemini_api_key)
         try:
             models = genai.list_models()
             print("\n[GEMINI] Available Models:")
@@ -32,7 +32,7 @@ def call_gemini(
     prompt = f"{system_prompt}\n\n{user_prompt}"
 
     try:
-        model = genai.GenerativeModel(model_name)
+        model = gemini_model(state.gemini_api_key, model_name) # Configures genai once per process
         response = model.generate_content(prompt)
         return getattr(response, "text", "[ERROR] Gemini returned no text.")
     except Exception as e:
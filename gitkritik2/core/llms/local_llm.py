@@ -1,15 +1,12 @@
 # gitkritik/core/llms/local_llm.py
 
 from gitkritik2.core.config import Settings
+from gitkritik2.core.providers import ollama_session, DEFAULT_OLLAMA_BASE_URL
+from gitkritik2.core.hf_local import HFSettings, hf_engine
+from langchain_core.messages import HumanMessage, SystemMessage
 from typing import Dict, Any
-import requests
 import os
 
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-from transformers.pipelines import TextGenerationPipeline
-
-_local_model_cache = {}
-
 def call_local(system_prompt: str, user_prompt: str, settings: Settings, common: Dict[str, Any]) -> str:
     """
     Unified local model interface supporting:
@@ -30,7 +27,8 @@ def call_local(system_prompt: str, user_prompt: str, settings: Settings, common:
 def _call_ollama(system_prompt: str, user_prompt: str) -> str:
     prompt = f"{system_prompt}\n\n{user_prompt}"
     try:
-        response = requests.post("http://localhost:11434/api/generate", json={
+        base_url = os.getenv("OLLAMA_BASE_URL", DEFAULT_OLLAMA_BASE_URL)
+        response = ollama_session(base_url).post(f"{base_url}/api/generate", json={
             "model": os.getenv("GITKRITIK_LOCAL_MODEL", "llama2"),
             "prompt": prompt,
             "stream": False
@@ -41,18 +39,11 @@ def _call_ollama(system_prompt: str, user_prompt: str) -> str:
         return f"❌ Ollama error: {e}"
 
 def _call_huggingface(system_prompt: str, user_prompt: str, settings: Settings) -> str:
-    global _local_model_cache
-
     model_id = os.getenv("GITKRITIK_LOCAL_MODEL", "tiiuae/falcon-7b-instruct")
-    prompt = f"{system_prompt}\n\n{user_prompt}"
-
-    if model_id not in _local_model_cache:
-        tokenizer = AutoTokenizer.from_pretrained(model_id)
-        model = AutoModelForCausalLM.from_pretrained(model_id)
-        generator = pipeline("text-generation", model=model, tokenizer=tokenizer)
-        _local_model_cache[model_id] = generator
-    else:
-        generator = _local_model_cache[model_id]
-
-    outputs = generator(prompt, max_length=settings.max_tokens, temperature=settings.temperature, num_return_sequences=1)
-    return outputs[0]["generated_text"].strip()
+    threads = os.getenv("GITKRITIK_HF_THREADS")
+    # Same resident model (and batching) as the huggingface backend of get_llm
+    engine = hf_engine(HFSettings(model_id, int(threads) if threads else None,
+                                  os.getenv("GITKRITIK_HF_QUANTIZATION", "none").lower()))
+    prompt = engine.render([SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)])
+    text, _, _ = engine.submit(prompt, settings.max_tokens, settings.temperature).result()
+    return text
@@ -1,5 +1,7 @@
-from openai import OpenAI, AuthenticationError, APIConnectionError, RateLimitError, APIError
+import openai
+from openai import AuthenticationError, APIConnectionError, RateLimitError, APIError
 from gitkritik2.core.models import ReviewState
+from gitkritik2.core.providers import openai_client, pool_size
 from typing import Dict, Any
 import datetime
 
@@ -8,7 +10,9 @@ def call_openai(system_prompt: str, user_prompt: str, state: ReviewState, common
     if not state.openai_api_key:
         raise ValueError("OpenAI API key is not configured.")
 
-    client = OpenAI(api_key=state.openai_api_key)
+    # Shared keep-alive client from the provider registry, with the SDK's default retries
+    client = openai_client(state.openai_api_key, state.base_url, pool_size(state, "openai")).with_options(
+        max_retries=openai.DEFAULT_MAX_RETRIES)
 
     if debug_quota:
         try:
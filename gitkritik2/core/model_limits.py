@@ -0,0 +1,71 @@
+# core/model_limits.py
+from typing import NamedTuple, Optional
+
+from gitkritik2.core.models import ReviewState
+
+
+class ModelLimits(NamedTuple):
+    context_window: int # Total tokens (prompt + completion) the model accepts
+    max_output_tokens: int # Largest completion the model will produce
+
+
+# Longest matching prefix wins, so list specific versions next to their family defaults.
+MODEL_LIMITS = {
+    # OpenAI
+    "gpt-4o": ModelLimits(128_000, 16_384),
+    "gpt-4.1": ModelLimits(1_047_576, 32_768),
+    "gpt-4-turbo": ModelLimits(128_000, 4_096),
+    "gpt-4-1106": ModelLimits(128_000, 4_096),
+    "gpt-4-0125": ModelLimits(128_000, 4_096),
+    "gpt-4-32k": ModelLimits(32_768, 4_096),
+    "gpt-4": ModelLimits(8_192, 4_096),
+    "gpt-3.5-turbo": ModelLimits(16_385, 4_096),
+    "o1": ModelLimits(200_000, 100_000),
+    "o3": ModelLimits(200_000, 100_000),
+    "o4-mini": ModelLimits(200_000, 100_000),
+    # Anthropic
+    "claude-3-7-sonnet": ModelLimits(200_000, 64_000),
+    "claude-3-5-sonnet": ModelLimits(200_000, 8_192),
+    "claude-3-5-haiku": ModelLimits(200_000, 8_192),
+    "claude-3": ModelLimits(200_000, 4_096),
+    "claude-sonnet-4": ModelLimits(200_000, 64_000),
+    "claude-opus-4": ModelLimits(200_000, 32_000),
+    # Google
+    "gemini-2.5": ModelLimits(1_048_576, 65_536),
+    "gemini-2.0": ModelLimits(1_048_576, 8_192),
+    "gemini-1.5-pro": ModelLimits(2_097_152, 8_192),
+    "gemini-1.5-flash": ModelLimits(1_048_576, 8_192),
+    "gemma-3": ModelLimits(131_072, 8_192),
+    # Common local (Ollama) models
+    "llama3.1": ModelLimits(131_072, 4_096),
+    "llama3": ModelLimits(8_192, 4_096),
+    "qwen2.5-coder": ModelLimits(32_768, 8_192),
+    "codellama": ModelLimits(16_384, 4_096),
+    "mistral": ModelLimits(32_768, 4_096),
+}
+
+# Conservative default for models not in the registry
+DEFAULT_MODEL_LIMITS = ModelLimits(8_192, 2_048)
+# Head-room for the estimator being off and for per-call overhead (tool schemas, role markers)
+SAFETY_MARGIN = 0.10
+
+
+def get_model_limits(model_name: Optional[str], context_window_override: Optional[int] = None) -> ModelLimits:
+    """Looks up a model by longest matching prefix (provider prefixes like 'models/' are ignored)."""
+    name = (model_name or "").lower().split("/")[-1]
+    match = max((prefix for prefix in MODEL_LIMITS if name.startswith(prefix)), key=len, default=None)
+    limits = MODEL_LIMITS[match] if match else DEFAULT_MODEL_LIMITS
+    if context_window_override:
+        limits = limits._replace(context_window=context_window_override)
+    return limits
+
+
+def output_token_limit(_state: ReviewState) -> int:
+    """max_tokens from the config, clamped to what the model can produce."""
+    return min(_state.max_tokens, get_model_limits(_state.model, _state.context_window).max_output_tokens)
+
+
+def prompt_token_budget(_state: ReviewState) -> int:
+    """Tokens available for a single prompt: context window minus the completion and a safety margin."""
+    limits = get_model_limits(_state.model, _state.context_window)
+    return int((limits.context_window - output_token_limit(_state)) * (1 - SAFETY_MARGIN))
@@ -1,6 +1,6 @@
 # core/models.py
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Literal, Optional
 
 class FileContext(BaseModel):
     path: str
@@ -8,8 +8,13 @@ class FileContext(BaseModel):
     after: Optional[str] = None
     diff: Optional[str] = None
     strategy: str = "hybrid"
-    # NEW: Store fetched context from ReAct agent
+    # Definitions of project symbols used in the changes, from context_agent
     symbol_definitions: Optional[Dict[str, str]] = Field(default_factory=dict, description="Definitions fetched by Context Agent")
+    # Call sites in other files of the functions/types the diff changes, {symbol: ["path:line (in caller): code"]}
+    call_sites: Optional[Dict[str, List[str]]] = Field(default_factory=dict, description="Callers of changed symbols, from Context Agent")
+    # Identity of the change, used as the incremental review cache key
+    blob_sha: Optional[str] = None # git blob SHA of 'after'
+    patch_id: Optional[str] = None # `git patch-id --stable` of 'diff'
 
 class Comment(BaseModel):
     file: str
@@ -23,12 +28,36 @@ class Comment(BaseModel):
 class LLMReviewResponse(BaseModel):
     comments: List[Comment] = Field(description="A list of review comments found, with file and line number relative to the new file version.")
 
+# Combined review mode: one LLM call per file returns comments for all review agents
+class CategorizedComment(Comment):
+    category: Literal["bug", "design", "style"] = Field(description="Which review agent this comment belongs to: 'bug', 'design' or 'style'.")
+
+class LLMCombinedReviewResponse(BaseModel):
+    comments: List[CategorizedComment] = Field(description="A list of review comments found, each tagged with a category, with file and line number relative to the new file version.")
+
 class AgentResult(BaseModel):
     agent_name: str
     comments: List[Comment] # Parsed comments
     reasoning: Optional[str] = None # For summary agent or general reasoning
     raw_llm_response: Optional[str] = None # Optional: store raw for debugging
 
+class LLMCallRecord(BaseModel):
+    """Telemetry for one chat model call, recorded by core/telemetry.py."""
+    agent: str
+    file: Optional[str] = None # None for calls that cover the whole change (summary)
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated: bool = False # Provider reported no usage, token counts are local estimates
+    latency_s: float = 0.0
+    retries: int = 0
+    cache_hit: bool = False # Answered from the LLM response cache, no provider call
+    cache_read_tokens: int = 0 # Part of prompt_tokens served from the provider's prompt cache
+    cache_write_tokens: int = 0 # Part of prompt_tokens written to the provider's prompt cache (Anthropic)
+    batch: bool = False # Answered by a provider batch job (--batch), billed at the batch discount
+    error: Optional[str] = None
+
 class Settings(BaseModel): # Kept for config loading clarity, but state holds runtime values
     platform: str
     model: str
@@ -53,6 +82,33 @@ class ReviewState(BaseModel):
     # LLM configuration
     temperature: float = 0.3
     max_tokens: int = 2048
+    context_window: Optional[int] = None # Overrides the model registry (e.g. a local model served with a larger num_ctx)
+    base_url: Optional[str] = None # Provider API endpoint override (proxy, gateway, local fake for testing)
+    rate_limits: Dict[str, Any] = Field(default_factory=dict) # Per-provider rpm/tpm/max_concurrency overrides, see core/rate_limit.py
+    max_retries: int = 5 # Retries for 429/5xx/timeouts, with backoff and Retry-After
+    circuit_breaker_threshold: int = 5 # Consecutive failed calls before a provider is skipped for the rest of the run; 0 disables
+    hedging: Dict[str, Any] = Field(default_factory=dict) # enabled, percentile, min_samples, initial_delay_s, min_delay_s
+    fallback_models: List[Dict[str, str]] = Field(default_factory=list) # [{llm_provider, model, base_url?}] tried in order
+    routing: Dict[str, Any] = Field(default_factory=dict) # {rules: [{<conditions>, llm_provider, model}], escalate_to?}, see core/routing.py
+    max_concurrency: int = 4 # Max per-file LLM calls in flight per agent
+    summary_map_reduce_tokens: int = 12000 # Combined diffs above this summarize per file/directory first; 0 disables
+    huggingface: Dict[str, Any] = Field(default_factory=dict) # Local HF backend: threads, quantization, max_batch_size, batch_wait_ms
+    review_mode: str = "separate" # 'separate' (bug/design/style agents) or 'combined' (one call per file)
+    pipeline: str = "per_file" # 'per_file' (one sub-pipeline per file via Send) or 'staged' (one node per stage)
+    llm_cache: bool = True # Reuse identical LLM responses from the on-disk cache (--no-cache disables)
+    llm_cache_path: Optional[str] = None # Defaults to ~/.cache/gitkritik/llm_responses.sqlite
+    llm_cache_max_mb: int = 256
+    llm_cache_max_age_days: int = 7
+    review_cache: bool = True # Reuse per-file agent results for files unchanged since an earlier run (--no-cache disables)
+    review_cache_path: Optional[str] = None # Defaults to .git/kritik-review-cache.sqlite
+    symbol_index: bool = True # Keep an on-disk index of the repo's definitions for symbol context lookups
+    symbol_index_path: Optional[str] = None # Defaults to .git/kritik-symbol-index.sqlite
+    call_sites_max_tokens: int = 1500 # Token cap on the call sites of changed symbols given to the bug agent; 0 disables
+    prompt_caching: bool = True # Mark/order calls so agents reuse the provider's cached prompt prefix for a file
+    structured_output: bool = True # Review agents answer through a forced tool call where the provider supports it
+    batch: bool = False # --batch: submit the review prompts as one provider batch job, finished by `collect`
+    batch_backend: Optional[str] = None # openai, anthropic or local; defaults to llm_provider
+    batch_job_id: Optional[str] = None # Set once the batch job has been submitted
     # CLI Flags / Runtime settings
     is_ci_mode: bool = False
     dry_run: bool = False
@@ -62,10 +118,14 @@ class ReviewState(BaseModel):
     review_all_files: bool = False # For detect_changes logic
     # Core Data
     changed_files: List[str] = Field(default_factory=list)
+    base_ref: Optional[str] = None # Resolved once by plan_file_reviews
+    review_order: List[str] = Field(default_factory=list) # changed_files, largest diff first
     file_contexts: Dict[str, FileContext] = Field(default_factory=dict) # Includes symbol_definitions now
     agent_results: Dict[str, AgentResult] = Field(default_factory=dict)
+    file_review_results: Dict[str, Any] = Field(default_factory=dict) # Per-file pipeline output by path, folded into agent_results
     inline_comments: List[Comment] = Field(default_factory=list) # Merged comments
     summary_review: Optional[str] = None
+    llm_calls: Dict[str, LLMCallRecord] = Field(default_factory=dict) # Per-call telemetry keyed by run id, see --report
     # Debugging / Advanced
     react_agent_workings: Optional[Dict[str, List[str]]] = Field(default_factory=dict, description="Debugging info from ReAct steps per file")
 
@@ -0,0 +1,65 @@
+# core/prompts.py
+from langchain_core.prompts import ChatPromptTemplate
+
+from gitkritik2.core.tokens import estimate_tokens
+
+# Providers that reuse a cached prompt prefix across calls: OpenAI caches automatically,
+# Anthropic where cache_control marks it (PooledChatAnthropic marks the system prompt)
+PROMPT_CACHE_PROVIDERS = ("openai", "anthropic")
+# Shorter prefixes aren't cached (1024 tokens for OpenAI and most Anthropic models)
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Shared prefix of every per-file review prompt. It holds the large inputs and nothing
+# agent-specific, so bug/design/style (and combined) calls for a file start with the same
+# tokens and the provider can serve them from its prompt cache after the first call.
+REVIEW_CONTEXT_SYSTEM = (
+    "You are a senior software engineer reviewing a code change. "
+    "Only the lines changed in the diff below (lines starting with '+' or modified lines implied by the hunk context) are under review; "
+    "the full file content and any symbol definitions are for context only. "
+    "Comments must use accurate line numbers relative to the *new* file version.\n\n"
+    "Filename: {filename}\n\n"
+    "Relevant Diff:\n"
+    "```diff\n"
+    "{diff}\n"
+    "```\n\n"
+    "Full File Content (for context):\n"
+    "```\n"
+    "{file_content}\n"
+    "```"
+)
+
+SYMBOL_CONTEXT_SECTION = (
+    "Available Symbol Context (if any):\n"
+    "{symbol_context}\n\n"
+)
+
+CALL_SITES_SECTION = (
+    "Call Sites Elsewhere in the Repository (callers of the functions and types changed here; "
+    "check they still work with the change):\n"
+    "{call_sites}\n\n"
+)
+
+
+def review_prompt(instructions: str, with_symbol_context: bool = True, with_call_sites: bool = False) -> ChatPromptTemplate:
+    """
+    Per-file review prompt: the shared file context as the system message, then the
+    agent's own instructions. Symbol context and call sites go after the shared prefix
+    because not every agent uses them.
+    """
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", REVIEW_CONTEXT_SYSTEM),
+            (
+                "human",
+                (SYMBOL_CONTEXT_SECTION if with_symbol_context else "")
+                + (CALL_SITES_SECTION if with_call_sites else "")
+                + instructions + "\n\n"
+                "Format Instructions:\n{format_instructions}",
+            ),
+        ]
+    )
+
+
+def shared_prefix_tokens(filename: str, diff: str, file_content: str) -> int:
+    """Estimated size of the shared prompt prefix for one file."""
+    return estimate_tokens(REVIEW_CONTEXT_SYSTEM.format(filename=filename, diff=diff, file_content=file_content))
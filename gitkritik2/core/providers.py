@@ -0,0 +1,355 @@
+# core/providers.py
+import os
+import asyncio
+import threading
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import requests
+import aiohttp
+import openai
+import anthropic
+from requests.adapters import HTTPAdapter
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_openai import ChatOpenAI
+from langchain_anthropic import ChatAnthropic
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_community.chat_models import ChatOllama
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
+
+from gitkritik2.core.models import ReviewState
+from gitkritik2.core.rate_limit import resolve_rate_limits
+from gitkritik2.core.hf_local import ChatHuggingFaceLocal, DEFAULT_HF_BATCH_WAIT_MS
+
+DEFAULT_OLLAMA_BASE_URL = "http://localhost:11434"
+# Idle keep-alive connections are dropped after this long (providers close them server-side around 60-90s)
+KEEPALIVE_EXPIRY_S = 60.0
+REQUEST_TIMEOUT_S = 120.0
+
+# One client per (kind, endpoint, key) for the whole process. Async clients are bound to the
+# event loop that first uses their connections, so those are kept per loop.
+_lock = threading.Lock()
+_sync_clients: Dict[tuple, Any] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, Any]]" = weakref.WeakKeyDictionary()
+
+
+def pool_size(state: ReviewState, provider: Optional[str] = None) -> int:
+    """
+    Connections to keep per provider: enough for every call the scheduler lets through at once
+    (its concurrency ceiling) or one agent's per-file calls, doubled when hedging adds duplicates.
+    """
+    provider = provider or state.llm_provider
+    size = max(state.max_concurrency, int(resolve_rate_limits(provider, state.rate_limits)["max_concurrency"]))
+    return size * 2 if state.hedging.get("enabled") else size
+
+
+def _httpx_limits(size: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size, keepalive_expiry=KEEPALIVE_EXPIRY_S)
+
+
+def _shared(key: tuple, factory: Callable[[], Any]) -> Any:
+    with _lock:
+        if key not in _sync_clients:
+            _sync_clients[key] = factory()
+        return _sync_clients[key]
+
+
+def _shared_async(key: tuple, factory: Callable[[], Any]) -> Any:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        if key not in clients:
+            clients[key] = factory()
+        return clients[key]
+
+
+class _LoopLocal:
+    """
+    Stand-in for an async SDK client (or one of its attributes, e.g. chat.completions) that
+    resolves to the running loop's shared client on each use, so a chat model built once
+    per run works from any event loop.
+    """
+
+    def __init__(self, get_client: Callable[[], Any], path: Tuple[str, ...] = ()):
+        self._get_client = get_client
+        self._path = path
+
+    def _resolve(self) -> Any:
+        target = self._get_client()
+        for name in self._path:
+            target = getattr(target, name)
+        return target
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+
+
+# --- Shared clients ---
+
+def openai_client(api_key: str, base_url: Optional[str] = None, size: int = 8) -> openai.OpenAI:
+    """Process-wide OpenAI client with a keep-alive pool. SDK retries are off; callers add their own."""
+    return _shared(("openai", base_url, api_key), lambda: openai.OpenAI(
+        api_key=api_key, base_url=base_url, max_retries=0, timeout=REQUEST_TIMEOUT_S,
+        http_client=httpx.Client(limits=_httpx_limits(size), timeout=REQUEST_TIMEOUT_S),
+    ))
+
+
+def aopenai_client(api_key: str, base_url: Optional[str] = None, size: int = 8) -> openai.AsyncOpenAI:
+    """Async counterpart of openai_client, shared per event loop. Call from a coroutine."""
+    return _shared_async(("openai", base_url, api_key), lambda: openai.AsyncOpenAI(
+        api_key=api_key, base_url=base_url, max_retries=0, timeout=REQUEST_TIMEOUT_S,
+        http_client=httpx.AsyncClient(limits=_httpx_limits(size), timeout=REQUEST_TIMEOUT_S),
+    ))
+
+
+def anthropic_client(api_key: str, base_url: Optional[str] = None, size: int = 8) -> anthropic.Anthropic:
+    """Process-wide Anthropic client with a keep-alive pool. SDK retries are off; callers add their own."""
+    return _shared(("anthropic", base_url, api_key), lambda: anthropic.Anthropic(
+        api_key=api_key, base_url=base_url, max_retries=0, timeout=REQUEST_TIMEOUT_S,
+        http_client=httpx.Client(limits=_httpx_limits(size), timeout=REQUEST_TIMEOUT_S),
+    ))
+
+
+def aanthropic_client(api_key: str, base_url: Optional[str] = None, size: int = 8) -> anthropic.AsyncAnthropic:
+    """Async counterpart of anthropic_client, shared per event loop. Call from a coroutine."""
+    return _shared_async(("anthropic", base_url, api_key), lambda: anthropic.AsyncAnthropic(
+        api_key=api_key, base_url=base_url, max_retries=0, timeout=REQUEST_TIMEOUT_S,
+        http_client=httpx.AsyncClient(limits=_httpx_limits(size), timeout=REQUEST_TIMEOUT_S),
+    ))
+
+
+def ollama_session(base_url: str, size: int = 8) -> requests.Session:
+    """Process-wide requests session for an Ollama server, pooling up to `size` connections."""
+    def build() -> requests.Session:
+        session = requests.Session()
+        session.mount(base_url, HTTPAdapter(pool_connections=1, pool_maxsize=size))
+        return session
+    return _shared(("ollama", base_url), build)
+
+
+def aollama_session(base_url: str, size: int = 8) -> aiohttp.ClientSession:
+    """Async counterpart of ollama_session, shared per event loop. Call from a coroutine."""
+    return _shared_async(("ollama", base_url), lambda: aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=size, keepalive_timeout=KEEPALIVE_EXPIRY_S),
+    ))
+
+
+def gemini_model(api_key: str, model_name: str) -> Any:
+    """
+    Shared google.generativeai GenerativeModel. genai.configure sets module-wide state,
+    so it runs once per API key instead of on every call.
+    """
+    import google.generativeai as genai # Only needed by the legacy direct-SDK path
+
+    def configure() -> str:
+        genai.configure(api_key=api_key)
+        return api_key
+    if _shared(("gemini-config",), configure) != api_key:
+        raise ValueError("google.generativeai is already configured with a different API key in this process.")
+    return _shared(("gemini", model_name), lambda: genai.GenerativeModel(model_name))
+
+
+def close_clients() -> None:
+    """Closes the sync clients (connection pools). They are rebuilt on next use."""
+    with _lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in clients:
+        close = getattr(client, "close", None)
+        if close:
+            close()
+
+
+async def aclose_clients() -> None:
+    """Closes the running loop's async clients; call before the loop ends to avoid unclosed-session warnings."""
+    with _lock:
+        clients = list(_async_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        await client.close()
+
+
+# --- LangChain chat models on the shared clients ---
+
+# Anthropic only caches prompt prefixes up to a block marked with cache_control
+EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+class PooledChatAnthropic(ChatAnthropic):
+    """
+    ChatAnthropic using the shared clients instead of building its own per model instance.
+    With cache_system_prompt, the system prompt (the shared prefix of the review prompts,
+    see core/prompts.py) ends in a cache breakpoint so later calls for the same file read it
+    from Anthropic's prompt cache.
+    """
+    pool_size: int = 8
+    cache_system_prompt: bool = True
+
+    def _get_request_payload(self, input_: Any, *, stop: Optional[List[str]] = None, **kwargs: Any) -> dict:
+        payload = super()._get_request_payload(input_, stop=stop, **kwargs)
+        system = payload.get("system")
+        if not self.cache_system_prompt or not system:
+            return payload
+        if isinstance(system, str):
+            payload["system"] = [{"type": "text", "text": system, "cache_control": EPHEMERAL_CACHE}]
+        elif isinstance(system, list) and not any(isinstance(b, dict) and "cache_control" in b for b in system):
+            payload["system"] = [*system[:-1], {**system[-1], "cache_control": EPHEMERAL_CACHE}]
+        return payload
+
+    @property
+    def _client(self) -> anthropic.Anthropic:
+        return anthropic_client(self.anthropic_api_key.get_secret_value(), self.anthropic_api_url, self.pool_size)
+
+    @property
+    def _async_client(self) -> anthropic.AsyncAnthropic:
+        return aanthropic_client(self.anthropic_api_key.get_secret_value(), self.anthropic_api_url, self.pool_size)
+
+
+class PooledChatOllama(ChatOllama):
+    """
+    ChatOllama over the shared keep-alive sessions. The stock class opens a new
+    connection (requests.post / a new aiohttp.ClientSession) for every call.
+    """
+    pool_size: int = 8
+
+    def _request_payload(self, payload: Any, stop: Optional[List[str]], kwargs: Dict[str, Any]) -> dict:
+        # Same request body as _OllamaCommon._create_stream
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        elif self.stop is not None:
+            stop = self.stop
+        params = self._default_params
+        for key in self._default_params:
+            if key in kwargs:
+                params[key] = kwargs[key]
+        if "options" in kwargs:
+            params["options"] = kwargs["options"]
+        else:
+            params["options"] = {
+                **params["options"], "stop": stop,
+                **{k: v for k, v in kwargs.items() if k not in self._default_params},
+            }
+        if payload.get("messages"):
+            return {"messages": payload.get("messages", []), **params}
+        return {"prompt": payload.get("prompt"), "images": payload.get("images", []), **params}
+
+    def _headers(self) -> dict:
+        return {"Content-Type": "application/json", **(self.headers if isinstance(self.headers, dict) else {})}
+
+    def _create_stream(self, api_url: str, payload: Any, stop: Optional[List[str]] = None, **kwargs: Any) -> Iterator[str]:
+        response = ollama_session(self.base_url, self.pool_size).post(
+            url=api_url, headers=self._headers(), auth=self.auth,
+            json=self._request_payload(payload, stop, kwargs), stream=True, timeout=self.timeout,
+        )
+        response.encoding = "utf-8"
+        if response.status_code != 200:
+            if response.status_code == 404:
+                raise OllamaEndpointNotFoundError(
+                    f"Ollama call failed with status code 404. Maybe your model is not found "
+                    f"and you should pull the model with `ollama pull {self.model}`."
+                )
+            raise ValueError(f"Ollama call failed with status code {response.status_code}. Details: {response.text}")
+        return response.iter_lines(decode_unicode=True)
+
+    async def _acreate_stream(self, api_url: str, payload: Any, stop: Optional[List[str]] = None, **kwargs: Any) -> AsyncIterator[str]:
+        session = aollama_session(self.base_url, self.pool_size)
+        async with session.post(
+            url=api_url, headers=self._headers(), auth=self.auth,
+            json=self._request_payload(payload, stop, kwargs),
+            timeout=aiohttp.ClientTimeout(total=self.timeout) if self.timeout else None,
+        ) as response:
+            if response.status != 200:
+                if response.status == 404:
+                    raise OllamaEndpointNotFoundError("Ollama call failed with status code 404.")
+                raise ValueError(f"Ollama call failed with status code {response.status}. Details: {await response.text()}")
+            async for line in response.content:
+                yield line.decode("utf-8")
+
+
+# --- Registry ---
+
+def _build_openai(state: ReviewState, max_tokens: int) -> BaseChatModel:
+    api_key = state.openai_api_key or os.getenv("OPENAI_API_KEY") # Loaded during init_state
+    if not api_key: raise ValueError("OPENAI_API_KEY is missing.")
+    size = pool_size(state, "openai")
+    return ChatOpenAI(
+        model=state.model, api_key=api_key, base_url=state.base_url,
+        temperature=state.temperature, max_tokens=max_tokens,
+        max_retries=0, # Retries go through the provider scheduler
+        stream_usage=True, # Token usage for streamed responses, for telemetry
+        root_client=openai_client(api_key, state.base_url, size),
+        client=openai_client(api_key, state.base_url, size).chat.completions,
+        root_async_client=_LoopLocal(lambda: aopenai_client(api_key, state.base_url, size)),
+        async_client=_LoopLocal(lambda: aopenai_client(api_key, state.base_url, size), ("chat", "completions")),
+    )
+
+
+def _build_anthropic(state: ReviewState, max_tokens: int) -> BaseChatModel:
+    api_key = state.anthropic_api_key or os.getenv("ANTHROPIC_API_KEY")
+    if not api_key: raise ValueError("ANTHROPIC_API_KEY is missing.")
+    return PooledChatAnthropic(
+        model=state.model, api_key=api_key, base_url=state.base_url,
+        temperature=state.temperature, max_tokens=max_tokens,
+        max_retries=0, pool_size=pool_size(state, "anthropic"),
+        cache_system_prompt=state.prompt_caching,
+    )
+
+
+def _build_gemini(state: ReviewState, max_tokens: int) -> BaseChatModel:
+    api_key = state.gemini_api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key: raise ValueError("GEMINI_API_KEY is missing.")
+    # The model builds its gRPC/REST service client once; get_llm keeps one instance per run
+    return ChatGoogleGenerativeAI(
+        model=state.model, google_api_key=api_key,
+        temperature=state.temperature, max_output_tokens=max_tokens,
+        max_retries=0,
+        # A custom endpoint is reached over REST rather than gRPC
+        **({"client_options": {"api_endpoint": state.base_url}, "transport": "rest"} if state.base_url else {}),
+        # safety_settings=... # Adjust safety settings if needed
+        # convert_system_message_to_human=True # May be needed
+    )
+
+
+def _build_local(state: ReviewState, max_tokens: int) -> BaseChatModel:
+    backend = os.getenv("GITKRITIK_LOCAL_BACKEND", "ollama").lower()
+    local_model_name = os.getenv("GITKRITIK_LOCAL_MODEL", state.model)
+    if backend == "huggingface":
+        settings = state.huggingface
+        print(f"[LLM] Using Hugging Face backend: model={local_model_name}")
+        # Batches can't be larger than the number of calls the scheduler lets through at once
+        return ChatHuggingFaceLocal(
+            model_id=local_model_name, temperature=state.temperature, max_tokens=max_tokens,
+            threads=settings.get("threads"), quantization=settings.get("quantization", "none"),
+            max_batch_size=settings.get("max_batch_size") or pool_size(state, "local"),
+            batch_wait_ms=settings.get("batch_wait_ms", DEFAULT_HF_BATCH_WAIT_MS),
+        )
+    if backend != "ollama":
+        raise ValueError(f"Unsupported local backend '{backend}'. Use 'ollama' or 'huggingface'.")
+    base_url = state.base_url or os.getenv("OLLAMA_BASE_URL", DEFAULT_OLLAMA_BASE_URL)
+    print(f"[LLM] Using Ollama backend: model={local_model_name}, base_url={base_url}")
+    return PooledChatOllama(
+        base_url=base_url, model=local_model_name,
+        temperature=state.temperature,
+        num_ctx=state.context_window, # None keeps the server's default
+        pool_size=pool_size(state, "local"),
+        # Consider adding top_k, top_p if needed
+    )
+
+
+PROVIDERS: Dict[str, Callable[[ReviewState, int], BaseChatModel]] = {
+    "openai": _build_openai,
+    "anthropic": _build_anthropic,
+    "gemini": _build_gemini,
+    "local": _build_local,
+}
+
+
+def build_chat_model(state: ReviewState, max_tokens: int) -> BaseChatModel:
+    """The provider's LangChain chat model for state.model, on the shared clients. Raises ValueError if misconfigured."""
+    builder = PROVIDERS.get(state.llm_provider)
+    if builder is None:
+        raise ValueError(f"Unsupported LLM provider: {state.llm_provider}")
+    return builder(state, max_tokens)
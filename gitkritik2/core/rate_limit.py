@@ -0,0 +1,533 @@
+# core/rate_limit.py
+import json
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult, LLMResult
+from langchain_core.runnables import Runnable
+from pydantic import ConfigDict, Field
+
+from gitkritik2.core.tokens import estimate_messages_tokens, estimate_tokens
+from gitkritik2.core.telemetry import usage_from_result
+
+# Per-provider defaults, roughly the lowest paid tiers. Override any key under
+# `rate_limits: {<provider>: {...}}` in .kritikrc.yaml; 0 disables a limit.
+DEFAULT_RATE_LIMITS: Dict[str, Dict[str, float]] = {
+    "openai": {"rpm": 500, "tpm": 200_000, "max_concurrency": 16},
+    "anthropic": {"rpm": 50, "tpm": 40_000, "max_concurrency": 8},
+    "gemini": {"rpm": 150, "tpm": 1_000_000, "max_concurrency": 16},
+    "local": {"rpm": 0, "tpm": 0, "max_concurrency": 4},
+}
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 5
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+# Statuses worth retrying; the throttling ones also shrink the concurrency limit
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+THROTTLE_STATUSES = {429, 503, 529}
+# Failures that say the provider (not the request) is the problem; these count toward the circuit breaker
+PROVIDER_FAILURE_STATUSES = RETRYABLE_STATUSES | {401, 403}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker has opened."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive calls to a provider failed for provider-side
+    reasons (retries exhausted, auth errors) and stays open for the rest of the run.
+    A threshold of 0 disables it.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_CIRCUIT_BREAKER_THRESHOLD):
+        self.threshold = threshold
+        self.is_open = False
+        self._consecutive = 0
+        self._lock = threading.Lock()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+
+    def record_failure(self) -> bool:
+        """Counts a failure. Returns True if this one opened the breaker."""
+        with self._lock:
+            self._consecutive += 1
+            if self.threshold and not self.is_open and self._consecutive >= self.threshold:
+                self.is_open = True
+                return True
+            return False
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute, up to one minute's worth.
+    reserve() takes units right away and returns how long the caller must wait
+    before using them, so concurrent callers queue up in arrival order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self._rate = self.capacity / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self._level -= min(amount, self.capacity) # A single oversized request waits at most a minute
+            return max(0.0, -self._level / self._rate)
+
+    def refund(self, amount: float) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level + amount)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease: each successful
+    call raises the limit by 1/limit (about +1 per round of calls), each throttled call
+    halves it, at most once per cooldown so one burst of 429s counts once.
+    """
+
+    def __init__(self, ceiling: int, floor: int = 1, decrease: float = 0.5, cooldown: float = 2.0):
+        self.ceiling = max(floor, ceiling)
+        self.floor = floor
+        self.limit = float(self.ceiling)
+        self._decrease = decrease
+        self._cooldown = cooldown
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self._in_flight < int(self.limit):
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def aacquire(self) -> None:
+        # Shared with worker threads, so poll instead of awaiting a threading primitive
+        while not self.try_acquire():
+            await asyncio.sleep(0.05)
+
+    def release(self, throttled: bool = False) -> Optional[float]:
+        """Frees a slot and adjusts the limit. Returns the new limit if it was decreased."""
+        with self._cond:
+            self._in_flight -= 1
+            decreased = None
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= self._cooldown:
+                    self.limit = max(float(self.floor), self.limit * self._decrease)
+                    self._last_decrease = now
+                    decreased = self.limit
+            else:
+                self.limit = min(float(self.ceiling), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+            return decreased
+
+
+def _error_chain(error: BaseException):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error (openai/anthropic/httpx/google), following wrapped causes."""
+    for err in _error_chain(error):
+        for attr in ("status_code", "code"):
+            value = getattr(err, attr, None)
+            if isinstance(value, int):
+                return int(value)
+        response = getattr(err, "response", None)
+        if isinstance(getattr(response, "status_code", None), int):
+            return response.status_code
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from the Retry-After (or retry-after-ms) response header, if the provider sent one."""
+    for err in _error_chain(error):
+        headers = getattr(getattr(err, "response", None), "headers", None)
+        if not headers:
+            continue
+        try:
+            if headers.get("retry-after-ms"):
+                return max(0.0, float(headers["retry-after-ms"]) / 1000.0)
+            value = headers.get("retry-after")
+            if value:
+                try:
+                    return max(0.0, float(value))
+                except ValueError:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Timeouts and dropped connections, which carry no HTTP status."""
+    for err in _error_chain(error):
+        if isinstance(err, (TimeoutError, ConnectionError)):
+            return True
+        name = type(err).__name__
+        if "Timeout" in name or "Connection" in name:
+            return True
+    return False
+
+
+class ProviderScheduler:
+    """
+    Shared gate for every LLM call to one provider: request and token buckets
+    (requests/min, tokens/min), an AIMD concurrency limit, and retries with
+    exponential backoff and full jitter that honor Retry-After. A Retry-After
+    pauses all callers of the provider, not just the one that got the 429.
+    Calls that still fail feed a CircuitBreaker; once it opens, calls fail fast.
+    """
+
+    def __init__(self, provider: str, rpm: float = 0, tpm: float = 0, max_concurrency: int = 8,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = BASE_BACKOFF_SECONDS,
+                 max_delay: float = MAX_BACKOFF_SECONDS, breaker_threshold: int = DEFAULT_CIRCUIT_BREAKER_THRESHOLD):
+        self.provider = provider
+        self.breaker = CircuitBreaker(breaker_threshold)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AIMDLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _admission_delay(self, estimated_tokens: int) -> float:
+        paused = max(0.0, self._paused_until - time.monotonic())
+        return max(paused, self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+
+    def _retry_delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if the error shouldn't be retried."""
+        status = status_code(error)
+        retryable = status in RETRYABLE_STATUSES if status is not None else _is_transient(error)
+        if not retryable or attempt >= self.max_retries:
+            return None
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            delay = min(server_delay, self.max_delay) + random.uniform(0, self.base_delay)
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            return delay
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _after_failure(self, error: BaseException, attempt: int, estimated_tokens: int) -> float:
+        """Releases the slot for a failed attempt and returns the retry delay, or re-raises."""
+        status = status_code(error)
+        decreased = self.concurrency.release(throttled=status in THROTTLE_STATUSES)
+        if decreased is not None:
+            print(f"[rate_limit] {self.provider}: throttled, concurrency limit now {int(decreased)}")
+        # The provider never counted a failed attempt's tokens, retried or not
+        self.tokens.refund(estimated_tokens)
+        delay = self._retry_delay(error, attempt)
+        if delay is None:
+            self._record_failure(error)
+            raise error
+        print(f"[rate_limit] {self.provider}: {status or type(error).__name__}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def _record_failure(self, error: BaseException) -> None:
+        """Counts a call that failed for good towards the circuit breaker, if the provider is to blame."""
+        status = status_code(error)
+        if (status in PROVIDER_FAILURE_STATUSES or (status is None and _is_transient(error))) and self.breaker.record_failure():
+            print(f"[rate_limit] {self.provider}: {self.breaker.threshold} calls in a row failed, "
+                  f"not sending more requests to {self.provider} this run")
+
+    def _after_stream_failure(self, error: BaseException, aggregated: Optional[ChatGenerationChunk],
+                              estimated_tokens: int) -> None:
+        """
+        Releases the slot of a stream that failed or was abandoned after its first chunk and
+        refunds the estimate beyond what was streamed. Cancellation (e.g. a hedge that lost)
+        isn't a provider failure and doesn't reach the circuit breaker.
+        """
+        self.concurrency.release()
+        streamed = estimate_tokens(aggregated.text) if aggregated is not None else 0
+        self.tokens.refund(max(0, estimated_tokens - streamed))
+        if isinstance(error, Exception):
+            self._record_failure(error)
+
+    def _check_breaker(self) -> None:
+        if self.breaker.is_open:
+            raise CircuitOpenError(f"{self.provider} circuit breaker is open after repeated failures")
+
+    def _after_success(self, result: ChatResult, estimated_tokens: int) -> None:
+        self.concurrency.release()
+        self.breaker.record_success()
+        prompt_tokens, completion_tokens = usage_from_result(LLMResult(generations=[result.generations], llm_output=result.llm_output))
+        if prompt_tokens is not None:
+            # The reservation counted the full max_tokens, give back what wasn't used
+            self.tokens.refund(max(0, estimated_tokens - prompt_tokens - (completion_tokens or 0)))
+
+    def call(self, fn: Callable[[], ChatResult], estimated_tokens: int) -> Tuple[ChatResult, int]:
+        """Runs fn under the limits, retrying retryable failures. Returns (result, retries)."""
+        attempt = 0
+        while True:
+            # Checked before every attempt: another call may have opened the breaker while this one retried
+            self._check_breaker()
+            delay = self._admission_delay(estimated_tokens)
+            if delay:
+                time.sleep(delay)
+            self.concurrency.acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._after_failure(e, attempt, estimated_tokens))
+                attempt += 1
+                continue
+            self._after_success(result, estimated_tokens)
+            return result, attempt
+
+    async def acall(self, fn: Callable[[], Awaitable[ChatResult]], estimated_tokens: int) -> Tuple[ChatResult, int]:
+        """Async counterpart of call."""
+        attempt = 0
+        while True:
+            # Checked before every attempt: another call may have opened the breaker while this one retried
+            self._check_breaker()
+            delay = self._admission_delay(estimated_tokens)
+            if delay:
+                await asyncio.sleep(delay)
+            await self.concurrency.aacquire()
+            try:
+                result = await fn()
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(e, attempt, estimated_tokens))
+                attempt += 1
+                continue
+            self._after_success(result, estimated_tokens)
+            return result, attempt
+
+    def stream(self, open_stream: Callable[[], Iterator[ChatGenerationChunk]],
+               estimated_tokens: int) -> Iterator[Tuple[ChatGenerationChunk, int]]:
+        """
+        Streaming counterpart of call, yielding (chunk, retries). The concurrency slot is held
+        until the stream ends. Failures before the first chunk are retried; later ones are
+        raised, since the caller has already seen part of the response.
+        """
+        attempt = 0
+        while True:
+            # Checked before every attempt: another call may have opened the breaker while this one retried
+            self._check_breaker()
+            delay = self._admission_delay(estimated_tokens)
+            if delay:
+                time.sleep(delay)
+            self.concurrency.acquire()
+            try:
+                chunks = open_stream()
+                first = next(chunks, None)
+            except Exception as e:
+                time.sleep(self._after_failure(e, attempt, estimated_tokens))
+                attempt += 1
+                continue
+            break
+        aggregated = first
+        try:
+            if first is not None:
+                yield first, attempt
+                for chunk in chunks:
+                    aggregated += chunk
+                    yield chunk, attempt
+        except BaseException as e:
+            # Failed mid-stream, or the consumer stopped reading (e.g. a hedge was cancelled)
+            self._after_stream_failure(e, aggregated, estimated_tokens)
+            raise
+        self._after_success(ChatResult(generations=[aggregated] if aggregated else []), estimated_tokens)
+
+    async def astream(self, open_stream: Callable[[], AsyncIterator[ChatGenerationChunk]],
+                      estimated_tokens: int) -> AsyncIterator[Tuple[ChatGenerationChunk, int]]:
+        """Async counterpart of stream."""
+        attempt = 0
+        while True:
+            # Checked before every attempt: another call may have opened the breaker while this one retried
+            self._check_breaker()
+            delay = self._admission_delay(estimated_tokens)
+            if delay:
+                await asyncio.sleep(delay)
+            await self.concurrency.aacquire()
+            try:
+                chunks = open_stream()
+                first = await anext(chunks, None)
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(e, attempt, estimated_tokens))
+                attempt += 1
+                continue
+            break
+        aggregated = first
+        try:
+            if first is not None:
+                yield first, attempt
+                async for chunk in chunks:
+                    aggregated += chunk
+                    yield chunk, attempt
+        except BaseException as e:
+            self._after_stream_failure(e, aggregated, estimated_tokens)
+            raise
+        self._after_success(ChatResult(generations=[aggregated] if aggregated else []), estimated_tokens)
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def resolve_rate_limits(provider: str, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """DEFAULT_RATE_LIMITS for the provider updated with its entry under `rate_limits` from YAML."""
+    limits = dict(DEFAULT_RATE_LIMITS.get(provider, {"rpm": 0, "tpm": 0, "max_concurrency": 8}))
+    for key, value in ((overrides or {}).get(provider) or {}).items():
+        if key not in limits:
+            print(f"[rate_limit][WARN] Unknown rate_limits.{provider} key '{key}', expected rpm, tpm or max_concurrency")
+            continue
+        try:
+            limits[key] = float(value)
+        except (TypeError, ValueError):
+            print(f"[rate_limit][WARN] Invalid rate_limits.{provider}.{key} value '{value}', using {limits[key]}")
+    return limits
+
+
+def get_scheduler(provider: str, overrides: Optional[Dict[str, Any]] = None, max_retries: int = DEFAULT_MAX_RETRIES,
+                  breaker_threshold: int = DEFAULT_CIRCUIT_BREAKER_THRESHOLD) -> ProviderScheduler:
+    """One ProviderScheduler per provider for the whole process, shared by all agents and files."""
+    with _schedulers_lock:
+        if provider not in _schedulers:
+            limits = resolve_rate_limits(provider, overrides)
+            _schedulers[provider] = ProviderScheduler(
+                provider, rpm=limits["rpm"], tpm=limits["tpm"],
+                max_concurrency=int(limits["max_concurrency"]) or 1, max_retries=max_retries,
+                breaker_threshold=breaker_threshold,
+            )
+        return _schedulers[provider]
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    Chat model wrapper returned by get_llm: every call goes through the provider's
+    ProviderScheduler. The number of retries is reported in llm_output for telemetry.
+    `max_output_tokens` is reserved from the tokens/min bucket along with the prompt,
+    as providers count it against the limit until the response arrives.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    scheduler: Any = Field(exclude=True)
+    max_output_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # 'provider' lets telemetry attribute calls made to fallback models
+        return {"provider": self.scheduler.provider, **self.inner._identifying_params}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        # The provider formats tools its own way; its bound arguments are passed through to it
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def _with_retries(self, result: ChatResult, retries: int) -> ChatResult:
+        return ChatResult(generations=result.generations, llm_output={**(result.llm_output or {}), "retries": retries})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        estimated = estimate_messages_tokens(messages) + self.max_output_tokens
+        result, retries = self.scheduler.call(
+            lambda: self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs), estimated)
+        return self._with_retries(result, retries)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        estimated = estimate_messages_tokens(messages) + self.max_output_tokens
+        result, retries = await self.scheduler.acall(
+            lambda: self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs), estimated)
+        return self._with_retries(result, retries)
+
+    # Streaming: the outer stream() reports each chunk to the callbacks, so the inner model gets no
+    # run_manager. Retries go in the first chunk's generation_info, which ends up in the aggregate.
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        estimated = estimate_messages_tokens(messages) + self.max_output_tokens
+        first = True
+        for chunk, retries in self.scheduler.stream(lambda: stream_chunks(self.inner, messages, stop, **kwargs), estimated):
+            if first:
+                chunk = with_generation_info(chunk, retries=retries)
+                first = False
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        estimated = estimate_messages_tokens(messages) + self.max_output_tokens
+        first = True
+        async for chunk, retries in self.scheduler.astream(lambda: astream_chunks(self.inner, messages, stop, **kwargs), estimated):
+            if first:
+                chunk = with_generation_info(chunk, retries=retries)
+                first = False
+            yield chunk
+
+
+def _supports_streaming(model: BaseChatModel) -> bool:
+    return type(model)._stream is not BaseChatModel._stream
+
+
+def result_chunk(result: ChatResult) -> ChatGenerationChunk:
+    generation = result.generations[0]
+    # Tool calls travel as chunks with their arguments serialized, as a provider streams them
+    tool_call_chunks = [
+        {"name": call["name"], "args": json.dumps(call["args"]), "id": call.get("id"), "index": index}
+        for index, call in enumerate(getattr(generation.message, "tool_calls", None) or [])
+    ]
+    message = AIMessageChunk(
+        content=generation.message.content, id=generation.message.id,
+        additional_kwargs=generation.message.additional_kwargs, response_metadata=generation.message.response_metadata,
+        usage_metadata=getattr(generation.message, "usage_metadata", None), tool_call_chunks=tool_call_chunks,
+    )
+    return ChatGenerationChunk(message=message, generation_info={**(generation.generation_info or {}), **(result.llm_output or {})})
+
+
+def stream_chunks(model: BaseChatModel, messages, stop=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+    """model._stream, or its whole response as one chunk for models that can't stream."""
+    if _supports_streaming(model):
+        return model._stream(messages, stop=stop, **kwargs)
+    return iter([result_chunk(model._generate(messages, stop=stop, **kwargs))])
+
+
+async def astream_chunks(model: BaseChatModel, messages, stop=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+    """Async counterpart of stream_chunks."""
+    if _supports_streaming(model) or type(model)._astream is not BaseChatModel._astream:
+        async for chunk in model._astream(messages, stop=stop, **kwargs):
+            yield chunk
+    else:
+        yield result_chunk(await model._agenerate(messages, stop=stop, **kwargs))
+
+
+def with_generation_info(chunk: ChatGenerationChunk, **info: Any) -> ChatGenerationChunk:
+    return ChatGenerationChunk(message=chunk.message, generation_info={**(chunk.generation_info or {}), **info})
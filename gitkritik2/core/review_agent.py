@@ -0,0 +1,228 @@
+# core/review_agent.py
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from gitkritik2.core.models import ReviewState, AgentResult, Comment, FileContext
+from gitkritik2.core.llm_interface import get_llm
+from gitkritik2.core.utils import ensure_review_state
+from gitkritik2.core.diff_utils import filter_comments_to_diff
+from gitkritik2.core.concurrency import run_chain_per_file, arun_chain_per_file
+from gitkritik2.core.review_cache import ReviewCache, agent_version, cache_extra, get_review_cache, lookup_file, store_file, partition_cached
+from gitkritik2.core.model_limits import prompt_token_budget
+from gitkritik2.core.tokens import estimate_messages_tokens, fit_prompt_input
+from gitkritik2.core.telemetry import LLMTelemetryHandler, telemetry_config, with_metadata
+from gitkritik2.core.hedging import hedged_chain
+from gitkritik2.core.routing import routed_chain, routed_prompt_budget
+from gitkritik2.core.structured import ReviewOutputParser, structured_review
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig, RunnablePassthrough
+
+
+def symbol_context_input(context: FileContext) -> str:
+    """The 'symbol_context' prompt input: definitions gathered by context_agent."""
+    if not context.symbol_definitions:
+        return "No external symbol context provided."
+    return "\n".join([f"- {s}:\n```\n{d}\n```" for s, d in context.symbol_definitions.items()])
+
+
+def call_sites_input(context: FileContext) -> str:
+    """The 'call_sites' prompt input: callers of the changed symbols gathered by context_agent."""
+    if not context.call_sites:
+        return "No callers found elsewhere in the repository."
+    return "\n".join(f"- {symbol}:\n" + "\n".join(f"  - {site}" for site in sites)
+                     for symbol, sites in context.call_sites.items())
+
+
+class ReviewAgent:
+    """
+    Per-file review machinery shared by the bug, design, style and combined agents: chain
+    inputs fitted to the prompt budget, the routed/hedged chain, the review cache, and the
+    graph nodes and per-file entry points in sync and async form. `context_inputs` maps
+    extra prompt inputs to their builders; they are also part of the review cache key.
+    """
+
+    def __init__(self, name: str, prompt_template: ChatPromptTemplate, parser: ReviewOutputParser,
+                 context_inputs: Optional[Dict[str, Callable[[FileContext], str]]] = None):
+        self.name = name
+        self.prompt_template = prompt_template
+        self.parser = parser
+        self.context_inputs = context_inputs or {}
+        self.cache_fields: Tuple[str, ...] = tuple(self.context_inputs)
+        # Changes to the prompt or output format invalidate this agent's cached review results
+        self.version = agent_version(prompt_template, parser.get_format_instructions())
+        self.log_prefix = f"[{name}_agent]"
+
+    # Agent names the results are reported under; see CombinedReviewAgent
+    @property
+    def result_names(self) -> Tuple[str, ...]:
+        return (self.name,)
+
+    def measure_prompt(self, chain_input: dict) -> int:
+        return estimate_messages_tokens(self.prompt_template.format_messages(**chain_input))
+
+    def build_chain(self, llm: BaseChatModel) -> Runnable:
+        # Use RunnablePassthrough to pass filename and diff along for filtering.
+        # routed_chain picks the model per file when routing rules are configured, and
+        # hedged_chain races the chain on fallback models when hedging/fallbacks are configured.
+        return routed_chain(llm, self.name, lambda routed: hedged_chain(routed, lambda model: (
+            RunnablePassthrough.assign(
+                parsed_response = structured_review(self.prompt_template, model, self.parser)
+            )
+        )))
+
+    def build_chain_input(self, filename: str, context: FileContext, token_budget: Optional[int] = None,
+                          llm: Optional[BaseChatModel] = None) -> Optional[dict]:
+        """
+        Builds the chain input for one file, or None if the file can't be reviewed. With `llm`,
+        the prompt is fitted to the model routing picks for the file instead of the main model.
+        """
+        if not context.after or not context.diff:
+            print(f"{self.log_prefix} Skipping {filename} - missing content or diff.")
+            return None
+        if token_budget and llm is not None:
+            token_budget = routed_prompt_budget(llm, self.name, filename, context.diff, token_budget)
+
+        # Input dict keys must match template variables AND passthrough keys
+        chain_input = {
+            "filename": filename,
+            "diff": context.diff,
+            "file_content": context.after,
+            **{field: build(context) for field, build in self.context_inputs.items()},
+            "format_instructions": self.parser.get_format_instructions(),
+        }
+        if token_budget:
+            chain_input = fit_prompt_input(chain_input, self.measure_prompt, token_budget, f"{self.log_prefix} {filename}:")
+        return chain_input
+
+    def build_chain_inputs(self, _state: ReviewState, llm: Optional[BaseChatModel] = None) -> Dict[str, dict]:
+        """Builds one chain input per reviewable file, in file_contexts order. Batch jobs pass no `llm`: they use the main model."""
+        chain_inputs: Dict[str, dict] = {}
+        token_budget = prompt_token_budget(_state)
+        for filename, context in _state.file_contexts.items():
+            chain_input = self.build_chain_input(filename, context, token_budget, llm)
+            if chain_input is not None:
+                chain_inputs[filename] = chain_input
+        return chain_inputs
+
+    def filter_result(self, result: dict) -> Dict[str, List[Comment]]:
+        """Keeps only comments that land on lines added in the file's diff."""
+        return {self.name: filter_comments_to_diff(result['parsed_response'].comments, result['diff'],
+                                                   result['filename'], agent_name=self.name)}
+
+    def to_cached(self, comments_by_agent: Dict[str, List[Comment]]) -> Any:
+        return [c.model_dump() for c in comments_by_agent[self.name]]
+
+    def from_cached(self, cached: Any) -> Dict[str, List[Comment]]:
+        return {self.name: [Comment(**c) for c in cached]}
+
+    def _empty(self) -> Dict[str, List[Comment]]:
+        return {name: [] for name in self.result_names}
+
+    def collect_results(self, chain_inputs: Dict[str, dict], results: Dict[str, Any], cached: Dict[str, Any],
+                        review_cache: Optional[ReviewCache], cache_keys: Dict[str, Optional[str]]) -> dict:
+        """Filters per-file results to the diff, stores them for later runs and builds the node's state update."""
+        # Collect in file_contexts order so comment order doesn't depend on completion order
+        comments_by_agent = self._empty()
+        for filename in chain_inputs:
+            if filename in cached:
+                file_comments = self.from_cached(cached[filename])
+            else:
+                result = results[filename]
+                if isinstance(result, Exception):
+                    print(f"{self.log_prefix} Error processing {filename}: {result}")
+                    continue
+                file_comments = self.filter_result(result)
+                store_file(review_cache, cache_keys[filename], self.name, filename, self.to_cached(file_comments))
+            for agent_name, comments in file_comments.items():
+                comments_by_agent[agent_name].extend(comments)
+
+        # Parallel branch: return only the agent_results entries, merged by the graph reducer
+        return {
+            "agent_results": {
+                agent_name: AgentResult(agent_name=agent_name, comments=comments).model_dump()
+                for agent_name, comments in comments_by_agent.items()
+            }
+        }
+
+    def review_single_file(self, llm: BaseChatModel, filename: str, context: FileContext,
+                           review_cache: Optional[ReviewCache] = None, token_budget: Optional[int] = None,
+                           config: Optional[RunnableConfig] = None) -> Dict[str, List[Comment]]:
+        """Per-file entry point for the per-file review pipeline. Returns {agent_name: comments}."""
+        chain_input = self.build_chain_input(filename, context, token_budget, llm)
+        if chain_input is None:
+            return self._empty()
+        cache_key, cached = lookup_file(review_cache, self.name, self.version, context, cache_extra(chain_input, self.cache_fields))
+        if cached is not None:
+            return self.from_cached(cached)
+        try:
+            result = self.build_chain(llm).invoke(chain_input, config=with_metadata(config, agent=self.name, file=filename))
+        except Exception as e:
+            print(f"{self.log_prefix} Error processing {filename}: {e}")
+            return self._empty()
+        comments_by_agent = self.filter_result(result)
+        store_file(review_cache, cache_key, self.name, filename, self.to_cached(comments_by_agent))
+        return comments_by_agent
+
+    async def areview_single_file(self, llm: BaseChatModel, filename: str, context: FileContext,
+                                  review_cache: Optional[ReviewCache] = None, token_budget: Optional[int] = None,
+                                  config: Optional[RunnableConfig] = None) -> Dict[str, List[Comment]]:
+        """Async variant of review_single_file."""
+        chain_input = self.build_chain_input(filename, context, token_budget, llm)
+        if chain_input is None:
+            return self._empty()
+        cache_key, cached = lookup_file(review_cache, self.name, self.version, context, cache_extra(chain_input, self.cache_fields))
+        if cached is not None:
+            return self.from_cached(cached)
+        try:
+            result = await self.build_chain(llm).ainvoke(chain_input, config=with_metadata(config, agent=self.name, file=filename))
+        except Exception as e:
+            print(f"{self.log_prefix} Error processing {filename}: {e}")
+            return self._empty()
+        comments_by_agent = self.filter_result(result)
+        store_file(review_cache, cache_key, self.name, filename, self.to_cached(comments_by_agent))
+        return comments_by_agent
+
+    def _llm_unavailable_result(self) -> dict:
+        print(f"{self.log_prefix} LLM not available, skipping.")
+        return {
+            "agent_results": {
+                agent_name: AgentResult(agent_name=agent_name, comments=[], reasoning="LLM not available").model_dump()
+                for agent_name in self.result_names
+            }
+        }
+
+    def _prepare(self, _state: ReviewState, llm: BaseChatModel):
+        """(review_cache, chain_inputs, cached, pending, cache_keys) for a node run."""
+        review_cache = get_review_cache(_state)
+        chain_inputs = self.build_chain_inputs(_state, llm)
+        cached, pending, cache_keys = partition_cached(review_cache, self.name, self.version, _state.file_contexts,
+                                                       chain_inputs, self.cache_fields)
+        print(f"{self.log_prefix} Processing {len(pending)} files (max concurrency {_state.max_concurrency})...")
+        return review_cache, chain_inputs, cached, pending, cache_keys
+
+    def run(self, state: dict) -> dict:
+        """Graph node body: reviews every changed file, with bounded concurrency."""
+        _state = ensure_review_state(state)
+        llm = get_llm(_state)
+        if not llm:
+            return self._llm_unavailable_result()
+
+        review_cache, chain_inputs, cached, pending, cache_keys = self._prepare(_state, llm)
+        telemetry = LLMTelemetryHandler(_state)
+        results = run_chain_per_file(self.build_chain(llm), pending, _state.max_concurrency,
+                                     telemetry_config(telemetry, agent=self.name))
+        return {**self.collect_results(chain_inputs, results, cached, review_cache, cache_keys), "llm_calls": telemetry.records}
+
+    async def arun(self, state: dict) -> dict:
+        """Async variant of run: per-file calls go through ainvoke on the chain."""
+        _state = ensure_review_state(state)
+        llm = get_llm(_state)
+        if not llm:
+            return self._llm_unavailable_result()
+
+        review_cache, chain_inputs, cached, pending, cache_keys = self._prepare(_state, llm)
+        telemetry = LLMTelemetryHandler(_state)
+        results = await arun_chain_per_file(self.build_chain(llm), pending, _state.max_concurrency,
+                                            telemetry_config(telemetry, agent=self.name))
+        return {**self.collect_results(chain_inputs, results, cached, review_cache, cache_keys), "llm_calls": telemetry.records}
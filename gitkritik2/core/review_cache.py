@@ -0,0 +1,138 @@
+# core/review_cache.py
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple, Union
+
+from gitkritik2.core.models import ReviewState, FileContext
+from gitkritik2.core.llm_interface import model_namespace
+from gitkritik2.core.utils import git_dir_file
+
+REVIEW_CACHE_FILENAME = "kritik-review-cache.sqlite"
+DEFAULT_REVIEW_CACHE_MAX_AGE_DAYS = 30
+
+
+def agent_version(*parts: Any) -> str:
+    """Short hash of everything that shapes an agent's output (prompt templates, format instructions, tools)."""
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class ReviewCache:
+    """
+    Per-file, per-agent results from earlier runs, keyed by the file's blob SHA and
+    the patch-id of its diff. A file whose content and hunks are unchanged since the
+    last push (or that was only rebased) reuses its stored comments instead of
+    calling the LLM again. Keys also carry the agent version and model settings,
+    so editing a prompt or switching models invalidates the affected entries.
+    """
+
+    def __init__(self, path: str, namespace: str, max_age_days: int = DEFAULT_REVIEW_CACHE_MAX_AGE_DAYS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_results ("
+            "key TEXT PRIMARY KEY, agent TEXT NOT NULL, file TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM review_results WHERE created_at < ?", (time.time() - max_age_days * 86400,))
+        self._conn.commit()
+
+    def key(self, agent_name: str, version: str, context: FileContext, extra: str = "") -> Optional[str]:
+        """None when the file has no blob SHA or patch-id (deleted file, git failure): never cached."""
+        if not context.blob_sha or not context.patch_id:
+            return None
+        parts = [agent_name, version, self.namespace, context.path, context.blob_sha, context.patch_id, extra]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def content_key(self, agent_name: str, version: str, content: str) -> str:
+        """Key for a value derived from `content` alone (e.g. a chunk of diffs), whatever file it came from."""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return hashlib.sha256("\0".join([agent_name, version, self.namespace, digest]).encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[Any]:
+        if key is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM review_results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: Optional[str], agent_name: str, filename: str, value: Any) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO review_results (key, agent, file, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, agent_name, filename, json.dumps(value), time.time()),
+            )
+            self._conn.commit()
+
+
+_stores: Dict[Tuple[str, str], ReviewCache] = {}
+_stores_lock = threading.Lock()
+
+
+def get_review_cache(_state: ReviewState) -> Optional[ReviewCache]:
+    """ReviewCache for this run's model settings, or None when disabled (--no-cache, review_cache: false)."""
+    if not _state.review_cache:
+        return None
+    path = os.path.expanduser(_state.review_cache_path) if _state.review_cache_path else git_dir_file(REVIEW_CACHE_FILENAME, os.getcwd())
+    namespace = model_namespace(_state)
+    if _state.routing:
+        # Routing changes which model reviews a file
+        namespace += "|routing:" + hashlib.sha256(json.dumps(_state.routing, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    with _stores_lock:
+        if (path, namespace) not in _stores:
+            try:
+                _stores[(path, namespace)] = ReviewCache(path, namespace)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[review_cache][WARN] Review cache disabled, cannot open {path}: {e}")
+                return None
+        return _stores[(path, namespace)]
+
+
+def lookup_file(review_cache: Optional[ReviewCache], agent_name: str, version: str,
+                context: FileContext, extra: str = "") -> Tuple[Optional[str], Optional[Any]]:
+    """Returns (key, stored value or None). Key is None if caching is off or the file isn't cacheable."""
+    if review_cache is None:
+        return None, None
+    key = review_cache.key(agent_name, version, context, extra)
+    return key, review_cache.get(key)
+
+
+def store_file(review_cache: Optional[ReviewCache], key: Optional[str], agent_name: str, filename: str, value: Any) -> None:
+    if review_cache is not None:
+        review_cache.put(key, agent_name, filename, value)
+
+
+def cache_extra(chain_input: dict, extra_field: Union[str, Tuple[str, ...], None]) -> str:
+    """The values of the input fields that are part of the cache key, besides the file itself."""
+    if not extra_field:
+        return ""
+    fields = (extra_field,) if isinstance(extra_field, str) else extra_field
+    return "\0".join(str(chain_input.get(field, "")) for field in fields)
+
+
+def partition_cached(review_cache: Optional[ReviewCache], agent_name: str, version: str,
+                     file_contexts: Dict[str, FileContext], inputs: Dict[str, dict],
+                     extra_field: Union[str, Tuple[str, ...], None] = None) -> Tuple[Dict[str, Any], Dict[str, dict], Dict[str, Optional[str]]]:
+    """
+    Splits an agent's per-file inputs into (cached values, inputs still needing an LLM call, cache keys).
+    `extra_field` names the input field(s) (e.g. symbol_context) that are also part of the key.
+    """
+    cached: Dict[str, Any] = {}
+    pending: Dict[str, dict] = {}
+    keys: Dict[str, Optional[str]] = {}
+    for filename, chain_input in inputs.items():
+        extra = cache_extra(chain_input, extra_field)
+        keys[filename], value = lookup_file(review_cache, agent_name, version, file_contexts[filename], extra)
+        if value is not None:
+            cached[filename] = value
+        else:
+            pending[filename] = chain_input
+    if cached:
+        print(f"[review_cache] {agent_name}: reusing results for {len(cached)} unchanged files, {len(pending)} to review")
+    return cached, pending, keys
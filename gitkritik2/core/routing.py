@@ -0,0 +1,162 @@
+# core/routing.py
+import re
+import threading
+from fnmatch import fnmatch
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable, RunnableConfig
+
+# Branching and concurrency constructs across common languages; each occurrence on an added line adds 1
+CONTROL_FLOW_PATTERN = re.compile(
+    r"\b(if|elif|else|for|foreach|while|switch|case|match|try|except|catch|finally|raise|throw|"
+    r"async|await|yield|lock|synchronized|goto|select|defer|go)\b|&&|\|\|"
+)
+# Rule conditions; a rule matches when all of its conditions do
+RULE_CONDITIONS = ("agents", "files", "min_diff_lines", "max_diff_lines", "min_complexity", "max_complexity")
+
+
+class FileFeatures(NamedTuple):
+    diff_lines: int # Added + removed lines
+    hunks: int
+    complexity: int # hunks + control-flow keywords on added lines
+
+
+def file_features(diff: str) -> FileFeatures:
+    """Cheap size and complexity measures of one file's diff."""
+    diff_lines = hunks = keywords = 0
+    for line in diff.splitlines():
+        if line.startswith("@@"):
+            hunks += 1
+        elif line.startswith(("+++", "---")):
+            continue
+        elif line.startswith(("+", "-")):
+            diff_lines += 1
+            if line.startswith("+"):
+                keywords += len(CONTROL_FLOW_PATTERN.findall(line[1:]))
+    return FileFeatures(diff_lines, hunks, hunks + keywords)
+
+
+def rule_matches(rule: dict, agent: str, filename: Optional[str], features: FileFeatures) -> bool:
+    agents = rule.get("agents")
+    if agents is not None and agent not in ([agents] if isinstance(agents, str) else agents):
+        return False
+    files = rule.get("files")
+    if files is not None:
+        patterns = [files] if isinstance(files, str) else files
+        # Patterns without a directory match the basename anywhere, like .gitignore
+        if not filename or not any(fnmatch(filename, p) or ("/" not in p and fnmatch(filename.rsplit("/", 1)[-1], p))
+                                   for p in patterns):
+            return False
+    bounds = (("min_diff_lines", features.diff_lines, 1), ("max_diff_lines", features.diff_lines, -1),
+              ("min_complexity", features.complexity, 1), ("max_complexity", features.complexity, -1))
+    for key, value, direction in bounds:
+        if rule.get(key) is not None and (value - int(rule[key])) * direction < 0:
+            return False
+    return True
+
+
+def route(rules: List[dict], agent: str, filename: Optional[str], diff: str) -> Optional[dict]:
+    """The first rule matching this agent and file, or None to use the main model."""
+    features = file_features(diff or "")
+    return next((rule for rule in rules if rule_matches(rule, agent, filename, features)), None)
+
+
+def model_name(spec: dict) -> str:
+    return f"{spec['llm_provider']}/{spec['model']}"
+
+
+class RoutingSetup(NamedTuple):
+    rules: List[dict] # [{<conditions>, llm_provider, model, base_url?}], first match wins
+    default: dict # {llm_provider, model} of the main model
+    escalate_to: dict # Model retried when a routed model's output can't be parsed
+    llm_for: Callable[[dict], Optional[BaseChatModel]] # get_llm for a {llm_provider, model, base_url?} spec
+    budget_for: Optional[Callable[[dict], int]] = None # prompt_token_budget for a spec; None: the main model's
+
+
+_setups: Dict[int, RoutingSetup] = {}
+
+
+def register_routing(llm: BaseChatModel, setup: RoutingSetup) -> None:
+    _setups[id(llm)] = setup
+
+
+def routed_prompt_budget(llm: BaseChatModel, agent: str, filename: Optional[str], diff: str, budget: int) -> int:
+    """
+    Prompt budget for one file's call on `llm`: `budget` (the main model's) when no routing
+    is set up, otherwise the smallest budget of the model the file is routed to and the
+    escalation model the call may be repeated on.
+    """
+    setup = _setups.get(id(llm))
+    if setup is None:
+        return budget
+    spec = route(setup.rules, agent, filename, diff) or setup.default
+    specs = [spec] + ([setup.escalate_to] if model_name(setup.escalate_to) != model_name(spec) else [])
+    default = model_name(setup.default)
+    return min(budget if model_name(s) == default or setup.budget_for is None else setup.budget_for(s) for s in specs)
+
+
+class RoutedRunnable(Runnable):
+    """
+    Picks the model per call from the input's 'filename' and 'diff' and runs the agent's
+    chain built on it. When the routed model's output fails the agent's parser, the call
+    is repeated once on the escalation model.
+    """
+
+    def __init__(self, llm: BaseChatModel, agent: str, build_chain: Callable[[BaseChatModel], Runnable], setup: RoutingSetup):
+        self.llm = llm
+        self.agent = agent
+        self.build_chain = build_chain
+        self.setup = setup
+        self._chains: Dict[str, Runnable] = {}
+        self._lock = threading.Lock()
+
+    def _chain(self, spec: dict) -> Runnable:
+        key = model_name(spec)
+        with self._lock:
+            if key not in self._chains:
+                llm = self.llm if key == model_name(self.setup.default) else self.setup.llm_for(spec)
+                if llm is None:
+                    print(f"[routing][WARN] {key} unavailable, using {model_name(self.setup.default)}")
+                    llm = self.llm
+                self._chains[key] = self.build_chain(llm)
+            return self._chains[key]
+
+    def _plan(self, input: dict):
+        rule = route(self.setup.rules, self.agent, input.get("filename"), input.get("diff") or "")
+        if rule is not None:
+            print(f"[routing] {self.agent} {input.get('filename')}: {model_name(rule)}")
+        spec = rule or self.setup.default
+        escalation = self.setup.escalate_to if model_name(self.setup.escalate_to) != model_name(spec) else None
+        return spec, escalation
+
+    def invoke(self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        spec, escalation = self._plan(input)
+        try:
+            return self._chain(spec).invoke(input, config, **kwargs)
+        except OutputParserException:
+            if escalation is None:
+                raise
+            print(f"[routing] {self.agent} {input.get('filename')}: unparseable output from {model_name(spec)}, "
+                  f"escalating to {model_name(escalation)}")
+            return self._chain(escalation).invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        spec, escalation = self._plan(input)
+        try:
+            return await self._chain(spec).ainvoke(input, config, **kwargs)
+        except OutputParserException:
+            if escalation is None:
+                raise
+            print(f"[routing] {self.agent} {input.get('filename')}: unparseable output from {model_name(spec)}, "
+                  f"escalating to {model_name(escalation)}")
+            return await self._chain(escalation).ainvoke(input, config, **kwargs)
+
+
+def routed_chain(llm: BaseChatModel, agent: str, build_chain: Callable[[BaseChatModel], Runnable]) -> Runnable:
+    """build_chain(llm), or a RoutedRunnable choosing the model per file when get_llm set up routing for `llm`."""
+    setup = _setups.get(id(llm))
+    if setup is None:
+        return build_chain(llm)
+    return RoutedRunnable(llm, agent, build_chain, setup)
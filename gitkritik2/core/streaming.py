@@ -0,0 +1,183 @@
+# core/streaming.py
+import os
+import json
+import threading
+from typing import Any, Callable, List, Optional, Set
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import ensure_config
+from langchain_core.utils.json import parse_partial_json
+
+from gitkritik2.core.diff_utils import get_added_modified_line_numbers
+
+# Called with {'file', 'line', 'message', 'agent'} for each comment as soon as it has been streamed
+CommentListener = Callable[[dict], None]
+
+_listeners: List[CommentListener] = []
+_emitted: Set[tuple] = set() # Hedged calls stream the same file twice; show each comment once
+_lock = threading.Lock()
+
+
+def resolve_stream_comments(yaml_config: dict) -> bool:
+    """Env (GITKRITIK_STREAM_COMMENTS) > YAML (stream_comments) > on."""
+    setting = str(os.getenv("GITKRITIK_STREAM_COMMENTS") or yaml_config.get("stream_comments", True)).lower()
+    return setting not in ("false", "0", "no")
+
+
+def add_comment_listener(listener: CommentListener) -> None:
+    with _lock:
+        _listeners.append(listener)
+
+
+def remove_comment_listener(listener: CommentListener) -> None:
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def has_comment_listeners() -> bool:
+    return bool(_listeners)
+
+
+def _emit(comment: dict) -> None:
+    key = (comment["agent"], comment["file"], comment["line"], comment["message"])
+    with _lock:
+        if key in _emitted:
+            return
+        _emitted.add(key)
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(comment)
+        except Exception as e:
+            print(f"[streaming][WARN] Comment listener failed: {e}")
+
+
+def message_text(message: BaseMessage) -> str:
+    """The reply's text, or the JSON arguments of its tool call when the model answered through a tool."""
+    if isinstance(message.content, str):
+        text = message.content
+    else:
+        text = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in message.content)
+    if text.strip():
+        return text
+    # Streamed chunks carry partial argument strings; complete messages carry parsed or invalid calls
+    chunks = getattr(message, "tool_call_chunks", None)
+    if chunks:
+        return chunks[0].get("args") or ""
+    if getattr(message, "tool_calls", None):
+        return json.dumps(message.tool_calls[0]["args"])
+    invalid = getattr(message, "invalid_tool_calls", None)
+    return (invalid[0].get("args") or "") if invalid else text
+
+
+def partial_comments(text: str) -> List[Any]:
+    """
+    The 'comments' array of a partial JSON completion (optionally in a ```json fence),
+    with unfinished strings and objects closed. The last entry may still be incomplete.
+    """
+    start = text.find("{")
+    if start < 0:
+        return []
+    body = text[start:]
+    fence = body.rfind("```")
+    if fence > 0:
+        body = body[:fence]
+    parsed = parse_partial_json(body)
+    comments = parsed.get("comments") if isinstance(parsed, dict) else None
+    return comments if isinstance(comments, list) else []
+
+
+class CommentEmitter:
+    """
+    Follows one file's streamed completion and emits each comment once it is complete:
+    when the next comment starts, or when the stream ends. Comments on lines outside the
+    diff are skipped, as filter_comments_to_diff drops them from the final results.
+    """
+
+    def __init__(self, agent: str, filename: Optional[str], diff: Optional[str]):
+        self.agent = agent
+        self.filename = filename
+        self.changed_lines = get_added_modified_line_numbers(diff) if diff else None
+        self.emitted = 0
+        self._text = ""
+
+    def feed(self, text: str) -> None:
+        # A comment can only have finished if the new text closes an object
+        closes_object = "}" in text[len(self._text):]
+        self._text = text
+        if closes_object:
+            self._emit_up_to(partial_comments(text), final=False)
+
+    def finish(self, text: str) -> None:
+        self._emit_up_to(partial_comments(text), final=True)
+
+    def _emit_up_to(self, comments: List[Any], final: bool) -> None:
+        complete = comments if final else comments[:-1]
+        for raw in complete[self.emitted:]:
+            self.emitted += 1
+            if not isinstance(raw, dict) or not isinstance(raw.get("line"), int) or not raw.get("message"):
+                continue
+            if self.changed_lines is not None and raw["line"] not in self.changed_lines:
+                continue
+            _emit({
+                "file": self.filename or raw.get("file"), "line": raw["line"], "message": str(raw["message"]),
+                # Combined mode tags each comment with the agent it belongs to
+                "agent": raw.get("category") or self.agent,
+            })
+
+
+class CommentStreamingCall(Runnable):
+    """
+    `prompt | model` for the review agents. While a comment listener is registered (a local
+    run showing results as they arrive) the completion is streamed and each finished comment
+    is emitted right away; the full message is still returned for the agent's parser.
+    The input must carry 'filename' and 'diff'; the agent name comes from the run metadata.
+    """
+
+    def __init__(self, prompt: BasePromptTemplate, model: BaseChatModel):
+        self.prompt = prompt
+        self.model = model
+        self._chain = prompt | model
+
+    def _emitter(self, input: dict, config: RunnableConfig) -> CommentEmitter:
+        agent = (config.get("metadata") or {}).get("agent") or "review"
+        return CommentEmitter(agent, input.get("filename"), input.get("diff"))
+
+    def invoke(self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        if not has_comment_listeners():
+            return self._chain.invoke(input, config, **kwargs)
+        config = ensure_config(config)
+        emitter = self._emitter(input, config)
+        prompt_value = self.prompt.invoke(input, config)
+        message = None
+        for chunk in self.model.stream(prompt_value, config, **kwargs):
+            message = chunk if message is None else message + chunk
+            emitter.feed(message_text(message))
+        if message is None:
+            raise ValueError("Model returned an empty stream")
+        emitter.finish(message_text(message))
+        return message
+
+    async def ainvoke(self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        if not has_comment_listeners():
+            return await self._chain.ainvoke(input, config, **kwargs)
+        config = ensure_config(config)
+        emitter = self._emitter(input, config)
+        prompt_value = await self.prompt.ainvoke(input, config)
+        message = None
+        async for chunk in self.model.astream(prompt_value, config, **kwargs):
+            message = chunk if message is None else message + chunk
+            emitter.feed(message_text(message))
+        if message is None:
+            raise ValueError("Model returned an empty stream")
+        emitter.finish(message_text(message))
+        return message
+
+
+def streamed_review(prompt: BasePromptTemplate, model: BaseChatModel) -> Runnable:
+    """Drop-in for `prompt | model` in a review chain, see CommentStreamingCall."""
+    return CommentStreamingCall(prompt, model)
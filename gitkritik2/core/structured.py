@@ -0,0 +1,174 @@
+# core/structured.py
+import json
+import re
+from typing import Any, List, Optional, Set, Type, get_args
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import Generation
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.utils.json import parse_partial_json
+from pydantic import BaseModel, ValidationError
+
+from gitkritik2.core.streaming import message_text, streamed_review
+
+# Providers whose models reliably answer through a forced tool call (the schema travels as
+# the tool definition instead of format instructions in the prompt)
+NATIVE_OUTPUT_PROVIDERS = ("openai", "anthropic", "gemini")
+# Replaces the JSON schema in the prompt when the model answers through the tool
+NATIVE_FORMAT_INSTRUCTIONS = (
+    "Report your findings by calling the {tool} tool. Use an empty comments list if there is nothing to report."
+)
+RETRY_INSTRUCTIONS = (
+    "Your previous reply could not be parsed: {error}\n"
+    "Send the complete review again, following the format instructions exactly."
+)
+MAX_RETRY_ERROR_CHARS = 500
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"'})
+
+_native: Set[int] = set()
+
+
+def register_native_output(llm: BaseChatModel) -> None:
+    _native.add(id(llm))
+
+
+def uses_native_output(llm: BaseChatModel) -> bool:
+    return id(llm) in _native
+
+
+def repair_json(text: str) -> Any:
+    """
+    Best-effort parse of a malformed JSON reply: takes the first value inside a ```json
+    fence or after leading prose, ignores trailing text, drops trailing commas and closes
+    a reply cut off mid-object. Raises ValueError if nothing can be recovered.
+    """
+    fenced = _FENCE_PATTERN.search(text)
+    body = fenced.group(1) if fenced else text
+    starts = [i for i in (body.find("{"), body.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("no JSON object in reply")
+    body = _TRAILING_COMMA_PATTERN.sub(r"\1", body[min(starts):].translate(_SMART_QUOTES))
+    try:
+        # strict=False accepts raw newlines and tabs inside strings
+        return json.JSONDecoder(strict=False).raw_decode(body)[0]
+    except json.JSONDecodeError:
+        pass
+    repaired = parse_partial_json(body)
+    if repaired is None:
+        raise ValueError("reply is not repairable JSON")
+    return repaired
+
+
+class ReviewOutputParser(PydanticOutputParser):
+    """
+    PydanticOutputParser for the review agents' responses. Also reads the arguments of a
+    native tool call, and repairs malformed JSON locally before failing: one bad comment
+    is dropped instead of the whole file's result.
+    """
+
+    def _item_type(self) -> Optional[Type[BaseModel]]:
+        args = get_args(self.pydantic_object.model_fields["comments"].annotation)
+        return args[0] if args else None
+
+    def _salvage(self, data: Any, error: Exception, text: str) -> BaseModel:
+        """Validates comments one at a time, keeping the valid ones."""
+        if isinstance(data, dict) and not isinstance(data.get("comments"), list):
+            lists = [value for value in data.values() if isinstance(value, list)]
+            # A single comment, or the list under another key
+            data = [data] if "line" in data else lists[0] if len(lists) == 1 else None
+        items = data if isinstance(data, list) else data.get("comments") if isinstance(data, dict) else None
+        if items is None:
+            raise OutputParserException(f"Reply has no comments list: {error}", llm_output=text)
+        item_type = self._item_type()
+        comments: List[BaseModel] = []
+        for item in items:
+            try:
+                comments.append(item_type.model_validate(item))
+            except ValidationError:
+                continue
+        if items and not comments:
+            raise OutputParserException(f"No valid comments in reply: {error}", llm_output=text)
+        if len(comments) < len(items):
+            print(f"[structured] Dropped {len(items) - len(comments)} of {len(items)} malformed comments")
+        return self.pydantic_object(comments=comments)
+
+    def _from_data(self, data: Any, text: str) -> BaseModel:
+        try:
+            return self.pydantic_object.model_validate(data)
+        except ValidationError as e:
+            return self._salvage(data, e, text)
+
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> Any:
+        message: Optional[BaseMessage] = getattr(result[0], "message", None)
+        if message is not None and getattr(message, "tool_calls", None):
+            return self._from_data(message.tool_calls[0]["args"], message_text(message))
+        text = message_text(message) if message is not None else result[0].text
+        try:
+            return self._from_data(json.loads(text), text)
+        except (json.JSONDecodeError, OutputParserException) as e:
+            error = e
+        try:
+            data = repair_json(text)
+        except ValueError as e:
+            raise OutputParserException(f"Invalid JSON reply ({e}): {error}", llm_output=text) from error
+        return self._from_data(data, text)
+
+
+class StructuredReviewCall(Runnable):
+    """
+    `prompt | model | parser` for the review agents. Models registered for native output
+    answer through a forced tool call carrying the response schema, so the prompt's format
+    instructions shrink to one line. A reply that can't be parsed even after local repair
+    gets one retry that shows the model its reply and the parse error.
+    """
+
+    def __init__(self, prompt: BasePromptTemplate, model: BaseChatModel, parser: ReviewOutputParser):
+        self.prompt = prompt
+        self.parser = parser
+        self.tool = parser.pydantic_object.__name__
+        self.native = uses_native_output(model)
+        self.model = model.bind_tools([parser.pydantic_object], tool_choice=self.tool) if self.native else model
+        self._call = streamed_review(prompt, self.model)
+
+    def _input(self, input: dict) -> dict:
+        if not self.native:
+            return input
+        return {**input, "format_instructions": NATIVE_FORMAT_INSTRUCTIONS.format(tool=self.tool)}
+
+    def _retry_messages(self, input: dict, message: BaseMessage, error: Exception) -> List[BaseMessage]:
+        print(f"[structured] {input.get('filename')}: unparseable reply, retrying once")
+        return [
+            *self.prompt.format_messages(**input),
+            AIMessage(content=message_text(message)),
+            HumanMessage(content=RETRY_INSTRUCTIONS.format(error=str(error)[:MAX_RETRY_ERROR_CHARS])),
+        ]
+
+    def invoke(self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseModel:
+        input = self._input(input)
+        message = self._call.invoke(input, config, **kwargs)
+        try:
+            return self.parser.invoke(message)
+        except OutputParserException as e:
+            retry = self.model.invoke(self._retry_messages(input, message, e), config, **kwargs)
+            return self.parser.invoke(retry)
+
+    async def ainvoke(self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseModel:
+        input = self._input(input)
+        message = await self._call.ainvoke(input, config, **kwargs)
+        try:
+            return await self.parser.ainvoke(message)
+        except OutputParserException as e:
+            retry = await self.model.ainvoke(self._retry_messages(input, message, e), config, **kwargs)
+            return await self.parser.ainvoke(retry)
+
+
+def structured_review(prompt: BasePromptTemplate, model: BaseChatModel, parser: ReviewOutputParser) -> Runnable:
+    """Drop-in for `streamed_review(prompt, model) | parser` in a review chain, see StructuredReviewCall."""
+    return StructuredReviewCall(prompt, model, parser)
@@ -0,0 +1,385 @@
+# core/symbol_extractors.py
+import ast
+import os
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+MAX_SIGNATURE_CHARS = 300
+MAX_DOCSTRING_CHARS = 1500
+MAX_SIGNATURE_LINES = 6 # A declaration whose parameters span more lines is cut off
+MAX_REFERENCE_TEXT_CHARS = 160
+# Preferred definition when a name is defined more than once in a file
+KIND_ORDER = ("class", "interface", "struct", "enum", "type", "function", "method", "variable")
+
+
+class Symbol(NamedTuple):
+    name: str
+    qualname: str # 'Class.method' for members, same as name at module level
+    path: str # Project-relative, '/'-separated
+    kind: str # One of KIND_ORDER
+    line: int
+    signature: str
+    docstring: str
+
+
+class Reference(NamedTuple):
+    name: str # Called name, without its qualifier: `f` for both `f()` and `mod.f()`
+    path: str
+    line: int
+    caller: str # Qualname of the enclosing function or class, '' at module level
+    text: str # The source line, stripped
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def best_first(symbols: List[Symbol], name: str) -> List[Symbol]:
+    """
+    The symbols defining `name` (a plain or 'Class.member' name), best match first:
+    module-level before members, then by KIND_ORDER and position.
+    """
+    matches = [s for s in symbols if (s.qualname if "." in name else s.name) == name]
+    rank = lambda kind: KIND_ORDER.index(kind) if kind in KIND_ORDER else len(KIND_ORDER)
+    return sorted(matches, key=lambda s: (s.qualname != name, rank(s.kind), s.path, s.line))
+
+
+# --- Python ---
+
+def _python_signature(node: ast.AST) -> str:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+        returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+        return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(base) for base in node.bases] + [ast.unparse(keyword) for keyword in node.keywords]
+        return f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+    # Module or class level assignment
+    return ast.unparse(node).splitlines()[0]
+
+
+def python_symbols(path: str, source: str) -> List[Symbol]:
+    """Classes, functions, methods and module/class-level variables of a Python file. Raises SyntaxError."""
+    symbols: List[Symbol] = []
+
+    def visit(body: List[ast.stmt], scope: str) -> None:
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = "class" if isinstance(node, ast.ClassDef) else "method" if scope else "function"
+                qualname = f"{scope}.{node.name}" if scope else node.name
+                symbols.append(Symbol(node.name, qualname, path, kind, node.lineno,
+                                      _truncate(_python_signature(node), MAX_SIGNATURE_CHARS),
+                                      _truncate(ast.get_docstring(node) or "", MAX_DOCSTRING_CHARS)))
+                if isinstance(node, ast.ClassDef):
+                    visit(node.body, qualname)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        qualname = f"{scope}.{target.id}" if scope else target.id
+                        symbols.append(Symbol(target.id, qualname, path, "variable", node.lineno,
+                                              _truncate(_python_signature(node), MAX_SIGNATURE_CHARS), ""))
+
+    visit(ast.parse(source).body, "")
+    return symbols
+
+
+def python_references(path: str, source: str) -> List[Reference]:
+    """Call sites (including class instantiations) in a Python file. Raises SyntaxError."""
+    lines = source.splitlines()
+    references: List[Reference] = []
+
+    def visit(node: ast.AST, caller: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                visit(child, f"{caller}.{child.name}" if caller else child.name)
+                continue
+            if isinstance(child, ast.Call):
+                func = child.func
+                name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+                if name and 0 < child.lineno <= len(lines):
+                    references.append(Reference(name, path, child.lineno, caller,
+                                                _truncate(lines[child.lineno - 1].strip(), MAX_REFERENCE_TEXT_CHARS)))
+            visit(child, caller)
+
+    visit(ast.parse(source), "")
+    return references
+
+
+# --- C-family languages (JS/TS, Go, Java): line-based, ctags-style ---
+
+# Comments and string literals, blanked before declarations and braces are matched
+_COMMENT_OR_STRING = re.compile(
+    r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`", re.DOTALL
+)
+
+
+def strip_comments_and_strings(source: str) -> str:
+    """`source` with comments and string literals blanked out; line and column positions are kept."""
+    return _COMMENT_OR_STRING.sub(lambda m: re.sub(r"[^\n]", " ", m.group(0)), source)
+
+
+def _leading_comment(raw_lines: List[str], index: int) -> str:
+    """The /** */ block or run of // lines right above line `index` (annotations in between are skipped)."""
+    i = index - 1
+    while i >= 0 and raw_lines[i].strip().startswith("@"):
+        i -= 1
+    if i < 0:
+        return ""
+    if raw_lines[i].strip().endswith("*/"):
+        end = i
+        while i >= 0 and "/*" not in raw_lines[i]:
+            i -= 1
+        if i < 0:
+            return ""
+        block = "\n".join(raw_lines[i:end + 1])
+        block = block[block.index("/*") + 2:block.rindex("*/")].lstrip("*")
+        lines = [re.sub(r"^\s*\*? ?", "", line).rstrip() for line in block.splitlines()]
+    else:
+        start = i
+        while i >= 0 and raw_lines[i].strip().startswith("//"):
+            i -= 1
+        lines = [line.strip()[2:].lstrip("/").strip() for line in raw_lines[i + 1:start + 1]]
+    return _truncate("\n".join(lines).strip(), MAX_DOCSTRING_CHARS)
+
+
+def _signature(raw_lines: List[str], code_lines: List[str], index: int) -> str:
+    """The declaration starting at line `index`, up to its body's brace, joined onto one line."""
+    parts: List[str] = []
+    depth = 0
+    for i in range(index, min(index + MAX_SIGNATURE_LINES, len(code_lines))):
+        code = code_lines[i]
+        cut = len(code)
+        for column, char in enumerate(code):
+            if char in "([":
+                depth += 1
+            elif char in ")]":
+                depth -= 1
+            elif depth <= 0 and (char == "{" or char == ";" or code.startswith("=>", column)):
+                cut = column
+                break
+        parts.append(raw_lines[i][:cut].strip())
+        if cut < len(code) or depth <= 0:
+            break
+    return _truncate(" ".join(part for part in parts if part), MAX_SIGNATURE_CHARS)
+
+
+class _Scanner:
+    """Walks a C-family file line by line, tracking brace depth and the enclosing type declarations."""
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.raw_lines = source.splitlines()
+        self.code_lines = strip_comments_and_strings(source).splitlines()
+        self.symbols: List[Symbol] = []
+        self.scopes: List[List] = [] # [qualname, brace depth of its body, body opened yet, declaration line]
+
+    def lines(self):
+        """Yields (index, code line, depth at line start, enclosing qualname or '')."""
+        depth = 0
+        for index, code in enumerate(self.code_lines):
+            if self.scopes and depth >= self.scopes[-1][1]:
+                self.scopes[-1][2] = True
+            # The body's brace may come a few lines after the declaration, or never (`class A {}`, `;`)
+            while self.scopes and depth < self.scopes[-1][1] and (
+                    self.scopes[-1][2] or index - self.scopes[-1][3] > MAX_SIGNATURE_LINES):
+                self.scopes.pop()
+            yield index, code, depth, self.scope(depth)
+            depth += code.count("{") - code.count("}")
+
+    def scope(self, depth: int) -> Optional[str]:
+        """Qualname of the type whose body is at `depth`, '' at file level, None anywhere else (function bodies)."""
+        if depth == 0:
+            return ""
+        if self.scopes and self.scopes[-1][1] == depth:
+            return self.scopes[-1][0]
+        return None
+
+    def add(self, name: str, kind: str, index: int, scope: str, depth: int, opens_scope: bool = False) -> None:
+        qualname = f"{scope}.{name}" if scope else name
+        self.symbols.append(Symbol(name, qualname, self.path, kind, index + 1,
+                                   _signature(self.raw_lines, self.code_lines, index),
+                                   _leading_comment(self.raw_lines, index)))
+        if opens_scope:
+            code = self.code_lines[index]
+            if "{" not in code or code.count("{") > code.count("}"):
+                self.scopes.append([qualname, depth + 1, False, index])
+
+
+_JS_CONTROL_WORDS = {"if", "for", "while", "switch", "catch", "return", "function", "with", "else", "do", "try", "new", "super"}
+_JS_FUNCTION = re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:async\s+)?function\b\s*\*?\s*([\w$]+)")
+_JS_CLASS = re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?class\s+(?!extends\b|implements\b)([\w$]+)")
+_TS_TYPE = re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:(interface|enum)|const\s+(enum)|(type)(?=\s+[\w$]+\s*(?:<[^=]*>)?\s*=))\s+([\w$]+)")
+_JS_VARIABLE = re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?(?:const|let|var)\s+([\w$]+)\s*(?::[^=]*)?(=?)(.*)")
+_JS_EXPORTS = re.compile(r"^\s*(?:module\.)?exports\.([\w$]+)\s*=(.*)")
+_JS_MEMBER = re.compile(
+    r"^\s*(?:(?:public|private|protected|static|readonly|abstract|override|async|declare|get|set)\s+)*\*?\s*(#?[\w$]+)\s*[?!]?\s*(\(|<|:|=)"
+)
+
+
+def _js_value_kind(value: str) -> str:
+    return "function" if re.match(r"\s*(?:async\s+)?(?:function\b|(?:\([^)]*\)|[\w$]+)\s*(?::[^=]*)?=>)", value) else "variable"
+
+
+def js_symbols(path: str, source: str) -> List[Symbol]:
+    """Functions, classes and their members, interfaces, types, enums and top-level variables of a JS/TS file."""
+    scanner = _Scanner(path, source)
+    for index, code, depth, scope in scanner.lines():
+        if scope is None:
+            continue
+        if scope == "":
+            match = _JS_FUNCTION.match(code)
+            if match:
+                scanner.add(match.group(1), "function", index, scope, depth)
+                continue
+            match = _JS_CLASS.match(code)
+            if match:
+                scanner.add(match.group(1), "class", index, scope, depth, opens_scope=True)
+                continue
+            match = _TS_TYPE.match(code)
+            if match:
+                kind = match.group(1) or match.group(2) or match.group(3)
+                scanner.add(match.group(4), kind if kind in ("interface", "enum") else "type", index, scope, depth)
+                continue
+            match = _JS_VARIABLE.match(code) or _JS_EXPORTS.match(code)
+            if match:
+                value = match.group(match.lastindex)
+                scanner.add(match.group(1), _js_value_kind(value), index, scope, depth)
+            continue
+        # Class body
+        match = _JS_MEMBER.match(code)
+        if match and match.group(1) not in _JS_CONTROL_WORDS:
+            is_method = match.group(2) in "(<" or _js_value_kind(code[match.end():]) == "function"
+            scanner.add(match.group(1), "method" if is_method else "variable", index, scope, depth)
+    return scanner.symbols
+
+
+_GO_FUNCTION = re.compile(r"^func\s+([A-Za-z_]\w*)\s*[\[(]")
+_GO_METHOD = re.compile(r"^func\s*\(\s*(?:[A-Za-z_]\w*\s+)?\*?\s*([A-Za-z_]\w*)(?:\[[^\]]*\])?\s*\)\s*([A-Za-z_]\w*)\s*[\[(]")
+_GO_TYPE = re.compile(r"^type\s+([A-Za-z_]\w*)(?:\[[^\]]*\])?\s*=?\s*(struct|interface)?")
+_GO_VALUE = re.compile(r"^(?:const|var)\s+([A-Za-z_]\w*)")
+_GO_GROUP = re.compile(r"^(const|var|type)\s*\(\s*$")
+_GO_GROUP_ITEM = re.compile(r"^\s*([A-Za-z_]\w*)(?:\[[^\]]*\])?\s*(struct|interface)?")
+
+
+def go_symbols(path: str, source: str) -> List[Symbol]:
+    """Functions, methods (as Type.Method), types, constants and package variables of a Go file."""
+    scanner = _Scanner(path, source)
+    group: Optional[str] = None # const, var or type inside a `const (` ... `)` block
+    for index, code, depth, scope in scanner.lines():
+        if depth != 0:
+            continue
+        if group is not None:
+            if code.strip().startswith(")"):
+                group = None
+                continue
+            match = _GO_GROUP_ITEM.match(code)
+            if match and code[:1].isspace():
+                kind = "variable" if group != "type" else "struct" if match.group(2) == "struct" else match.group(2) or "type"
+                scanner.add(match.group(1), kind, index, "", depth)
+            continue
+        match = _GO_GROUP.match(code)
+        if match:
+            group = match.group(1)
+            continue
+        match = _GO_METHOD.match(code)
+        if match:
+            scanner.add(match.group(2), "method", index, match.group(1), depth)
+            continue
+        match = _GO_FUNCTION.match(code)
+        if match:
+            scanner.add(match.group(1), "function", index, "", depth)
+            continue
+        match = _GO_TYPE.match(code)
+        if match:
+            scanner.add(match.group(1), match.group(2) or "type", index, "", depth)
+            continue
+        match = _GO_VALUE.match(code)
+        if match:
+            scanner.add(match.group(1), "variable", index, "", depth)
+    return scanner.symbols
+
+
+_JAVA_MODIFIERS = r"(?:(?:public|protected|private|abstract|static|final|sealed|non-sealed|strictfp|synchronized|native|default|transient|volatile)\s+)*"
+_JAVA_TYPE = re.compile(r"^\s*" + _JAVA_MODIFIERS + r"(class|interface|enum|record|@interface)\s+([A-Za-z_$][\w$]*)")
+_JAVA_METHOD = re.compile(r"^\s*" + _JAVA_MODIFIERS + r"(?:<[^>]*>\s*)?(?:[\w$.\[\]?]+(?:\s*<[^()]*>)?(?:\[\])*\s+)?([A-Za-z_$][\w$]*)\s*\(")
+_JAVA_FIELD = re.compile(r"^\s*" + _JAVA_MODIFIERS + r"[\w$.<>\[\]?, ]+?\s+([A-Za-z_$][\w$]*)\s*(?:=|;)")
+_JAVA_KEYWORDS = {"if", "for", "while", "switch", "catch", "return", "new", "throw", "else", "do", "try", "synchronized", "super", "this"}
+_JAVA_TYPE_KINDS = {"class": "class", "interface": "interface", "@interface": "interface", "enum": "enum", "record": "class"}
+
+
+def java_symbols(path: str, source: str) -> List[Symbol]:
+    """Classes, interfaces, enums and records (nested ones too), their methods, constructors and fields."""
+    scanner = _Scanner(path, source)
+    for index, code, depth, scope in scanner.lines():
+        if scope is None or (code.lstrip().startswith("@") and not code.lstrip().startswith("@interface")):
+            continue
+        match = _JAVA_TYPE.match(code)
+        if match:
+            scanner.add(match.group(2), _JAVA_TYPE_KINDS[match.group(1)], index, scope, depth, opens_scope=True)
+            continue
+        if scope == "":
+            continue
+        match = _JAVA_METHOD.match(code)
+        if match and match.group(1) not in _JAVA_KEYWORDS and "=" not in code[:match.start(1)]:
+            scanner.add(match.group(1), "method", index, scope, depth)
+            continue
+        match = _JAVA_FIELD.match(code)
+        if match and "(" not in code[:match.end(1)]:
+            scanner.add(match.group(1), "variable", index, scope, depth)
+    return scanner.symbols
+
+
+_CALL = re.compile(r"(?<![\w$])([A-Za-z_$][\w$]*)\s*(?:<[\w$.,\s\[\]<>?]*>)?\s*\(")
+_NOT_CALLS = {
+    "if", "for", "while", "switch", "catch", "return", "function", "typeof", "sizeof", "func", "super", "this",
+    "synchronized", "with", "await", "yield", "throw", "new", "else", "do", "try", "case", "import", "require",
+    "const", "var", "let", "type",
+}
+
+
+def c_family_references(path: str, source: str) -> List[Reference]:
+    """Call sites (`f(`, `obj.f(`, `new C(`) in a JS/TS, Go or Java file; declarations are skipped."""
+    extractor = extractor_for(path)
+    symbols = extractor(path, source) if extractor else []
+    declared = {(symbol.line, symbol.name) for symbol in symbols}
+    callers = sorted((s.line, s.qualname) for s in symbols if s.kind in ("function", "method"))
+    raw_lines = source.splitlines()
+    references: List[Reference] = []
+    caller_index = -1
+    for index, code in enumerate(strip_comments_and_strings(source).splitlines()):
+        while caller_index + 1 < len(callers) and callers[caller_index + 1][0] <= index + 1:
+            caller_index += 1
+        for match in _CALL.finditer(code):
+            name = match.group(1)
+            if name in _NOT_CALLS or (index + 1, name) in declared:
+                continue
+            references.append(Reference(name, path, index + 1, callers[caller_index][1] if caller_index >= 0 else "",
+                                        _truncate(raw_lines[index].strip(), MAX_REFERENCE_TEXT_CHARS)))
+    return references
+
+
+# Symbol extractors by file extension: (project-relative path, source) -> symbols.
+# Add a language by registering its extensions here; the index and lookups pick it up.
+EXTRACTORS: Dict[str, Callable[[str, str], List[Symbol]]] = {
+    ".py": python_symbols,
+    ".js": js_symbols, ".jsx": js_symbols, ".mjs": js_symbols, ".cjs": js_symbols,
+    ".ts": js_symbols, ".tsx": js_symbols, ".mts": js_symbols, ".cts": js_symbols,
+    ".go": go_symbols,
+    ".java": java_symbols,
+}
+
+
+# Call site extractors by file extension, for the index's reverse-dependency lookups
+REFERENCE_EXTRACTORS: Dict[str, Callable[[str, str], List[Reference]]] = {
+    extension: python_references if extractor is python_symbols else c_family_references
+    for extension, extractor in EXTRACTORS.items()
+}
+
+
+def extractor_for(path: str) -> Optional[Callable[[str, str], List[Symbol]]]:
+    return EXTRACTORS.get(os.path.splitext(path)[1].lower())
+
+
+def reference_extractor_for(path: str) -> Optional[Callable[[str, str], List[Reference]]]:
+    return REFERENCE_EXTRACTORS.get(os.path.splitext(path)[1].lower())
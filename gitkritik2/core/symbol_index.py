@@ -0,0 +1,231 @@
+# core/symbol_index.py
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from gitkritik2.core.import_resolver import import_targets
+from gitkritik2.core.symbol_extractors import Reference, Symbol, best_first, extractor_for, reference_extractor_for
+from gitkritik2.core.utils import git_dir_file, run_subprocess_command
+
+SYMBOL_INDEX_FILENAME = "kritik-symbol-index.sqlite"
+# Bump when extraction or the schema changes: older index files are rebuilt from scratch
+INDEX_VERSION = 3
+MAX_INDEXED_FILE_BYTES = 1_000_000 # Larger files are generated or vendored more often than not
+
+
+def blob_sha(data: bytes) -> str:
+    """Git's blob SHA-1 of `data`, equal to `git hash-object` of the file."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def format_symbol(symbol: Symbol, file_path: str, symbol_name: str) -> str:
+    """An index entry in the format symbol_definition returns."""
+    parts = [f"Definition found for '{symbol_name}' in '{file_path}':", f"Signature: `{symbol.signature}`"]
+    if symbol.docstring:
+        indented_docstring = "\n".join(f"  {line}" for line in symbol.docstring.splitlines())
+        parts.append(f"Docstring:\n```\n{indented_docstring}\n```")
+    return "\n".join(parts)
+
+
+class SymbolIndex:
+    """
+    Definitions of every indexed file in the project, in SQLite. Each file's row holds the
+    mtime and size it was indexed at and its blob SHA: refresh() only stats the files and
+    re-parses those whose content really changed, so reruns on a large repo cost a walk
+    over the file list. Lookups read rows instead of parsing the target file.
+    """
+
+    def __init__(self, path: str, project_root: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.project_root = project_root
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS files")
+            self._conn.execute("DROP TABLE IF EXISTS symbols")
+            self._conn.execute("DROP TABLE IF EXISTS refs")
+            self._conn.execute("DROP TABLE IF EXISTS imports")
+            self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, sha TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS symbols (name TEXT NOT NULL, qualname TEXT NOT NULL, path TEXT NOT NULL, "
+            "kind TEXT NOT NULL, line INTEGER NOT NULL, signature TEXT NOT NULL, docstring TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols (name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS symbols_by_path ON symbols (path)")
+        # Reverse dependencies: call sites by called name, and which files import which
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refs (name TEXT NOT NULL, path TEXT NOT NULL, line INTEGER NOT NULL, "
+            "caller TEXT NOT NULL, text TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS refs_by_name ON refs (name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS refs_by_path ON refs (path)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS imports (path TEXT NOT NULL, target TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS imports_by_target ON imports (target)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS imports_by_path ON imports (path)")
+        self._conn.commit()
+
+    def _list_files(self) -> List[str]:
+        """Tracked and untracked-but-not-ignored files with an extractor; a directory walk outside git."""
+        stdout, stderr = run_subprocess_command(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"], cwd=self.project_root)
+        if stdout is not None and not (stderr and not stdout):
+            paths = [p for p in stdout.split("\0") if p]
+        else:
+            paths = []
+            for directory, subdirs, filenames in os.walk(self.project_root):
+                subdirs[:] = [d for d in subdirs if not d.startswith(".")]
+                relative = os.path.relpath(directory, self.project_root)
+                paths.extend(os.path.join(relative, f).replace(os.sep, "/").removeprefix("./") for f in filenames)
+        return sorted(p for p in dict.fromkeys(paths) if extractor_for(p))
+
+    def _index_file(self, path: str, stat: os.stat_result, known_sha: Optional[str]) -> bool:
+        """(Re)indexes one file; returns False when only its mtime changed. Caller holds the lock and commits."""
+        try:
+            with open(os.path.join(self.project_root, path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        sha = blob_sha(data)
+        self._conn.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size, sha) VALUES (?, ?, ?, ?)",
+                           (path, stat.st_mtime_ns, stat.st_size, sha))
+        if sha == known_sha:
+            return False
+        self._remove_rows(path)
+        if len(data) > MAX_INDEXED_FILE_BYTES:
+            return True
+        source = data.decode("utf-8", errors="replace")
+        try:
+            symbols = extractor_for(path)(path, source)
+            references = reference_extractor_for(path)(path, source)
+        except (SyntaxError, ValueError, RecursionError) as e:
+            # Indexed as empty until the file changes again
+            print(f"[symbol_index][WARN] Cannot parse {path}: {e}")
+            symbols, references = [], []
+        self._conn.executemany(
+            "INSERT INTO symbols (name, qualname, path, kind, line, signature, docstring) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            symbols,
+        )
+        self._conn.executemany("INSERT INTO refs (name, path, line, caller, text) VALUES (?, ?, ?, ?, ?)", references)
+        if symbols or references:
+            self._conn.executemany("INSERT INTO imports (path, target) VALUES (?, ?)",
+                                   [(path, target) for target in import_targets(path, source, self.project_root)])
+        return True
+
+    def _remove_rows(self, path: str) -> None:
+        for table in ("symbols", "refs", "imports"):
+            self._conn.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+    def _stat(self, path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(os.path.join(self.project_root, path))
+        except OSError:
+            return None
+
+    def refresh(self) -> Tuple[int, int]:
+        """Brings the whole index up to date; returns (files re-parsed, files removed)."""
+        paths = self._list_files()
+        updated = 0
+        with self._lock:
+            known = {row[0]: row[1:] for row in self._conn.execute("SELECT path, mtime_ns, size, sha FROM files")}
+            for path in paths:
+                stat = self._stat(path)
+                if stat is None:
+                    continue
+                previous = known.get(path)
+                if previous is not None and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                updated += self._index_file(path, stat, previous[2] if previous else None)
+            current = set(paths)
+            removed = [path for path in known if path not in current]
+            for path in removed:
+                self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                self._remove_rows(path)
+            self._conn.commit()
+        print(f"[symbol_index] {len(paths)} files indexed, {updated} re-parsed, {len(removed)} removed")
+        return updated, len(removed)
+
+    def _ensure_current(self, path: str) -> None:
+        """Re-indexes `path` if it changed on disk since the last refresh (e.g. edited during the run)."""
+        stat = self._stat(path)
+        if stat is None or not extractor_for(path):
+            return
+        with self._lock:
+            row = self._conn.execute("SELECT mtime_ns, size, sha FROM files WHERE path = ?", (path,)).fetchone()
+            if row is None or tuple(row[:2]) != (stat.st_mtime_ns, stat.st_size):
+                self._index_file(path, stat, row[2] if row else None)
+                self._conn.commit()
+
+    def lookup(self, name: str, path: Optional[str] = None) -> List[Symbol]:
+        """
+        Definitions of `name` (a plain or 'Class.member' name), in `path` only when given,
+        best match first (see best_first).
+        """
+        if path is not None:
+            self._ensure_current(path)
+        column = "qualname" if "." in name else "name"
+        query = f"SELECT name, qualname, path, kind, line, signature, docstring FROM symbols WHERE {column} = ?"
+        params: Tuple = (name,)
+        if path is not None:
+            query += " AND path = ?"
+            params += (path,)
+        with self._lock:
+            symbols = [Symbol(*row) for row in self._conn.execute(query, params)]
+        return best_first(symbols, name)
+
+    def lookup_in_file(self, path: str, names: List[str]) -> Dict[str, List[Symbol]]:
+        """lookup() of several names in `path`: the file is checked for changes once and its rows read in one query."""
+        self._ensure_current(path)
+        with self._lock:
+            rows = [Symbol(*row) for row in self._conn.execute(
+                "SELECT name, qualname, path, kind, line, signature, docstring FROM symbols WHERE path = ?", (path,))]
+        return {name: best_first([s for s in rows if (s.qualname if "." in name else s.name) == name], name)
+                for name in names}
+
+    def call_sites(self, name: str, exclude_path: Optional[str] = None) -> List[Reference]:
+        """Indexed calls of `name` (unqualified), outside `exclude_path`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, path, line, caller, text FROM refs WHERE name = ? AND path != ? ORDER BY path, line",
+                (name, exclude_path or ""),
+            ).fetchall()
+        return [Reference(*row) for row in rows]
+
+    def importers(self, path: str) -> Set[str]:
+        """Files importing `path`, or its directory (Go packages, Java wildcard imports)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT path FROM imports WHERE target IN (?, ?)",
+                                      (path, os.path.dirname(path))).fetchall()
+        return {row[0] for row in rows}
+
+    def defining_files(self, name: str) -> Set[str]:
+        """Files defining a symbol named `name` (unqualified)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT path FROM symbols WHERE name = ?", (name,)).fetchall()
+        return {row[0] for row in rows}
+
+
+_indexes: Dict[str, SymbolIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(project_root: str, path: Optional[str] = None) -> Optional[SymbolIndex]:
+    """
+    The project's SymbolIndex (default .git/kritik-symbol-index.sqlite), opened and refreshed
+    once per process. None if it can't be opened: lookups then parse the files directly.
+    """
+    path = os.path.expanduser(path) if path else git_dir_file(SYMBOL_INDEX_FILENAME, project_root)
+    with _indexes_lock:
+        if path not in _indexes:
+            try:
+                index = SymbolIndex(path, project_root)
+                index.refresh()
+            except (OSError, sqlite3.Error) as e:
+                print(f"[symbol_index][WARN] Symbol index disabled, cannot open {path}: {e}")
+                return None
+            _indexes[path] = index
+        return _indexes[path]
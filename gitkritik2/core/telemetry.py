@@ -0,0 +1,281 @@
+# core/telemetry.py
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ensure_config
+
+from gitkritik2.core.models import ReviewState, LLMCallRecord
+from gitkritik2.core.tokens import estimate_tokens, estimate_messages_tokens
+
+# USD per million (input, output) tokens, list prices. Longest matching model prefix wins.
+# Override or extend with `prices:` in .kritikrc.yaml; these go stale, treat costs as estimates.
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    # OpenAI
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4-1106": (10.00, 30.00),
+    "gpt-4-0125": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "o1": (15.00, 60.00),
+    "o3-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+    "o4-mini": (1.10, 4.40),
+    # Anthropic
+    "claude-opus-4": (15.00, 75.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-opus": (15.00, 75.00),
+    "claude-3-haiku": (0.25, 1.25),
+    # Google
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+# Providers that cost nothing per token
+FREE_PROVIDERS = ("local",)
+# Share of the list price charged for batch API calls (OpenAI Batch and Anthropic Message Batches)
+BATCH_DISCOUNT = 0.5
+# Share of the input price charged for prompt tokens read from / written to a provider's
+# prompt cache. OpenAI's read discount is 50-75% depending on the model; 50% is assumed.
+CACHE_READ_PRICE = {"openai": 0.5, "anthropic": 0.1, "gemini": 0.25}
+CACHE_WRITE_PRICE = {"anthropic": 1.25}
+
+
+class LLMTelemetryHandler(BaseCallbackHandler):
+    """
+    Callback handler that records one LLMCallRecord per chat model call.
+    Attribution comes from the run metadata ('agent', 'file'), set with telemetry_config
+    and with_metadata. Nodes return `records` under 'llm_calls' in their state update.
+    """
+    run_inline = True # Record in the calling thread/event loop, not an executor
+
+    def __init__(self, _state: ReviewState):
+        self.provider = _state.llm_provider
+        self.model = _state.model
+        self.records: Dict[str, dict] = {}
+        self._started: Dict[UUID, Tuple[float, dict, int]] = {}
+        self._models: Dict[UUID, Tuple[Optional[str], Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                            run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        prompt_estimate = sum(estimate_messages_tokens(batch) for batch in messages)
+        # Fallback/hedge calls go to a different model than the state's; the wrappers report which
+        params = kwargs.get("invocation_params") or {}
+        provider = params.get("provider") or self.provider
+        model = params.get("model") or params.get("model_name") or self.model
+        with self._lock:
+            self._started[run_id] = (time.perf_counter(), dict(metadata or {}), prompt_estimate)
+            self._models[run_id] = (provider, model)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._finish(run_id)
+        if started is None:
+            return
+        start, metadata, prompt_estimate = started
+        # Streamed responses carry these in the generation_info instead of llm_output
+        llm_output = {**call_info(response), **(response.llm_output or {})}
+        prompt_tokens, completion_tokens = usage_from_result(response)
+        estimated = prompt_tokens is None
+        if estimated:
+            prompt_tokens = prompt_estimate
+            completion_tokens = sum(estimate_tokens(g.text) for gens in response.generations for g in gens)
+        cache_hit = bool(llm_output.get("cache_hit"))
+        # A response cache hit replays the original call's usage; nothing was read from the provider's cache
+        cache_read, cache_write = (0, 0) if cache_hit else prompt_cache_usage(response)
+        self._record(run_id, metadata, start,
+                     prompt_tokens=prompt_tokens, completion_tokens=completion_tokens or 0, estimated=estimated,
+                     retries=int(llm_output.get("retries", 0) or 0), cache_hit=cache_hit,
+                     cache_read_tokens=cache_read, cache_write_tokens=cache_write)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._finish(run_id)
+        if started is None:
+            return
+        start, metadata, prompt_estimate = started
+        self._record(run_id, metadata, start, prompt_tokens=prompt_estimate, estimated=True,
+                     error=f"{type(error).__name__}: {error}")
+
+    def _finish(self, run_id: UUID) -> Optional[Tuple[float, dict, int]]:
+        with self._lock:
+            return self._started.pop(run_id, None)
+
+    def _record(self, run_id: UUID, metadata: dict, start: float, **fields: Any) -> None:
+        with self._lock:
+            provider, model = self._models.pop(run_id, (self.provider, self.model))
+        record = LLMCallRecord(
+            agent=metadata.get("agent") or "unknown", file=metadata.get("file"),
+            provider=provider, model=model,
+            latency_s=round(time.perf_counter() - start, 3), **fields,
+        )
+        with self._lock:
+            self.records[str(run_id)] = record.model_dump()
+
+
+def usage_from_result(response: LLMResult) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt, completion) tokens as reported by the provider, or (None, None)."""
+    prompt = completion = 0
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            info = generation.generation_info or {}
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+                found = True
+            elif "prompt_eval_count" in info: # Ollama
+                prompt += info.get("prompt_eval_count") or 0
+                completion += info.get("eval_count") or 0
+                found = True
+    if found:
+        return prompt, completion
+    usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage") or {}
+    if usage:
+        return (usage.get("prompt_tokens", usage.get("input_tokens", 0)),
+                usage.get("completion_tokens", usage.get("output_tokens", 0)))
+    return None, None
+
+
+def prompt_cache_usage(response: LLMResult) -> Tuple[int, int]:
+    """(cache read, cache write) prompt tokens as reported by the provider, (0, 0) if not reported."""
+    read = write = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            details = usage.get("input_token_details") or {}
+            read += details.get("cache_read") or 0
+            write += details.get("cache_creation") or 0
+    return read, write
+
+
+def call_info(response: LLMResult) -> dict:
+    """Merged generation_info of a response's generations."""
+    info: dict = {}
+    for generations in response.generations:
+        for generation in generations:
+            info.update(generation.generation_info or {})
+    return info
+
+
+def telemetry_config(handler: LLMTelemetryHandler, **metadata: Any) -> RunnableConfig:
+    """
+    Config for chain calls made inside a graph node: the node's own callbacks (so tracing
+    still nests under the node) plus `handler`, with `metadata` (agent, file) attached.
+    Build it in the node's thread; worker threads don't see the node's context.
+    """
+    parent = ensure_config()
+    callbacks = parent.get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    else:
+        callbacks = [*(callbacks or []), handler]
+    return {
+        "callbacks": callbacks,
+        "tags": list(parent.get("tags") or []),
+        "metadata": {**(parent.get("metadata") or {}), **metadata},
+    }
+
+
+def with_metadata(config: Optional[RunnableConfig], **metadata: Any) -> RunnableConfig:
+    """Copy of `config` with extra run metadata (e.g. the file a per-file call is for)."""
+    config = config or {}
+    return {**config, "metadata": {**(config.get("metadata") or {}), **metadata}}
+
+
+def _price_for(provider: Optional[str], model: Optional[str], prices: Dict[str, Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+    if provider in FREE_PROVIDERS:
+        return (0.0, 0.0)
+    name = (model or "").lower().split("/")[-1]
+    match = max((prefix for prefix in prices if name.startswith(prefix)), key=len, default=None)
+    return prices[match] if match else None
+
+
+def resolve_prices(yaml_prices: Optional[dict]) -> Dict[str, Tuple[float, float]]:
+    """DEFAULT_PRICES updated with `prices: {model-prefix: {input: x, output: y}}` (USD per 1M tokens) from YAML."""
+    prices = dict(DEFAULT_PRICES)
+    for prefix, entry in (yaml_prices or {}).items():
+        try:
+            prices[str(prefix).lower()] = (float(entry["input"]), float(entry["output"]))
+        except (KeyError, TypeError, ValueError):
+            print(f"[telemetry][WARN] Ignoring invalid price entry for '{prefix}', expected {{input: x, output: y}}")
+    return prices
+
+
+def _prompt_cost(record: LLMCallRecord, input_price: float) -> float:
+    """Prompt tokens at the input price, with prompt-cache reads and writes at their provider's rates."""
+    read_price = CACHE_READ_PRICE.get(record.provider, 1.0)
+    write_price = CACHE_WRITE_PRICE.get(record.provider, 1.0)
+    uncached = max(0, record.prompt_tokens - record.cache_read_tokens - record.cache_write_tokens)
+    return input_price * (uncached + record.cache_read_tokens * read_price + record.cache_write_tokens * write_price)
+
+
+def _empty_totals() -> dict:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_calls": 0,
+            "cache_read_tokens": 0, "cache_write_tokens": 0,
+            "cache_hits": 0, "retries": 0, "errors": 0, "latency_s": 0.0, "cost_usd": 0.0}
+
+
+def _add(totals: dict, record: LLMCallRecord, cost: float) -> None:
+    totals["calls"] += 1
+    totals["prompt_tokens"] += record.prompt_tokens
+    totals["completion_tokens"] += record.completion_tokens
+    totals["estimated_calls"] += int(record.estimated)
+    totals["cache_read_tokens"] += record.cache_read_tokens
+    totals["cache_write_tokens"] += record.cache_write_tokens
+    totals["cache_hits"] += int(record.cache_hit)
+    totals["retries"] += record.retries
+    totals["errors"] += int(record.error is not None)
+    totals["latency_s"] = round(totals["latency_s"] + record.latency_s, 3)
+    totals["cost_usd"] = round(totals["cost_usd"] + cost, 6)
+
+
+def build_report(_state: ReviewState, yaml_prices: Optional[dict] = None) -> dict:
+    """
+    Per-agent and per-file totals of the run's llm_calls with a cost estimate.
+    Cache hits cost nothing, prompt tokens from the provider's prompt cache are priced at
+    CACHE_READ_PRICE and batch calls are discounted by BATCH_DISCOUNT; calls to models
+    missing from the price table are listed under 'unpriced_models' and counted at zero cost.
+    """
+    prices = resolve_prices(yaml_prices)
+    totals = _empty_totals()
+    by_agent: Dict[str, dict] = {}
+    by_file: Dict[str, dict] = {}
+    unpriced = set()
+    for record in _state.llm_calls.values():
+        price = _price_for(record.provider, record.model, prices)
+        if price is None:
+            unpriced.add(record.model)
+        cost = 0.0
+        if price and not record.cache_hit:
+            cost = (_prompt_cost(record, price[0]) + record.completion_tokens * price[1]) / 1_000_000
+            if record.batch:
+                cost *= BATCH_DISCOUNT
+        _add(totals, record, cost)
+        _add(by_agent.setdefault(record.agent, _empty_totals()), record, cost)
+        _add(by_file.setdefault(record.file or "(all files)", _empty_totals()), record, cost)
+    return {
+        "provider": _state.llm_provider,
+        "model": _state.model,
+        "totals": totals,
+        "by_agent": dict(sorted(by_agent.items())),
+        "by_file": dict(sorted(by_file.items(), key=lambda item: (item[1]["cost_usd"], item[1]["prompt_tokens"]), reverse=True)),
+        "unpriced_models": sorted(m for m in unpriced if m),
+    }
@@ -0,0 +1,135 @@
+# core/tokens.py
+import re
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+
+# BPE tokenizers average ~4 characters per token on English and ~3-3.5 on code.
+# 3.2 errs on the side of over-counting so budgets stay safe without a tokenizer download.
+CHARS_PER_TOKEN = 3.2
+# Role markers and separators added per chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Lines of unchanged code kept around each hunk when the full file doesn't fit
+EXCERPT_CONTEXT_LINES = 20
+
+HUNK_HEADER_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Offline token estimate: ASCII by average characters per token, other characters as one token each."""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return int((len(text) - non_ascii) / CHARS_PER_TOKEN) + non_ascii + 1
+
+
+def estimate_messages_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(estimate_tokens(str(m.content)) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def _split_hunks(diff: str) -> Tuple[List[str], List[List[str]]]:
+    """Splits a file diff into its header lines and a list of hunks (each starting with its @@ line)."""
+    header: List[str] = []
+    hunks: List[List[str]] = []
+    for line in diff.splitlines():
+        if line.startswith("@@"):
+            hunks.append([line])
+        elif hunks:
+            hunks[-1].append(line)
+        else:
+            header.append(line)
+    return header, hunks
+
+
+def excerpt_around_hunks(file_content: str, diff: str, context_lines: int = EXCERPT_CONTEXT_LINES) -> str:
+    """
+    The parts of the new file around each changed hunk, prefixed with their line numbers
+    so comment line numbers stay accurate. Gaps are marked with '...'.
+    """
+    lines = file_content.splitlines()
+    ranges: List[Tuple[int, int]] = []
+    for hunk in _split_hunks(diff)[1]:
+        match = HUNK_HEADER_RE.match(hunk[0])
+        if not match:
+            continue
+        start = int(match.group(1))
+        length = int(match.group(2)) if match.group(2) is not None else 1
+        lo = max(1, start - context_lines)
+        hi = min(len(lines), start + max(length, 1) - 1 + context_lines)
+        if ranges and lo <= ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], hi))
+        else:
+            ranges.append((lo, hi))
+    if not ranges:
+        return ""
+    out: List[str] = []
+    for lo, hi in ranges:
+        if lo > 1:
+            out.append("...")
+        out.extend(f"{n:>6}| {lines[n - 1]}" for n in range(lo, hi + 1))
+    if ranges[-1][1] < len(lines):
+        out.append("...")
+    return "\n".join(out)
+
+
+def trim_diff_to_tokens(diff: str, max_tokens: int) -> str:
+    """Keeps whole hunks in order while they fit, and notes how many were left out."""
+    header, hunks = _split_hunks(diff)
+    kept = list(header)
+    used = estimate_tokens("\n".join(header))
+    for index, hunk in enumerate(hunks):
+        hunk_text = "\n".join(hunk)
+        hunk_tokens = estimate_tokens(hunk_text)
+        if used + hunk_tokens <= max_tokens:
+            kept.append(hunk_text)
+            used += hunk_tokens
+            continue
+        omitted = len(hunks) - index
+        if index == 0:
+            # Not even the first hunk fits, cut it by characters
+            kept.append(hunk_text[:max(0, int((max_tokens - used) * CHARS_PER_TOKEN))])
+            kept.append("... (hunk truncated to fit the model's context window)")
+            omitted -= 1
+        if omitted:
+            kept.append(f"... ({omitted} more hunks omitted to fit the model's context window)")
+        break
+    return "\n".join(kept)
+
+
+def fit_prompt_input(prompt_input: dict, measure: Callable[[dict], int], budget: int, log_prefix: str) -> dict:
+    """
+    Measures a per-file prompt before it is sent and, when it's over `budget`, swaps in
+    smaller representations until it fits: full file -> excerpt around the changed hunks
+    -> call sites dropped -> symbol context dropped -> file content dropped -> diff trimmed
+    to whole hunks. `prompt_input` needs 'diff' and 'file_content'; 'call_sites' and
+    'symbol_context' are optional.
+    """
+    tokens = measure(prompt_input)
+    if tokens <= budget:
+        return prompt_input
+
+    diff = prompt_input.get("diff") or ""
+    steps = [
+        ("file excerpt around changed hunks",
+         lambda i: {**i, "file_content": excerpt_around_hunks(prompt_input.get("file_content") or "", diff)
+                    or "(File content omitted to fit the model's context window.)"}),
+        ("call sites omitted",
+         lambda i: {**i, "call_sites": "(Call sites omitted to fit the model's context window.)"}
+         if "call_sites" in i else i),
+        ("symbol context omitted",
+         lambda i: {**i, "symbol_context": "(Symbol context omitted to fit the model's context window.)"}
+         if "symbol_context" in i else i),
+        ("file content omitted",
+         lambda i: {**i, "file_content": "(File content omitted to fit the model's context window; review the diff only.)"}),
+        ("diff trimmed to fit",
+         lambda i: {**i, "diff": trim_diff_to_tokens(diff, max(0, budget - measure({**i, "diff": ""})))}),
+    ]
+    fitted = prompt_input
+    for description, step in steps:
+        fitted = step(fitted)
+        fitted_tokens = measure(fitted)
+        if fitted_tokens <= budget:
+            print(f"{log_prefix} prompt ~{tokens} tokens exceeds budget {budget}, using {description} (~{fitted_tokens} tokens)")
+            return fitted
+    print(f"{log_prefix}[WARN] prompt still ~{measure(fitted)} tokens after all reductions (budget {budget})")
+    return fitted
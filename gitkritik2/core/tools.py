@@ -1,10 +1,17 @@
 # core/tools.py
 import os
 import re
-from typing import Optional
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from langchain_core.tools import tool
+from pydantic import BaseModel, Field
 from langsmith import traceable # Keep if using LangSmith
 
+from gitkritik2.core.symbol_extractors import best_first, extractor_for
+from gitkritik2.core.symbol_index import SymbolIndex, format_symbol, get_symbol_index
+
 try:
     import jedi
     JEDI_AVAILABLE = True
@@ -14,7 +21,7 @@ except ImportError:
     print("[WARN] Please run: poetry add jedi")
 
 
-def _find_project_root(start_path: str) -> str:
+def find_project_root(start_path: str) -> str:
     """Finds the git project root."""
     # (Keep this helper function as it was)
     path = os.path.abspath(start_path)
@@ -26,12 +33,75 @@ def _find_project_root(start_path: str) -> str:
             return os.path.abspath('.')
         path = parent
 
+# Parsed Scripts kept per run; a file's Script is reused until its content changes
+MAX_CACHED_SCRIPTS = 64
+
+
+class JediSession:
+    """
+    One jedi.Project for the run plus an LRU of parsed Scripts keyed by path and content
+    hash, so repeated lookups in a file reuse its parse and jedi's inference state instead
+    of starting from scratch. jedi isn't thread-safe: callers hold `lock` while using it.
+    """
+
+    def __init__(self, project_root: str, max_scripts: int = MAX_CACHED_SCRIPTS):
+        self.project = jedi.Project(project_root)
+        self.max_scripts = max_scripts
+        self.lock = threading.RLock()
+        self._scripts: "OrderedDict[Tuple[str, str], jedi.Script]" = OrderedDict()
+
+    def script(self, target_path: str, code: str) -> "jedi.Script":
+        key = (target_path, hashlib.sha1(code.encode("utf-8")).hexdigest())
+        if key in self._scripts:
+            self._scripts.move_to_end(key)
+            return self._scripts[key]
+        script = jedi.Script(code=code, path=target_path, project=self.project)
+        self._scripts[key] = script
+        if len(self._scripts) > self.max_scripts:
+            self._scripts.popitem(last=False)
+        return script
+
+    def definitions(self, target_path: str, code: str, symbol_name: str) -> List["jedi.api.classes.Name"]:
+        """
+        Definitions of `symbol_name` in the file, best first: the file's own definitions of
+        the name (module level before nested ones), with imports followed to their target.
+        """
+        script = self.script(target_path, code)
+        names = [name for name in script.get_names(all_scopes=True, definitions=True) if name.name == symbol_name]
+        # Module-level definitions first, then functions/classes over variables
+        names.sort(key=lambda d: (d.parent().type != 'module', d.type != 'function' and d.type != 'class', d.line))
+        definitions = []
+        for name in names:
+            try:
+                # `from .sub import f` re-exports: follow to where f is defined
+                definitions.extend(name.goto(follow_imports=True) or [name])
+            except Exception as goto_e:
+                print(f"[WARN] jedi.goto failed for {symbol_name} in {target_path}: {goto_e}")
+                definitions.append(name)
+        return definitions
+
+
+_jedi_sessions: Dict[str, JediSession] = {}
+_jedi_sessions_lock = threading.Lock()
+
+
+def jedi_session(project_root: str) -> JediSession:
+    """The run's JediSession for `project_root`, created on first use."""
+    with _jedi_sessions_lock:
+        if project_root not in _jedi_sessions:
+            _jedi_sessions[project_root] = JediSession(project_root)
+        return _jedi_sessions[project_root]
+
+
 def _format_jedi_definition(definition: "jedi.api.classes.BaseDefinition") -> str:
     """Formats the extracted Jedi definition into a readable string."""
     output_parts = []
     try:
-        # Description often contains the signature
+        # Description often contains the signature; callables' full parameter lists come from get_signatures
         signature = definition.description
+        signatures = definition.get_signatures() if definition.type in ('function', 'class') else []
+        if signatures:
+            signature = f"{'class' if definition.type == 'class' else 'def'} {signatures[0].to_string()}"
         if signature:
             # Prepend def/class if not present in description (heuristic)
             line_code = definition.get_line_code().strip()
@@ -63,80 +133,140 @@ def _format_jedi_definition(definition: "jedi.api.classes.BaseDefinition") -> st
 @traceable # Keep if using LangSmith
 def get_symbol_definition(file_path: str, symbol_name: str) -> str:
     """
-    Retrieves the definition (function/class signature, docstring) for a Python
-    symbol_name within the specified project file_path using static analysis.
+    Retrieves the definition (function/class signature, docstring) for a Python,
+    JavaScript/TypeScript, Go or Java symbol_name within the specified project
+    file_path using static analysis.
     Use this when you need to understand what an imported function or class does.
     Provide the file path relative to the project root.
     """
     print(f"Tool Call: get_symbol_definition(file_path='{file_path}', symbol_name='{symbol_name}')")
+    project_root = find_project_root('.')
+    return symbol_definition(file_path, symbol_name, project_root, get_symbol_index(project_root))
 
-    if not JEDI_AVAILABLE:
-        return "Error: `jedi` library is not installed. Cannot perform accurate symbol lookup."
 
-    try:
-        project_root = _find_project_root('.')
-        target_path = os.path.abspath(os.path.join(project_root, file_path))
+class SymbolLookup(BaseModel):
+    file_path: str = Field(description="Project file defining or importing the symbol, relative to the project root")
+    symbol_name: str = Field(description="Name of the function, class or variable")
 
-        # Basic security/validation checks
-        if not target_path.startswith(project_root) or '..' in file_path:
-             return f"Error: Access denied. Attempted to read file outside project root: {file_path}"
-        if not os.path.exists(target_path) or not os.path.isfile(target_path):
-            return f"Error: File not found or is not a file at resolved path: {target_path}"
-        if not target_path.lower().endswith(".py"):
-             return f"Error: Can only analyze Python (.py) files. Path: {file_path}"
 
-        with open(target_path, 'r', encoding='utf-8') as f:
-            file_content = f.read()
+@tool
+@traceable # Keep if using LangSmith
+def get_symbol_definitions(lookups: List[SymbolLookup]) -> str:
+    """
+    Retrieves the definitions (signature, docstring) of several Python, JavaScript/
+    TypeScript, Go or Java symbols in one call. Pass every (file_path, symbol_name) pair you need at once instead of calling
+    get_symbol_definition repeatedly. File paths are relative to the project root.
+    """
+    pairs = [(lookup.file_path, lookup.symbol_name) if isinstance(lookup, SymbolLookup)
+             else (lookup["file_path"], lookup["symbol_name"]) for lookup in lookups]
+    print(f"Tool Call: get_symbol_definitions({len(pairs)} lookups)")
+    project_root = find_project_root('.')
+    results = symbol_definitions(pairs, project_root, get_symbol_index(project_root))
+    return "\n\n".join(results.values())
 
-        # Use Jedi to find definitions
-        script = jedi.Script(code=file_content, path=target_path)
-        # Use goto_definitions for potentially better accuracy than get_names
-        # Find first usage of symbol_name (simple approach) to start inference
-        # Note: This might not be the definition line itself
-        line, column = None, None
-        try:
-             # Find first occurrence to get line/col for jedi.infer
-             # This is still a bit naive, might find comments or strings
-             match_index = file_content.find(symbol_name)
-             if match_index != -1:
-                  line = file_content.count('\n', 0, match_index) + 1
-                  column = match_index - file_content.rfind('\n', 0, match_index) -1
-        except Exception:
-             pass # Ignore errors finding line/col, try get_names as fallback
 
-        definitions = []
-        if line is not None and column is not None:
-            try:
-                definitions = script.infer(line=line, column=column)
-            except Exception as infer_e:
-                 print(f"[WARN] jedi.infer failed for {symbol_name} at {line}:{column}: {infer_e}. Falling back to get_names.")
-                 definitions = [] # Clear definitions if infer failed
+def symbol_definition(file_path: str, symbol_name: str, project_root: Optional[str] = None,
+                      index: Optional[SymbolIndex] = None) -> str:
+    """
+    Definition of `symbol_name` in the project file `file_path` (relative to project_root,
+    default: the git root of the working directory). Read from the symbol index when one is
+    given; jedi analyses the file for names the index doesn't hold (e.g. re-exports).
+    Failures are returned as "Error: ..." text.
+    """
+    project_root = project_root or find_project_root('.')
+    return _file_symbol_definitions(file_path, [symbol_name], project_root, index)[symbol_name]
 
-        # Fallback or primary method: Search all names if infer didn't work well
-        if not definitions:
-            try:
-                names = script.get_names(all_scopes=True, definitions=True)
-                definitions = [d for d in names if d.name == symbol_name]
-            except Exception as get_names_e:
-                 print(f"[ERROR] jedi.get_names failed for {target_path}: {get_names_e}")
-                 return f"Error: Jedi failed to analyze file {file_path}."
 
+def _file_symbol_definitions(file_path: str, symbol_names: List[str], project_root: str,
+                             index: Optional[SymbolIndex] = None) -> Dict[str, str]:
+    """symbol_definition of several names in one file, keyed by name: the file is validated, looked up and read once."""
+    target_path = os.path.abspath(os.path.join(project_root, file_path))
 
-        if definitions:
-            # Prefer definitions that are functions or classes
-            # Sort to prioritize functions/classes over imports/variables if multiple found
-            definitions.sort(key=lambda d: (d.type != 'function', d.type != 'class', d.line))
-            found_def = definitions[0] # Take the most likely definition
+    # Basic security/validation checks
+    if not target_path.startswith(project_root) or '..' in file_path:
+        return dict.fromkeys(symbol_names, f"Error: Access denied. Attempted to read file outside project root: {file_path}")
+    if not os.path.exists(target_path) or not os.path.isfile(target_path):
+        return dict.fromkeys(symbol_names, f"Error: File not found or is not a file at resolved path: {target_path}")
+    extractor = extractor_for(target_path)
+    if extractor is None:
+        return dict.fromkeys(symbol_names, f"Error: Can only analyze Python, JavaScript/TypeScript, Go and Java files. Path: {file_path}")
 
-            print(f"  Jedi found '{found_def.name}' (type: {found_def.type}) at line {found_def.line} in {found_def.module_path}")
-            formatted_output = _format_jedi_definition(found_def)
-            return f"Definition found for '{symbol_name}' in '{file_path}':\n{formatted_output}"
+    relative_path = os.path.relpath(target_path, project_root).replace(os.sep, "/")
+    results: Dict[str, str] = {}
+    if index is not None:
+        for symbol_name, symbols in index.lookup_in_file(relative_path, symbol_names).items():
+            if symbols:
+                results[symbol_name] = format_symbol(symbols[0], file_path, symbol_name)
+    missing = [symbol_name for symbol_name in symbol_names if symbol_name not in results]
+    if not missing:
+        return results
 
-        else:
-            print(f"  Jedi could not find definition for '{symbol_name}' in {file_path}")
-            return f"Error: Jedi could not find definition for '{symbol_name}' in '{file_path}'."
+    if not target_path.lower().endswith(".py"):
+        # Other languages have no jedi: the index's extractor runs on the file directly
+        try:
+            with open(target_path, 'r', encoding='utf-8', errors='replace') as f:
+                file_symbols = extractor(relative_path, f.read())
+        except OSError as e:
+            print(f"[ERROR] Tool get_symbol_definition failed: {e}")
+            results.update(dict.fromkeys(missing, f"Error processing file '{file_path}': An unexpected error occurred during analysis."))
+            return results
+        for symbol_name in missing:
+            symbols = best_first(file_symbols, symbol_name)
+            results[symbol_name] = (format_symbol(symbols[0], file_path, symbol_name) if symbols
+                                    else f"Error: Could not find definition for '{symbol_name}' in '{file_path}'.")
+        return results
 
+    if not JEDI_AVAILABLE:
+        results.update(dict.fromkeys(missing, "Error: `jedi` library is not installed. Cannot perform accurate symbol lookup."))
+        return results
+
+    try:
+        with open(target_path, 'r', encoding='utf-8') as f:
+            file_content = f.read()
     except Exception as e:
         print(f"[ERROR] Tool get_symbol_definition failed: {e}")
-        # Be careful not to expose too much internal detail in error messages to LLM
-        return f"Error processing file '{file_path}': An unexpected error occurred during analysis."
\ No newline at end of file
+        results.update(dict.fromkeys(missing, f"Error processing file '{file_path}': An unexpected error occurred during analysis."))
+        return results
+
+    session = jedi_session(project_root)
+    for symbol_name in missing:
+        try:
+            # The session keeps the parsed Script, so the file is parsed once for all names
+            with session.lock:
+                definitions = session.definitions(target_path, file_content, symbol_name)
+
+            if definitions:
+                found_def = definitions[0] # Take the most likely definition
+                print(f"  Jedi found '{found_def.name}' (type: {found_def.type}) at line {found_def.line} in {found_def.module_path}")
+                formatted_output = _format_jedi_definition(found_def)
+                results[symbol_name] = f"Definition found for '{symbol_name}' in '{file_path}':\n{formatted_output}"
+
+            else:
+                print(f"  Jedi could not find definition for '{symbol_name}' in {file_path}")
+                results[symbol_name] = f"Error: Jedi could not find definition for '{symbol_name}' in '{file_path}'."
+
+        except Exception as e:
+            print(f"[ERROR] Tool get_symbol_definition failed: {e}")
+            # Be careful not to expose too much internal detail in error messages to LLM
+            results[symbol_name] = f"Error processing file '{file_path}': An unexpected error occurred during analysis."
+    return results
+
+
+def symbol_definitions(lookups: List[Tuple[str, str]], project_root: Optional[str] = None,
+                       index: Optional[SymbolIndex] = None) -> Dict[Tuple[str, str], str]:
+    """
+    symbol_definition for each (file_path, symbol_name) pair, keyed by the pair. Lookups are
+    grouped by file, so each file is validated and read once, checked against the index in
+    one query, and parsed by jedi once for all of its symbols.
+    """
+    project_root = project_root or find_project_root('.')
+    by_file: Dict[str, List[str]] = {}
+    for file_path, symbol_name in lookups:
+        names = by_file.setdefault(file_path, [])
+        if symbol_name not in names:
+            names.append(symbol_name)
+    return {
+        (file_path, symbol_name): definition
+        for file_path, names in by_file.items()
+        for symbol_name, definition in _file_symbol_definitions(file_path, names, project_root, index).items()
+    }
@@ -1,5 +1,6 @@
 # core/utils.py
 import os
+import asyncio
 import subprocess
 from typing import List, Optional, Tuple
 from gitkritik2.core.models import ReviewState
@@ -10,7 +11,8 @@ from pydantic import ValidationError
 def run_subprocess_command(
     command: List[str],
     cwd: Optional[str],
-    check: bool = False # Set to True to raise error on non-zero exit
+    check: bool = False, # Set to True to raise error on non-zero exit
+    input_text: Optional[str] = None # Written to the command's stdin (e.g. git patch-id)
     ) -> Tuple[Optional[str], Optional[str]]:
     """
     Runs a command in a subprocess, returns (stdout, stderr) tuple.
@@ -28,7 +30,8 @@ def run_subprocess_command(
             text=True,
             check=check, # Raise CalledProcessError if check=True and exit != 0
             encoding='utf-8',
-            cwd=cwd # Explicitly set CWD
+            cwd=cwd, # Explicitly set CWD
+            input=input_text
         )
         stdout = process.stdout.strip() if process.stdout else ""
         stderr_msg = process.stderr.strip() if process.stderr else None # None if no stderr
@@ -61,6 +64,54 @@ def run_subprocess_command(
         print(f"[ERROR] {err_msg}")
         return None, err_msg # Return None for stdout on unexpected errors
 
+async def arun_subprocess_command(
+    command: List[str],
+    cwd: Optional[str],
+    check: bool = False,
+    input_text: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Async counterpart of run_subprocess_command using asyncio subprocesses.
+    Same (stdout, stderr) contract, so callers can switch between the two freely.
+    """
+    if cwd is None:
+        print("ERROR arun_subprocess_command CWD was not provided!")
+        return None, "Internal error: CWD not provided to command runner."
+    print(f"[DEBUG arun_subprocess_command] Running '{' '.join(command)}' in '{cwd}'")
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE if input_text is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd
+        )
+        stdout_bytes, stderr_bytes = await process.communicate(
+            input_text.encode('utf-8') if input_text is not None else None
+        )
+        stdout = stdout_bytes.decode('utf-8', errors='replace').strip() if stdout_bytes else ""
+        stderr_msg = stderr_bytes.decode('utf-8', errors='replace').strip() if stderr_bytes else None
+
+        if process.returncode != 0:
+            stderr_msg = stderr_msg if stderr_msg else f"Command failed with exit code {process.returncode}"
+            if check:
+                print(f"[ERROR] Command failed (check=True): {' '.join(command)}")
+                print(f"  Stderr: {stderr_msg}")
+            else:
+                print(f"[WARN] Command exited with code {process.returncode}: {' '.join(command)}")
+            return stdout, stderr_msg
+
+        return stdout, stderr_msg
+
+    except FileNotFoundError:
+        err_msg = f"Command not found: {command[0]}"
+        print(f"[ERROR] {err_msg}")
+        return None, err_msg
+    except Exception as e:
+        err_msg = f"Unexpected error running command {' '.join(command)}: {e}"
+        print(f"[ERROR] {err_msg}")
+        return None, err_msg
+
 def command_exists(command_name: str) -> bool:
      """Checks if a command exists and is likely executable using '--version'."""
      print(f"[DEBUG command_exists] Checking for '{command_name}'...")
@@ -114,6 +165,41 @@ def get_merge_base(base_branch: str = "origin/main", cwd: Optional[str] = None)
     return merge_base_sha
 
 
+async def aget_merge_base(base_branch: str = "origin/main", cwd: Optional[str] = None) -> Optional[str]:
+    """Async counterpart of get_merge_base using arun_subprocess_command."""
+    if cwd is None:
+        print("[ERROR aget_merge_base] CWD was not provided!")
+        return None
+    print(f"[DEBUG aget_merge_base] Finding merge base between '{base_branch}' and HEAD in '{cwd}'")
+    # Both ref checks are independent, run them together
+    (_, stderr_base), (_, stderr_head) = await asyncio.gather(
+        arun_subprocess_command(["git", "rev-parse", "--verify", f"{base_branch}^{{commit}}"], cwd=cwd, check=False),
+        arun_subprocess_command(["git", "rev-parse", "--verify", "HEAD"], cwd=cwd, check=False),
+    )
+    if stderr_base is not None or stderr_head is not None:
+        return None
+    stdout, stderr_mb = await arun_subprocess_command(["git", "merge-base", base_branch, "HEAD"], cwd=cwd, check=True)
+    if stdout is None:
+         print(f"[ERROR] Failed to get merge-base (stdout was None). Stderr: {stderr_mb}")
+         return None
+
+    merge_base_sha = stdout.strip()
+    if not merge_base_sha or len(merge_base_sha) < 7: # Basic sanity check
+         print(f"[ERROR] Invalid merge-base SHA obtained: '{merge_base_sha}'. Stderr: {stderr_mb}")
+         return None
+
+    print(f"[DEBUG aget_merge_base] Found merge base: {merge_base_sha}")
+    return merge_base_sha
+
+
+def git_dir_file(filename: str, cwd: str) -> str:
+    """Path of `filename` inside the repository's .git directory (never committed), or in cwd outside a repo."""
+    git_dir, stderr = run_subprocess_command(["git", "rev-parse", "--absolute-git-dir"], cwd=cwd)
+    if stderr is not None or not git_dir:
+        return os.path.join(cwd, f".{filename}")
+    return os.path.join(git_dir, filename)
+
+
 # --- State Validation ---
 def ensure_review_state(state_data) -> ReviewState:
     # ... (keep the implementation using model_validate) ...
@@ -1,47 +1,94 @@
 # graph/build_graph.py
 import os
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, END
+from langgraph.constants import Send
+from gitkritik2.graph.state import ReviewGraphState
 
 # Core setup nodes
 from gitkritik2.nodes.init_state import init_state
 # --- Rename Import ---
-from gitkritik2.nodes.resolve_context import resolve_context # <-- Renamed
+from gitkritik2.nodes.resolve_context import resolve_context, aresolve_context # <-- Renamed
 # --- End Rename ---
-from gitkritik2.nodes.detect_changes import detect_changes
-from gitkritik2.nodes.prepare_context import prepare_context
+from gitkritik2.nodes.detect_changes import detect_changes, adetect_changes
+from gitkritik2.nodes.prepare_context import prepare_context, aprepare_context
+from gitkritik2.nodes.plan_file_reviews import plan_file_reviews, aplan_file_reviews
+from gitkritik2.nodes.review_file import review_file, areview_file
+from gitkritik2.nodes.collect_file_results import collect_file_results
 
 # Agents (ensure imports match potentially renamed files)
-from gitkritik2.nodes.agents.style_agent import style_agent
-from gitkritik2.nodes.agents.bug_agent import bug_agent
-from gitkritik2.nodes.agents.design_agent import design_agent # Assuming renamed
-from gitkritik2.nodes.agents.context_agent import context_agent
-from gitkritik2.nodes.agents.summary_agent import summary_agent
+from gitkritik2.nodes.agents.style_agent import style_agent, astyle_agent
+from gitkritik2.nodes.agents.bug_agent import bug_agent, abug_agent
+from gitkritik2.nodes.agents.design_agent import design_agent, adesign_agent # Assuming renamed
+from gitkritik2.nodes.agents.context_agent import context_agent, acontext_agent
+from gitkritik2.nodes.agents.summary_agent import summary_agent, asummary_agent
+from gitkritik2.nodes.agents.combined_agent import combined_agent, acombined_agent
 
 # Post-processing & IO
 from gitkritik2.nodes.merge_results import merge_results
 from gitkritik2.nodes.format_output import format_output
-from gitkritik2.nodes.post_inline import post_inline
-from gitkritik2.nodes.post_summary import post_summary
+from gitkritik2.nodes.post_inline import post_inline, apost_inline
+from gitkritik2.nodes.post_summary import post_summary, apost_summary
+from gitkritik2.nodes.batch_review import submit_batch, collect_batch
 
-def build_review_graph() -> StateGraph:
-    graph = StateGraph(dict)
+SEPARATE_REVIEW_BRANCHES = ["bug_agent", "design_agent", "style_agent", "summary_agent"]
+COMBINED_REVIEW_BRANCHES = ["combined_agent", "summary_agent"]
+
+def route_review_agents(state: dict) -> list:
+    """Picks the parallel review branches after context_agent based on review_mode, or the batch submission."""
+    if state.get("batch"):
+        return ["submit_batch"]
+    if state.get("review_mode") == "combined":
+        return COMBINED_REVIEW_BRANCHES
+    return SEPARATE_REVIEW_BRANCHES
+
+def route_file_pipeline(state: dict):
+    """
+    After planning: 'staged' runs prepare_context/context_agent/agents over all files,
+    'per_file' dispatches one review_file task per changed file (largest diff first).
+    The number of review_file tasks in flight is bounded by the run's max_concurrency config.
+    Batch mode always runs staged: context_agent still runs live, the review agents are batched.
+    """
+    if state.get("pipeline") == "staged" or state.get("batch"):
+        return "prepare_context"
+    review_order = state.get("review_order") or []
+    if not review_order:
+        return "collect_file_results"
+    return [Send("review_file", {**state, "review_filepath": filepath}) for filepath in review_order]
+
+def build_review_graph(use_async: bool = False) -> StateGraph:
+    """
+    Builds the review graph. With use_async=True, I/O-bound nodes use their async
+    variants (asyncio git subprocesses, ainvoke on LangChain runnables, httpx for
+    platform calls); compile and run the result with graph.ainvoke(...).
+    """
+    # Pick sync or async implementation per node; the graph shape is identical
+    def pick(sync_node, async_node):
+        return async_node if use_async else sync_node
+
+    # Typed schema so parallel agents can merge into 'agent_results' via its reducer
+    graph = StateGraph(ReviewGraphState)
 
     # Add all nodes
     graph.add_node("init_state", init_state)
     # --- Rename Node ---
-    graph.add_node("resolve_context", resolve_context) # <-- Renamed
+    graph.add_node("resolve_context", pick(resolve_context, aresolve_context)) # <-- Renamed
     # --- End Rename ---
-    graph.add_node("detect_changes", detect_changes)
-    graph.add_node("prepare_context", prepare_context)
-    graph.add_node("context_agent", context_agent)
-    graph.add_node("style_agent", style_agent)
-    graph.add_node("bug_agent", bug_agent)
-    graph.add_node("design_agent", design_agent)
-    graph.add_node("summary_agent", summary_agent)
+    graph.add_node("detect_changes", pick(detect_changes, adetect_changes))
+    graph.add_node("plan_file_reviews", pick(plan_file_reviews, aplan_file_reviews))
+    graph.add_node("review_file", pick(review_file, areview_file))
+    graph.add_node("collect_file_results", collect_file_results)
+    graph.add_node("prepare_context", pick(prepare_context, aprepare_context))
+    graph.add_node("context_agent", pick(context_agent, acontext_agent))
+    graph.add_node("style_agent", pick(style_agent, astyle_agent))
+    graph.add_node("bug_agent", pick(bug_agent, abug_agent))
+    graph.add_node("design_agent", pick(design_agent, adesign_agent))
+    graph.add_node("summary_agent", pick(summary_agent, asummary_agent))
+    graph.add_node("combined_agent", pick(combined_agent, acombined_agent))
     graph.add_node("merge_results", merge_results)
     graph.add_node("format_output", format_output)
-    graph.add_node("post_inline", post_inline)
-    graph.add_node("post_summary", post_summary)
+    graph.add_node("post_inline", pick(post_inline, apost_inline))
+    graph.add_node("post_summary", pick(post_summary, apost_summary))
+    graph.add_node("submit_batch", submit_batch)
 
     # Define Edges (Control Flow)
     graph.set_entry_point("init_state")
@@ -49,13 +96,25 @@ def build_review_graph() -> StateGraph:
     graph.add_edge("init_state", "resolve_context")
     # Continue the main flow from the resolved context
     graph.add_edge("resolve_context", "detect_changes")
-    graph.add_edge("detect_changes", "prepare_context")
+    graph.add_edge("detect_changes", "plan_file_reviews")
+    graph.add_conditional_edges(
+        "plan_file_reviews", route_file_pipeline, ["prepare_context", "review_file", "collect_file_results"]
+    )
+    # Per-file pipeline: every file is loaded, given context and reviewed independently,
+    # then collected once all review_file tasks have finished
+    graph.add_edge("review_file", "collect_file_results")
+    graph.add_edge("collect_file_results", "summary_agent")
+    # Staged pipeline: each stage runs for all files before the next
     graph.add_edge("prepare_context", "context_agent")
-    graph.add_edge("context_agent", "bug_agent")
-    graph.add_edge("bug_agent", "design_agent")
-    graph.add_edge("design_agent", "style_agent")
-    graph.add_edge("style_agent", "summary_agent")
-    graph.add_edge("summary_agent", "merge_results")
+    # Fan out: review agents only read file_contexts and write their own agent_results key.
+    # review_mode picks either the separate agents or the single-pass combined agent.
+    all_review_branches = SEPARATE_REVIEW_BRANCHES + ["combined_agent"]
+    graph.add_conditional_edges("context_agent", route_review_agents, all_review_branches + ["submit_batch"])
+    # Batch mode ends once the job is submitted; build_collect_graph continues after it completes
+    graph.add_edge("submit_batch", END)
+    # Fan in: the routed branches run in the same step, so merge_results runs once after all finish
+    for branch in all_review_branches:
+        graph.add_edge(branch, "merge_results")
     graph.add_edge("merge_results", "format_output")
     graph.add_edge("format_output", "post_inline")
     graph.add_edge("post_inline", "post_summary")
@@ -63,4 +122,29 @@ def build_review_graph() -> StateGraph:
     # Set the final node
     graph.set_finish_point("post_summary")
 
-    return graph
\ No newline at end of file
+    return graph
+
+
+def build_collect_graph(use_async: bool = False) -> StateGraph:
+    """
+    Second half of a --batch review: starts from the state saved with the batch job,
+    reads the job's results into agent_results and continues through merging and posting.
+    """
+    def pick(sync_node, async_node):
+        return async_node if use_async else sync_node
+
+    graph = StateGraph(ReviewGraphState)
+    graph.add_node("collect_batch", collect_batch)
+    graph.add_node("merge_results", merge_results)
+    graph.add_node("format_output", format_output)
+    graph.add_node("post_inline", pick(post_inline, apost_inline))
+    graph.add_node("post_summary", pick(post_summary, apost_summary))
+
+    graph.set_entry_point("collect_batch")
+    graph.add_edge("collect_batch", "merge_results")
+    graph.add_edge("merge_results", "format_output")
+    graph.add_edge("format_output", "post_inline")
+    graph.add_edge("post_inline", "post_summary")
+    graph.set_finish_point("post_summary")
+
+    return graph
@@ -0,0 +1,84 @@
+# graph/state.py
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
+
+
+def merge_dict_entries(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reducer for keyed channels ('agent_results', 'file_contexts', 'llm_calls').
+    Parallel nodes each write their own keys (agent name / file path), so entries
+    are merged instead of the last writer replacing the whole dictionary.
+    """
+    merged = dict(left or {})
+    merged.update(right or {})
+    return merged
+
+
+class ReviewGraphState(TypedDict, total=False):
+    """
+    Channel schema for the review graph. Mirrors ReviewState (core/models.py),
+    which nodes still use for validation via ensure_review_state.
+    Nodes running in parallel branches must return only the keys they change.
+    """
+    # Configuration / Setup Info
+    target_repo_dir: Optional[str]
+    config_file_path: Optional[str]
+    platform: Optional[str]
+    model: Optional[str]
+    strategy: Optional[str]
+    repo: Optional[str]
+    pr_number: Optional[str]
+    llm_provider: Optional[str]
+    openai_api_key: Optional[str]
+    anthropic_api_key: Optional[str]
+    gemini_api_key: Optional[str]
+    temperature: float
+    max_tokens: int
+    context_window: Optional[int]
+    base_url: Optional[str]
+    rate_limits: Dict[str, Any]
+    max_retries: int
+    circuit_breaker_threshold: int
+    hedging: Dict[str, Any]
+    fallback_models: List[Dict[str, str]]
+    routing: Dict[str, Any]
+    max_concurrency: int
+    summary_map_reduce_tokens: int
+    huggingface: Dict[str, Any]
+    review_mode: str
+    pipeline: str
+    llm_cache: bool
+    llm_cache_path: Optional[str]
+    llm_cache_max_mb: int
+    llm_cache_max_age_days: int
+    review_cache: bool
+    review_cache_path: Optional[str]
+    symbol_index: bool
+    symbol_index_path: Optional[str]
+    call_sites_max_tokens: int
+    prompt_caching: bool
+    structured_output: bool
+    batch: bool
+    batch_backend: Optional[str]
+    batch_job_id: Optional[str]
+    # CLI Flags / Runtime settings
+    is_ci_mode: bool
+    dry_run: bool
+    show_inline_locally: bool
+    side_by_side_display: bool
+    review_unstaged: bool
+    review_all_files: bool
+    # Core Data
+    changed_files: List[str]
+    base_ref: Optional[str]
+    review_order: List[str]
+    review_filepath: str # Only set in the Send payload for review_file
+    file_contexts: Annotated[Dict[str, Any], merge_dict_entries]
+    # Per-file pipeline: one entry per reviewed file path, folded into agent_results by collect_file_results
+    file_review_results: Annotated[Dict[str, Any], merge_dict_entries]
+    agent_results: Annotated[Dict[str, Any], merge_dict_entries]
+    inline_comments: List[Any]
+    summary_review: Optional[str]
+    # Per-call token/latency telemetry, keyed by LangChain run id
+    llm_calls: Annotated[Dict[str, Any], merge_dict_entries]
+    # Debugging / Advanced
+    react_agent_workings: Optional[Dict[str, List[str]]]
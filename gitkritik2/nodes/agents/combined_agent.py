@@ -0,0 +1,73 @@
+# nodes/agents/combined_agent.py
+from typing import Any, Dict, List, Tuple
+from gitkritik2.core.models import Comment, LLMCombinedReviewResponse
+from gitkritik2.core.diff_utils import filter_comments_to_diff
+from gitkritik2.core.structured import ReviewOutputParser
+from gitkritik2.core.prompts import review_prompt
+from gitkritik2.core.review_agent import ReviewAgent, call_sites_input, symbol_context_input
+
+# Agent names the combined call stands in for; results are stored under these keys
+# so merge_results and cli/display.py see the same agents as in 'separate' mode.
+REVIEW_CATEGORIES = ("bug", "design", "style")
+
+# 1. Define Parser & Prompt (outside function)
+parser = ReviewOutputParser(pydantic_object=LLMCombinedReviewResponse)
+
+prompt_template = review_prompt(
+    "Perform a complete review of the changes in a single pass. "
+    "Review them from three angles and tag every comment with exactly one category:\n"
+    "- 'bug': logic bugs, unhandled cases, errors, exceptions, risky patterns, and assumptions the changed code makes that could break.\n"
+    "- 'design': maintainability, cohesion, complexity, coupling, SRP violations, and adherence to clean code principles.\n"
+    "- 'style': naming, layout, formatting, readability, duplication, or function length.\n"
+    "Review the changed lines ONLY, tag each comment with its category, and follow the format instructions precisely.",
+    with_call_sites=True,
+)
+
+
+class CombinedReviewAgent(ReviewAgent):
+    """One call per file whose comments are split into the bug, design and style results."""
+
+    @property
+    def result_names(self) -> Tuple[str, ...]:
+        return REVIEW_CATEGORIES
+
+    def filter_result(self, result: dict) -> Dict[str, List[Comment]]:
+        """Splits one file's comments by category and keeps those on added diff lines."""
+        parsed_response: LLMCombinedReviewResponse = result['parsed_response']
+        comments_by_agent: Dict[str, List[Comment]] = {}
+        for agent_name in REVIEW_CATEGORIES:
+            raw_comments = [
+                Comment(file=c.file, line=c.line, message=c.message)
+                for c in parsed_response.comments if c.category == agent_name
+            ]
+            comments_by_agent[agent_name] = (
+                filter_comments_to_diff(raw_comments, result['diff'], result['filename'], agent_name=agent_name)
+                if raw_comments else []
+            )
+        return comments_by_agent
+
+    def to_cached(self, comments_by_agent: Dict[str, List[Comment]]) -> Any:
+        return {agent_name: [c.model_dump() for c in comments] for agent_name, comments in comments_by_agent.items()}
+
+    def from_cached(self, cached: Any) -> Dict[str, List[Comment]]:
+        return {agent_name: [Comment(**c) for c in cached.get(agent_name, [])] for agent_name in REVIEW_CATEGORIES}
+
+
+agent = CombinedReviewAgent("combined", prompt_template, parser,
+                            {"symbol_context": symbol_context_input, "call_sites": call_sites_input})
+AGENT_VERSION = agent.version
+review_single_file = agent.review_single_file
+areview_single_file = agent.areview_single_file
+
+def combined_agent(state: dict) -> dict:
+    """
+    Single-pass review: one LLM call per file returns bug, design and style comments
+    together, instead of sending the same file content to three agents.
+    """
+    print("[combined_agent] Reviewing files for bugs, design and style in one pass")
+    return agent.run(state)
+
+async def acombined_agent(state: dict) -> dict:
+    """Async variant of combined_agent: per-file calls go through ainvoke on the chain."""
+    print("[combined_agent] Reviewing files for bugs, design and style in one pass (async)")
+    return await agent.arun(state)
@@ -1,202 +1,138 @@
 # nodes/agents/context_agent.py
-import re
-from typing import List, Dict, Any, Optional
+import os
+import asyncio
+from typing import Any, Dict, List, Optional
 
-from gitkritik2.core.models import ReviewState, AgentResult, Comment, FileContext
-from gitkritik2.core.llm_interface import get_llm
+from gitkritik2.core.models import AgentResult, FileContext, ReviewState
 from gitkritik2.core.utils import ensure_review_state
-from gitkritik2.core.tools import get_symbol_definition # Import your tool
+from gitkritik2.core.tools import find_project_root, symbol_definitions
+from gitkritik2.core.import_resolver import RESOLVED_EXTENSIONS, resolve_symbols
+from gitkritik2.core.symbol_index import SymbolIndex, get_symbol_index
+from gitkritik2.core.impact import call_sites
 
-from langchain_core.prompts import PromptTemplate # Use basic PromptTemplate for ReAct
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.tools import BaseTool
-from langchain.schema import AgentAction, AgentFinish
+# Languages with import resolution (Python, JS/TS, Go, Java); other files get no symbol context
+CONTEXT_EXTENSIONS = RESOLVED_EXTENSIONS
 
-# --- ReAct Agent Setup ---
 
-# Define the specific ReAct prompt template using string concatenation
-# ADDED the {tools} placeholder below "Available Tools:"
-# nodes/agents/context_agent.py
-# ... (other imports) ...
-
-# --- ReAct Agent Setup ---
-
-# Revised prompt template with clearer Action Input instructions
-REACT_CONTEXT_PROMPT_TEMPLATE = (
-    "You are an AI assistant analyzing code changes to understand cross-file dependencies.\n"
-    "Your goal is to identify symbols (functions, classes) used in the CHANGED code (lines starting with '+' in the diff)\n"
-    "that are likely imported from OTHER files within the project. For each identified symbol,\n"
-    "determine its likely source file path (relative to project root) based on 'import' statements in the full file content,\n"
-    "and use the available tool to fetch its definition. Only fetch definitions for symbols defined within the project, not external libraries.\n\n"
-    "Available Tools:\n"
-    "{tools}\n\n" # Formatted list of tools and descriptions provided by the framework
-    "Use the following format for your reasoning process:\n\n"
-    "Thought: [Your reasoning about identifying an imported symbol and its source file based on imports in the full content and usage in the diff +lines]\n"
-    "Action: Use the '{tool_names}' tool.\n" # Tool name provided by the framework
-    # --- Explicit Instruction for Action Input ---
-    "Action Input: Provide the arguments as a valid JSON dictionary on a single line. The JSON dictionary MUST contain BOTH the key \"file_path\" (string, relative path from project root) and the key \"symbol_name\" (string, the exact symbol). Example: {{\"file_path\": \"src/utils/helpers.py\", \"symbol_name\": \"process_user_data\"}}\n"
-    # --- End Explicit Instruction ---
-    "Observation: [Result from the tool will be inserted here]\n"
-    "Thought: [Your reasoning about the observation and whether more context is needed]\n"
-    "... (repeat Thought/Action/Action Input/Observation loop N times for relevant symbols)\n\n"
-    "Thought: I have finished gathering context for all relevant imported symbols used in the changed lines of this file.\n"
-    "Final Answer: Successfully gathered context.\n"
-    "Definitions Fetched:\n"
-    "[symbol_name_1]: Result from tool (definition or error message)\n"
-    "[symbol_name_2]: Result from tool (definition or error message)\n"
-    "... (List ALL symbols looked up and their corresponding full Observation result)\n"
-    '[If no symbols were looked up, state "No symbols looked up."]\n\n'
-    "Begin!\n\n"
-    "Current file being reviewed: {filename}\n\n"
-    "Changed code snippet (Diff - Focus on '+' lines):\n"
-    "```diff\n"
-    "{diff}\n"
-    "```\n\n"
-    "Full file content (for finding imports and original context):\n"
-    "```\n"
-    "{file_content}\n"
-    "```\n\n"
-    "Thought:{agent_scratchpad}" # Scratchpad provided by the framework
-)
-
-# --- Rest of context_agent.py ---
-# react_prompt = PromptTemplate.from_template(REACT_CONTEXT_PROMPT_TEMPLATE)
-# tools: List[BaseTool] = [get_symbol_definition]
-# ... (definition of _parse_final_answer_for_definitions) ...
-# ... (definition of context_agent function using create_react_agent and AgentExecutor) ...
-
-
-react_prompt = PromptTemplate.from_template(REACT_CONTEXT_PROMPT_TEMPLATE)
-tools: List[BaseTool] = [get_symbol_definition]
-
-def _parse_final_answer_for_definitions(final_answer: str) -> Dict[str, str]:
-    """Parses the 'Definitions Fetched:' section of the agent's final answer."""
-    definitions = {}
-    definitions_section_marker = "Definitions Fetched:"
-    if definitions_section_marker not in final_answer:
-        print("[_parse_final_answer] Warning: 'Definitions Fetched:' marker not found in Final Answer.")
-        return definitions
-
-    content_after_marker = final_answer.split(definitions_section_marker, 1)[1]
-    pattern = re.compile(r"^\s*\[?([\w_.-]+)\]?:\s?(.*)")
-    current_symbol = None
-    current_definition_lines = []
-
-    for line in content_after_marker.strip().split('\n'):
-        match = pattern.match(line)
-        if match:
-            if current_symbol:
-                 definitions[current_symbol] = "\n".join(current_definition_lines).strip()
-            current_symbol = match.group(1)
-            current_definition_lines = [match.group(2)]
-        elif current_symbol:
-             current_definition_lines.append(line)
-
-    if current_symbol:
-        definitions[current_symbol] = "\n".join(current_definition_lines).strip()
-
-    if "No symbols looked up." in content_after_marker and not definitions:
-         pass # Correctly parsed as empty
-
-    if not definitions and definitions_section_marker in final_answer and "No symbols looked up." not in content_after_marker:
-         print("[_parse_final_answer] Warning: 'Definitions Fetched:' marker found, but no definitions parsed.")
+def _has_changes(context: FileContext) -> bool:
+    return bool(context.diff) and any(
+        line.startswith(('-', '+')) and not (line.startswith('---') or line.startswith('+++'))
+        for line in context.diff.splitlines()
+    )
 
-    return definitions
 
+def project_symbol_index(_state: ReviewState, project_root: str) -> Optional[SymbolIndex]:
+    """The run's symbol index, or None when disabled (symbol_index: false)."""
+    return get_symbol_index(project_root, _state.symbol_index_path) if _state.symbol_index else None
 
-def context_agent(state: dict) -> dict:
+
+def gather_single_file_context(filename: str, context: FileContext, project_root: str,
+                               index: Optional[SymbolIndex] = None) -> Dict[str, str]:
     """
-    LangGraph node using a ReAct agent to gather cross-file context
-    by parsing the agent's final answer.
+    Definitions of the project symbols used on the file's added lines. The file's imports
+    are parsed (`ast` for Python, patterns for JS/TS, Go and Java) and mapped to project
+    files, then each symbol is read from the symbol index (jedi or the language's extractor
+    without one): no LLM calls. Files that import nothing from the project are skipped.
     """
-    print("[context_agent] Gathering cross-file context using ReAct")
-    _state = ensure_review_state(state)
-    llm = get_llm(_state)
-
-    if not llm:
-        print("[context_agent] LLM not available, skipping context gathering.")
-        if "agent_results" not in state: state["agent_results"] = {}
-        state["agent_results"]["context"] = AgentResult(
-            agent_name="context", comments=[],
-            reasoning="Context gathering skipped: LLM not available"
-        ).model_dump()
-        return state
-
-    # Create the ReAct agent components
-    try:
-        # This uses the react_prompt which now includes {tools}
-        react_agent = create_react_agent(llm, tools, react_prompt)
-        agent_executor = AgentExecutor(
-            agent=react_agent,
-            tools=tools,
-            verbose=True,
-            handle_parsing_errors="Agent Error: Could not parse LLM output. Please check format and try again.",
-            max_iterations=6,
-        )
-    except Exception as e:
-        print(f"[context_agent] Error creating ReAct agent/executor: {e}")
-        # This error might still occur if other required variables are missing,
-        # but the reported 'tools' variable should now be satisfied.
-        if "agent_results" not in state: state["agent_results"] = {}
-        state["agent_results"]["context"] = AgentResult(
-            agent_name="context", comments=[],
-            reasoning=f"Context gathering skipped: Agent creation failed: {e}"
-        ).model_dump()
-        return state
-
-    # Store collected definitions here before updating state
-    collected_definitions_per_file: Dict[str, Dict[str, str]] = {}
-
-    for filename, context in _state.file_contexts.items():
-        has_changes = context.diff and any(
-             line.startswith(('-', '+')) and not (line.startswith('---') or line.startswith('+++'))
-             for line in context.diff.splitlines()
-        )
-        if not context.after or not context.diff or not has_changes:
-            print(f"[context_agent] Skipping {filename} - missing content, diff, or no substantive changes.")
+    if not filename.lower().endswith(CONTEXT_EXTENSIONS) or not context.after or not _has_changes(context):
+        return {}
+    symbols = resolve_symbols(filename, context.after, context.diff, project_root)
+    if not symbols:
+        print(f"[context_agent] {filename}: no project symbols used in the changes, skipping.")
+        return {}
+
+    definitions: Dict[str, str] = {}
+    results = symbol_definitions([(module_file, symbol) for symbol, module_file in symbols], project_root, index)
+    for symbol, module_file in symbols:
+        definition = results[(module_file, symbol)]
+        if definition.startswith("Error"):
+            print(f"[context_agent] {filename}: {symbol} from {module_file}: {definition}")
             continue
+        definitions[symbol] = definition
+    print(f"[context_agent] {filename}: fetched {len(definitions)} of {len(symbols)} definitions ({', '.join(definitions)})")
+    return definitions
+
+
+async def agather_single_file_context(filename: str, context: FileContext, project_root: str,
+                                      index: Optional[SymbolIndex] = None) -> Dict[str, str]:
+    """Async variant of gather_single_file_context; parsing and lookups run in a worker thread."""
+    return await asyncio.to_thread(gather_single_file_context, filename, context, project_root, index)
 
-        print(f"[context_agent] Processing {filename} for context...")
-
-        try:
-            # Invoke the ReAct agent executor
-            # The 'create_react_agent' setup should handle injecting 'tools' and 'tool_names'
-            # into the underlying prompt when formatting.
-            response = agent_executor.invoke({
-                "filename": filename,
-                "diff": context.diff,
-                "file_content": context.after,
-                # No need to manually pass tools/tool_names here if using create_react_agent
-                # It gets them from the 'tools' list passed during creation.
-            })
-
-            final_answer = response.get("output", "")
-            print(f"[context_agent] ReAct Final Answer for {filename}: {final_answer}")
-            parsed_definitions = _parse_final_answer_for_definitions(final_answer)
-            collected_definitions_per_file[filename] = parsed_definitions
-            print(f"[context_agent] Parsed definitions for {filename}: {list(parsed_definitions.keys())}")
-
-        except Exception as e:
-            print(f"[context_agent] Error invoking ReAct agent for {filename}: {e}")
-            collected_definitions_per_file[filename] = {"__agent_error__": f"Agent execution failed: {e}"}
-
-
-    # --- Update State ---
-    if "file_contexts" in state:
-        for filename, definitions in collected_definitions_per_file.items():
-             if filename in state["file_contexts"]:
-                 if isinstance(state["file_contexts"][filename], dict):
-                     if definitions:
-                          state["file_contexts"][filename]["symbol_definitions"] = definitions
-                 else:
-                      print(f"[WARN] ContextAgent: state['file_contexts'][{filename}] is not a dict, cannot update symbol_definitions.")
-
-    if "agent_results" not in state: state["agent_results"] = {}
-    state["agent_results"]["context"] = AgentResult(
-         agent_name="context",
-         comments=[],
-         reasoning="Completed context gathering attempt via ReAct."
-    ).model_dump()
-
-    return state
\ No newline at end of file
+
+def gather_call_sites(filename: str, context: FileContext, index: Optional[SymbolIndex],
+                      max_tokens: int) -> Dict[str, List[str]]:
+    """
+    Call sites in other files of the functions and types the file's diff changes or removes,
+    read from the symbol index's reference and import tables (see core/impact.py). Needs
+    the index: nothing is gathered when it is disabled or `max_tokens` is 0.
+    """
+    if index is None or max_tokens <= 0 or not context.after or not _has_changes(context):
+        return {}
+    sites = call_sites(index, filename, context, max_tokens)
+    if sites:
+        count = sum(len(entries) for entries in sites.values())
+        print(f"[context_agent] {filename}: {count} call sites of changed symbols ({', '.join(sites)})")
+    return sites
+
+
+async def agather_call_sites(filename: str, context: FileContext, index: Optional[SymbolIndex],
+                             max_tokens: int) -> Dict[str, List[str]]:
+    """Async variant of gather_call_sites; index reads run in a worker thread."""
+    return await asyncio.to_thread(gather_call_sites, filename, context, index, max_tokens)
+
+
+def _context_update(state: dict, definitions_per_file: Dict[str, Dict[str, str]],
+                    call_sites_per_file: Dict[str, Dict[str, List[str]]]) -> dict:
+    # Build a new file_contexts mapping instead of mutating the graph's channel value in place
+    updated_file_contexts: Dict[str, Any] = dict(state.get("file_contexts", {}))
+    for filename in definitions_per_file:
+        definitions, sites = definitions_per_file[filename], call_sites_per_file.get(filename)
+        if (definitions or sites) and isinstance(updated_file_contexts.get(filename), dict):
+            updated_file_contexts[filename] = {**updated_file_contexts[filename],
+                                               "symbol_definitions": definitions, "call_sites": sites or {}}
+
+    with_context = sum(1 for definitions in definitions_per_file.values() if definitions)
+    with_callers = sum(1 for sites in call_sites_per_file.values() if sites)
+    return {
+        "file_contexts": updated_file_contexts,
+        "agent_results": {"context": AgentResult(
+            agent_name="context",
+            comments=[],
+            reasoning=f"Resolved project imports statically; symbol context for {with_context} and call sites "
+                      f"for {with_callers} of {len(definitions_per_file)} files."
+        ).model_dump()},
+    }
+
+
+def context_agent(state: dict) -> dict:
+    """LangGraph node: gathers cross-file symbol definitions for every changed file, without the LLM."""
+    print("[context_agent] Gathering cross-file context from imports")
+    _state = ensure_review_state(state)
+    project_root = find_project_root(os.getcwd())
+    index = project_symbol_index(_state, project_root)
+    definitions_per_file = {
+        filename: gather_single_file_context(filename, context, project_root, index)
+        for filename, context in _state.file_contexts.items()
+    }
+    call_sites_per_file = {
+        filename: gather_call_sites(filename, context, index, _state.call_sites_max_tokens)
+        for filename, context in _state.file_contexts.items()
+    }
+    return _context_update(state, definitions_per_file, call_sites_per_file)
+
+
+async def acontext_agent(state: dict) -> dict:
+    """Async variant of context_agent: files are resolved in worker threads."""
+    print("[context_agent] Gathering cross-file context from imports (async)")
+    _state = ensure_review_state(state)
+    project_root = find_project_root(os.getcwd())
+    # Opening the index refreshes it, which stats every file: keep that off the event loop
+    index = await asyncio.to_thread(project_symbol_index, _state, project_root)
+    filenames = list(_state.file_contexts)
+    results, sites = await asyncio.gather(
+        asyncio.gather(*(agather_single_file_context(filename, _state.file_contexts[filename], project_root, index)
+                         for filename in filenames)),
+        asyncio.gather(*(agather_call_sites(filename, _state.file_contexts[filename], index, _state.call_sites_max_tokens)
+                         for filename in filenames)),
+    )
+    return _context_update(state, dict(zip(filenames, results)), dict(zip(filenames, sites)))
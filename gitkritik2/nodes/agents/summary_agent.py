@@ -1,15 +1,22 @@
 # nodes/agents/summary_agent.py
+import os
+from typing import Any, Dict, List, Optional
+
 from gitkritik2.core.models import ReviewState, AgentResult
 from gitkritik2.core.llm_interface import get_llm
 from gitkritik2.core.utils import ensure_review_state
+from gitkritik2.core.model_limits import prompt_token_budget
+from gitkritik2.core.tokens import CHARS_PER_TOKEN, estimate_tokens, estimate_messages_tokens, trim_diff_to_tokens
+from gitkritik2.core.telemetry import LLMTelemetryHandler, telemetry_config
+from gitkritik2.core.hedging import hedged_chain
+from gitkritik2.core.concurrency import run_chain_per_file, arun_chain_per_file
+from gitkritik2.core.review_cache import ReviewCache, agent_version, get_review_cache
 
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import Runnable
+from langchain_core.runnables import Runnable, RunnableConfig
 
-def summary_agent(state: ReviewState) -> ReviewState:
-    print("[summary_agent] Generating high-level summary")
-    state = ReviewState(**state)
 
 # Define Prompt Template (outside function)
 prompt_template = ChatPromptTemplate.from_messages(
@@ -32,51 +39,386 @@ prompt_template = ChatPromptTemplate.from_messages(
     ]
 )
 
+# Map-reduce mode for large changes: per-file/directory summaries, then merged into one
+map_prompt_template = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are a senior AI reviewer summarizing one part of a larger code change. "
+            "Other parts are summarized separately and merged later, so cover only the diffs shown."
+        ),
+        (
+            "human",
+            "Summarize the changes in {scope}:\n\n"
+            "```diff\n"
+            "{diff}\n"
+            "```\n\n"
+            "List the key changes in a few short bullet points: what changed, its purpose (if inferrable), "
+            "and any removed or renamed APIs or risky changes."
+        ),
+    ]
+)
+
+reduce_prompt_template = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are a senior AI reviewer summarizing a code change across multiple files. "
+            "Your goal is to produce a clear, concise overview of the key changes, their purpose (if inferrable), "
+            "any significant architectural shifts, major additions/removals, or potential high-level impacts. "
+            "Keep the summary brief and suitable for a pull request comment."
+        ),
+        (
+            "human",
+            "The change is too large to show at once. These are summaries of its parts:\n\n"
+            "{summaries}\n\n"
+            "Combine them into a concise, high-level summary of the whole change."
+        ),
+    ]
+)
+
+# Cached part summaries are reused while the prompts are unchanged
+MAP_VERSION = agent_version(map_prompt_template)
+DEFAULT_MAP_REDUCE_TOKENS = 12000
+# Diff tokens per map call; small files in one directory share a call
+MAP_CHUNK_TOKENS = 6000
+
+
+def _skipped_result() -> dict:
+    print("[summary_agent] LLM not available, skipping summary.")
+    skipped_summary = "Summary generation skipped: LLM not available."
+    # Parallel branch: return only the keys this node writes
+    return {
+        "summary_review": skipped_summary,
+        "agent_results": {"summary": AgentResult(agent_name="summary", comments=[], reasoning=skipped_summary).model_dump()},
+    }
+
+
+# Below this many tokens a trimmed diff says less than its line counts
+MIN_DIFF_SHARE_TOKENS = 64
+
+
+def _diffstat_line(diff: str) -> str:
+    added = sum(1 for line in diff.splitlines() if line.startswith("+") and not line.startswith("+++"))
+    removed = sum(1 for line in diff.splitlines() if line.startswith("-") and not line.startswith("---"))
+    return f"(diff omitted to fit the model's context window: +{added} -{removed} lines)"
+
+
+def _diff_shares(diff_tokens: Dict[str, int], budget: int) -> Dict[str, int]:
+    """
+    Splits the budget across files: diffs smaller than an equal share keep their full size
+    and the rest of their share goes to the larger diffs.
+    """
+    shares: Dict[str, int] = {}
+    remaining = dict(diff_tokens)
+    while remaining:
+        share = max(0, budget) // len(remaining)
+        small = {name: tokens for name, tokens in remaining.items() if tokens <= share}
+        if not small:
+            shares.update({name: share for name in remaining})
+            break
+        for name, tokens in small.items():
+            shares[name] = tokens
+            budget -= tokens
+            del remaining[name]
+    return shares
+
+
+def _build_summary_input(_state: ReviewState) -> str:
+    """
+    Concatenates the per-file diffs into one prompt input. When they don't all fit the
+    model's prompt budget, each file's diff is trimmed to whole hunks within its share.
+    """
+    if not _state.file_contexts:
+        print("[summary_agent] No file contexts found to summarize.")
+        return "No changes detected or context prepared."
+
+    headers = {filename: f"\n--- Diff for {filename} ---\n" for filename in _state.file_contexts}
+    diffs = {
+        filename: context.diff if context.diff else f"No diff content for {filename}."
+        for filename, context in _state.file_contexts.items()
+    }
+    diff_tokens = {filename: estimate_tokens(diff) for filename, diff in diffs.items()}
+    budget = (prompt_token_budget(_state)
+              - estimate_messages_tokens(prompt_template.format_messages(diff_summary=""))
+              - sum(estimate_tokens(header) for header in headers.values()))
+
+    if sum(diff_tokens.values()) > budget:
+        shares = _diff_shares(diff_tokens, budget)
+        print(f"[summary_agent] Diffs total ~{sum(diff_tokens.values())} tokens, trimming to fit budget {budget}")
+        for filename, share in shares.items():
+            if diff_tokens[filename] <= share:
+                continue
+            if share < MIN_DIFF_SHARE_TOKENS:
+                diffs[filename] = _diffstat_line(diffs[filename])
+            else:
+                diffs[filename] = trim_diff_to_tokens(diffs[filename], share)
+
+    summary_input = "".join(headers[filename] + diffs[filename] + "\n" for filename in diffs)
+    return summary_input.strip()
+
+
+def _map_reduce_threshold(_state: ReviewState) -> Optional[int]:
+    """Diff tokens above which the summary is map-reduced, or None when disabled. Never above what fits one prompt."""
+    if _state.summary_map_reduce_tokens <= 0:
+        return None
+    return min(_state.summary_map_reduce_tokens, prompt_token_budget(_state)
+               - estimate_messages_tokens(prompt_template.format_messages(diff_summary="")))
+
+
+def _use_map_reduce(_state: ReviewState) -> bool:
+    threshold = _map_reduce_threshold(_state)
+    if threshold is None or not _state.file_contexts:
+        return False
+    total = sum(estimate_tokens(context.diff or "") for context in _state.file_contexts.values())
+    if total <= threshold:
+        return False
+    print(f"[summary_agent] Diffs total ~{total} tokens (threshold {threshold}), summarizing per file/directory first")
+    return True
+
+
+def _map_inputs(_state: ReviewState) -> Dict[str, dict]:
+    """
+    One map input per chunk, keyed by its scope: files are grouped by directory and packed
+    into chunks of up to MAP_CHUNK_TOKENS diff tokens. A file larger than that gets its own
+    chunk, trimmed to whole hunks if it doesn't fit the prompt budget.
+    """
+    budget = prompt_token_budget(_state) - estimate_messages_tokens(map_prompt_template.format_messages(scope="", diff=""))
+    chunk_tokens = min(MAP_CHUNK_TOKENS, budget)
+    by_directory: Dict[str, List[str]] = {}
+    for filename in _state.file_contexts:
+        by_directory.setdefault(os.path.dirname(filename), []).append(filename)
+
+    inputs: Dict[str, dict] = {}
+    for directory, filenames in by_directory.items():
+        chunks: List[List[str]] = []
+        used = 0
+        for filename in filenames:
+            tokens = estimate_tokens(_state.file_contexts[filename].diff or "")
+            if not chunks or used + tokens > chunk_tokens:
+                chunks.append([])
+                used = 0
+            chunks[-1].append(filename)
+            used += tokens
+        for n, chunk in enumerate(chunks, start=1):
+            if len(chunk) == 1:
+                scope = chunk[0]
+            else:
+                scope = f"{directory or '.'}/ ({len(chunk)} files{f', part {n}' if len(chunks) > 1 else ''})"
+            diffs = []
+            for filename in chunk:
+                diff = _state.file_contexts[filename].diff or f"No diff content for {filename}."
+                diffs.append(f"--- Diff for {filename} ---\n{trim_diff_to_tokens(diff, budget) if len(chunk) == 1 else diff}")
+            inputs[scope] = {"scope": scope, "diff": "\n".join(diffs)}
+    return inputs
+
+
+def _partition_map_cache(review_cache: Optional[ReviewCache], inputs: Dict[str, dict]):
+    """(cached part summaries, inputs still needing a call, cache keys), by scope. Keys hash the chunk's diffs."""
+    cached: Dict[str, str] = {}
+    pending: Dict[str, dict] = {}
+    keys: Dict[str, str] = {}
+    for scope, map_input in inputs.items():
+        if review_cache is not None:
+            keys[scope] = review_cache.content_key("summary-map", MAP_VERSION, map_input["diff"])
+            value = review_cache.get(keys[scope])
+            if value is not None:
+                cached[scope] = value
+                continue
+        pending[scope] = map_input
+    if cached:
+        print(f"[summary_agent] Reusing {len(cached)} cached part summaries")
+    return cached, pending, keys
+
+
+def _part_summaries(inputs: Dict[str, dict], cached: Dict[str, str], results: Dict[str, Any],
+                    review_cache: Optional[ReviewCache], keys: Dict[str, str]) -> List[str]:
+    """Part summaries in input order; a part whose call failed is described by its line counts."""
+    summaries = []
+    for scope, map_input in inputs.items():
+        if scope in cached:
+            summary = cached[scope]
+        elif isinstance(results[scope], Exception):
+            print(f"[summary_agent] Error summarizing {scope}: {results[scope]}")
+            summary = _diffstat_line(map_input["diff"])
+        else:
+            summary = results[scope].strip()
+            if review_cache is not None:
+                review_cache.put(keys[scope], "summary-map", scope, summary)
+        summaries.append(f"### {scope}\n{summary}")
+    return summaries
+
+
+def _reduce_batches(summaries: List[str], budget: int) -> List[List[str]]:
+    """Packs summaries in order into groups whose combined size fits one reduce prompt."""
+    batches: List[List[str]] = [[]]
+    used = 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if batches[-1] and used + tokens > budget:
+            batches.append([])
+            used = 0
+        batches[-1].append(summary)
+        used += tokens
+    return batches
+
+
+def _next_reduce_round(summaries: List[str], budget: int, round_number: int) -> Optional[Dict[str, dict]]:
+    """Reduce inputs for another round, or None once the summaries fit one final prompt."""
+    if len(summaries) <= 1 or sum(estimate_tokens(s) for s in summaries) <= budget:
+        return None
+    batches = _reduce_batches(summaries, budget)
+    if len(batches) == len(summaries):
+        return None # Every summary fills a prompt on its own, the final prompt trims each to a share
+    print(f"[summary_agent] Reduce round {round_number}: {len(summaries)} summaries -> {len(batches)}")
+    return {f"reduce-{round_number}-{n}": {"summaries": "\n\n".join(batch)} for n, batch in enumerate(batches)}
+
+
+def _trim_summary(summary: str, max_tokens: int) -> str:
+    """`summary` cut at a line end to about `max_tokens`, marked as trimmed when anything was cut."""
+    if estimate_tokens(summary) <= max_tokens:
+        return summary
+    marker = "\n(Trimmed to fit the final prompt.)"
+    kept = summary[:max(0, int((max_tokens - estimate_tokens(marker)) * CHARS_PER_TOKEN))]
+    while kept and estimate_tokens(kept + marker) > max_tokens:
+        kept = kept[:int(len(kept) * 0.9)]
+    if "\n" in kept:
+        kept = kept[:kept.rindex("\n")]
+    return kept + marker
+
+
+def _final_reduce_input(summaries: List[str], budget: int) -> str:
+    """
+    Input of the final reduce prompt. When the summaries still don't fit (each one fills a
+    prompt on its own, so no round can merge them), each gets an equal share of the budget
+    instead of dropping the parts that don't fit.
+    """
+    if sum(estimate_tokens(s) for s in summaries) <= budget:
+        return "\n\n".join(summaries)
+    share = max(1, budget // len(summaries) - 2) # Separators and per-summary rounding
+    print(f"[summary_agent][WARN] {len(summaries)} part summaries don't fit the final prompt, trimming each to ~{share} tokens")
+    return "\n\n".join(_trim_summary(summary, share) for summary in summaries)
+
+
+def _reduced(results: Dict[str, Any]) -> List[str]:
+    for result in results.values():
+        if isinstance(result, Exception):
+            raise result
+    return [result.strip() for result in results.values()]
+
+
+def _map_reduce_chains(llm: BaseChatModel):
+    map_chain = hedged_chain(llm, lambda model: map_prompt_template | model | StrOutputParser())
+    reduce_chain = hedged_chain(llm, lambda model: reduce_prompt_template | model | StrOutputParser())
+    return map_chain, reduce_chain
+
+
+def _map_reduce_summary(llm: BaseChatModel, _state: ReviewState, config: RunnableConfig) -> str:
+    """
+    Summarizes each file/directory chunk in parallel (cached by its diffs), then merges the
+    part summaries in as many reduce rounds as it takes for them to fit one final prompt.
+    """
+    map_chain, reduce_chain = _map_reduce_chains(llm)
+    review_cache = get_review_cache(_state)
+    inputs = _map_inputs(_state)
+    cached, pending, keys = _partition_map_cache(review_cache, inputs)
+    print(f"[summary_agent] Summarizing {len(pending)} of {len(inputs)} parts (max concurrency {_state.max_concurrency})...")
+    results = run_chain_per_file(map_chain, pending, _state.max_concurrency, config)
+    summaries = _part_summaries(inputs, cached, results, review_cache, keys)
+
+    budget = prompt_token_budget(_state) - estimate_messages_tokens(reduce_prompt_template.format_messages(summaries=""))
+    round_number = 1
+    while (reduce_inputs := _next_reduce_round(summaries, budget, round_number)) is not None:
+        summaries = _reduced(run_chain_per_file(reduce_chain, reduce_inputs, _state.max_concurrency, config))
+        round_number += 1
+    final_input = _final_reduce_input(summaries, budget)
+    return reduce_chain.invoke({"summaries": final_input}, config=config)
+
+
+async def _amap_reduce_summary(llm: BaseChatModel, _state: ReviewState, config: RunnableConfig) -> str:
+    """Async variant of _map_reduce_summary."""
+    map_chain, reduce_chain = _map_reduce_chains(llm)
+    review_cache = get_review_cache(_state)
+    inputs = _map_inputs(_state)
+    cached, pending, keys = _partition_map_cache(review_cache, inputs)
+    print(f"[summary_agent] Summarizing {len(pending)} of {len(inputs)} parts (max concurrency {_state.max_concurrency})...")
+    results = await arun_chain_per_file(map_chain, pending, _state.max_concurrency, config)
+    summaries = _part_summaries(inputs, cached, results, review_cache, keys)
+
+    budget = prompt_token_budget(_state) - estimate_messages_tokens(reduce_prompt_template.format_messages(summaries=""))
+    round_number = 1
+    while (reduce_inputs := _next_reduce_round(summaries, budget, round_number)) is not None:
+        summaries = _reduced(await arun_chain_per_file(reduce_chain, reduce_inputs, _state.max_concurrency, config))
+        round_number += 1
+    final_input = _final_reduce_input(summaries, budget)
+    return await reduce_chain.ainvoke({"summaries": final_input}, config=config)
+
+
+def _summary_result(summary_text: str, telemetry: LLMTelemetryHandler) -> dict:
+    # Parallel branch: return only the keys this node writes
+    summary_review = summary_text.strip()
+    return {
+        "summary_review": summary_review,
+        "llm_calls": telemetry.records,
+        "agent_results": {
+            "summary": AgentResult(
+                agent_name="summary",
+                comments=[], # Summary agent doesn't produce inline comments
+                reasoning=summary_review # Store summary as reasoning
+            ).model_dump()
+        },
+    }
+
 
 def summary_agent(state: dict) -> dict:
     print("[summary_agent] Generating high-level summary (LangChain refactor)")
     _state = ensure_review_state(state)
     llm = get_llm(_state)
     if not llm:
-        print("[summary_agent] LLM not available, skipping summary.")
-        state["summary_review"] = "Summary generation skipped: LLM not available."
-        if "agent_results" not in state: state["agent_results"] = {}
-        state["agent_results"]["summary"] = AgentResult(agent_name="summary", comments=[], reasoning=state["summary_review"]).model_dump()
-        return state
-
-    # Prepare combined diff input
-    summary_input = ""
-    if not _state.file_contexts:
-        print("[summary_agent] No file contexts found to summarize.")
-        summary_input = "No changes detected or context prepared."
-    else:
-        for filename, context in _state.file_contexts.items():
-            summary_input += f"\n--- Diff for {filename} ---\n"
-            # Prioritize the actual diff chunk if available
-            diff_content = context.diff if context.diff else f"No diff content for {filename}."
-            # Limit length per file to avoid excessive input
-            max_len = 3000 # Adjust as needed
-            summary_input += (diff_content[:max_len] + '... (truncated)' if len(diff_content) > max_len else diff_content) + "\n"
-
-    # Define Chain
-    chain: Runnable = prompt_template | llm | StrOutputParser()
+        return _skipped_result()
 
+    telemetry = LLMTelemetryHandler(_state)
+    config = telemetry_config(telemetry, agent="summary")
     summary_text = "[ERROR] Summary generation failed."
     try:
-        print("[summary_agent] Invoking LLM for summary...")
-        summary_text = chain.invoke({"diff_summary": summary_input.strip()})
+        if _use_map_reduce(_state):
+            summary_text = _map_reduce_summary(llm, _state, config)
+        else:
+            summary_input = _build_summary_input(_state)
+            # Define Chain
+            chain: Runnable = hedged_chain(llm, lambda model: prompt_template | model | StrOutputParser())
+            print("[summary_agent] Invoking LLM for summary...")
+            summary_text = chain.invoke({"diff_summary": summary_input}, config=config)
         print("[summary_agent] Summary received.")
     except Exception as e:
         print(f"[summary_agent] Error during summary generation: {e}")
         summary_text = f"[ERROR] Summary generation failed: {e}"
 
-    # Update state dictionary
-    state["summary_review"] = summary_text.strip()
-    if "agent_results" not in state: state["agent_results"] = {}
-    state["agent_results"]["summary"] = AgentResult(
-        agent_name="summary",
-        comments=[], # Summary agent doesn't produce inline comments
-        reasoning=state["summary_review"] # Store summary as reasoning
-    ).model_dump()
+    return _summary_result(summary_text, telemetry)
+
+
+async def asummary_agent(state: dict) -> dict:
+    """Async variant of summary_agent using ainvoke."""
+    print("[summary_agent] Generating high-level summary (async)")
+    _state = ensure_review_state(state)
+    llm = get_llm(_state)
+    if not llm:
+        return _skipped_result()
+
+    telemetry = LLMTelemetryHandler(_state)
+    config = telemetry_config(telemetry, agent="summary")
+    summary_text = "[ERROR] Summary generation failed."
+    try:
+        if _use_map_reduce(_state):
+            summary_text = await _amap_reduce_summary(llm, _state, config)
+        else:
+            summary_input = _build_summary_input(_state)
+            chain: Runnable = hedged_chain(llm, lambda model: prompt_template | model | StrOutputParser())
+            print("[summary_agent] Invoking LLM for summary...")
+            summary_text = await chain.ainvoke({"diff_summary": summary_input}, config=config)
+        print("[summary_agent] Summary received.")
+    except Exception as e:
+        print(f"[summary_agent] Error during summary generation: {e}")
+        summary_text = f"[ERROR] Summary generation failed: {e}"
 
-    return state
\ No newline at end of file
+    return _summary_result(summary_text, telemetry)
@@ -0,0 +1,141 @@
+# nodes/batch_review.py
+import os
+from typing import Any, Dict, List, Optional
+
+from gitkritik2.core.models import ReviewState, AgentResult, LLMCallRecord
+from gitkritik2.core.utils import ensure_review_state
+from gitkritik2.core.review_cache import get_review_cache, partition_cached
+from gitkritik2.core.review_agent import ReviewAgent
+from gitkritik2.core.tokens import estimate_tokens, estimate_messages_tokens
+from gitkritik2.core.batch import BatchRequest, BatchResult, get_batch_client, load_job, save_job
+from gitkritik2.nodes.agents import bug_agent, design_agent, style_agent, combined_agent, summary_agent
+
+# Per-file review agents whose prompts go into the batch, by review_mode
+BATCH_AGENTS: Dict[str, List[ReviewAgent]] = {
+    "separate": [bug_agent.agent, design_agent.agent, style_agent.agent],
+    "combined": [combined_agent.agent],
+}
+SUMMARY_ID = "summary"
+
+
+def _pending_inputs(_state: ReviewState, agent: ReviewAgent):
+    """(review_cache, chain_inputs, cached, pending, cache_keys) for one agent, as its live node computes them."""
+    review_cache = get_review_cache(_state)
+    chain_inputs = agent.build_chain_inputs(_state)
+    cached, pending, cache_keys = partition_cached(review_cache, agent.name, agent.version,
+                                                   _state.file_contexts, chain_inputs, agent.cache_fields)
+    return review_cache, chain_inputs, cached, pending, cache_keys
+
+
+def submit_batch(state: dict) -> dict:
+    """
+    Batch mode replacement for the review agents: renders every pending per-file prompt
+    (files with cached results are skipped) plus the summary prompt, submits them as one
+    provider batch job and saves the job record. `git kritik collect` continues from there.
+    """
+    print("[submit_batch] Rendering review prompts for a batch job")
+    _state = ensure_review_state(state)
+    cwd = os.getcwd()
+    try:
+        client = get_batch_client(_state, cwd)
+    except ValueError as e:
+        print(f"[submit_batch] Error: {e}")
+        return {"batch_job_id": None}
+
+    requests: List[BatchRequest] = []
+    index: Dict[str, dict] = {}
+    for agent in BATCH_AGENTS[_state.review_mode]:
+        _, _, _, pending, _ = _pending_inputs(_state, agent)
+        for n, (filename, chain_input) in enumerate(pending.items()):
+            # Anthropic only allows [A-Za-z0-9_-] in custom IDs, so files are numbered
+            custom_id = f"{agent.name}-{n}"
+            requests.append(BatchRequest(custom_id, agent.prompt_template.format_messages(**chain_input)))
+            index[custom_id] = {"agent": agent.name, "file": filename}
+    summary_input = summary_agent._build_summary_input(_state)
+    requests.append(BatchRequest(SUMMARY_ID, summary_agent.prompt_template.format_messages(diff_summary=summary_input)))
+    index[SUMMARY_ID] = {"agent": "summary", "file": None}
+
+    print(f"[submit_batch] Submitting {len(requests)} requests to the {client.backend} batch API...")
+    try:
+        job_id = client.submit(requests, _state.model, _state.temperature, _state.max_tokens)
+    except Exception as e:
+        print(f"[submit_batch] Error submitting batch: {e}")
+        return {"batch_job_id": None}
+
+    # The state is everything collect needs to parse results and post them; API keys are excluded
+    record = {
+        "job_id": job_id,
+        "backend": client.backend,
+        "requests": index,
+        "state": {**_state.model_dump(mode="json"), "batch_job_id": job_id},
+    }
+    path = save_job(record, cwd)
+    print(f"[submit_batch] Submitted batch {job_id}, job record saved to {path}")
+    return {"batch_job_id": job_id}
+
+
+def _call_record(result: Optional[BatchResult], entry: dict, backend: str, _state: ReviewState,
+                 request_tokens: int) -> LLMCallRecord:
+    """Telemetry for one batch request; token counts are estimated when the backend reports no usage."""
+    if result is None:
+        result = BatchResult(None, error="missing from batch results")
+    estimated = result.prompt_tokens is None
+    return LLMCallRecord(
+        agent=entry["agent"], file=entry["file"], provider=backend, model=_state.model,
+        prompt_tokens=request_tokens if estimated else result.prompt_tokens,
+        completion_tokens=estimate_tokens(result.text or "") if estimated else result.completion_tokens or 0,
+        estimated=estimated, batch=True, error=result.error,
+        cache_read_tokens=result.cache_read_tokens, cache_write_tokens=result.cache_write_tokens,
+    )
+
+
+def collect_batch(state: dict) -> dict:
+    """
+    Entry node of the collect graph: parses the finished batch job's results with each
+    agent's parser and builds the same agent_results/summary_review/llm_calls update the
+    live agents would, so merge_results, format_output and posting run unchanged.
+    """
+    _state = ensure_review_state(state)
+    job_id = state.get("batch_job_id")
+    cwd = os.getcwd()
+    print(f"[collect_batch] Collecting results of batch {job_id}")
+    record = load_job(job_id, cwd)
+    if record is None:
+        raise ValueError(f"No job record for batch {job_id}")
+    results = get_batch_client(_state, cwd).results(job_id)
+    custom_ids = {(entry["agent"], entry["file"]): custom_id for custom_id, entry in record["requests"].items()}
+    agent_results: Dict[str, Any] = {}
+    llm_calls: Dict[str, dict] = {}
+
+    def _record(custom_id: str, request_tokens: int) -> None:
+        entry = record["requests"][custom_id]
+        llm_calls[f"{job_id}:{custom_id}"] = _call_record(
+            results.get(custom_id), entry, record["backend"], _state, request_tokens).model_dump()
+
+    for agent in BATCH_AGENTS[_state.review_mode]:
+        review_cache, chain_inputs, cached, pending, cache_keys = _pending_inputs(_state, agent)
+        parsed: Dict[str, Any] = {}
+        for filename, chain_input in pending.items():
+            custom_id = custom_ids.get((agent.name, filename))
+            result = results.get(custom_id) if custom_id else None
+            if custom_id:
+                _record(custom_id, estimate_messages_tokens(agent.prompt_template.format_messages(**chain_input)))
+            if result is None or result.error:
+                parsed[filename] = RuntimeError(result.error if result else "missing from batch results")
+                continue
+            try:
+                parsed[filename] = {**chain_input, "parsed_response": agent.parser.parse(result.text or "")}
+            except Exception as e:
+                parsed[filename] = e
+        agent_results.update(agent.collect_results(chain_inputs, parsed, cached, review_cache, cache_keys)["agent_results"])
+
+    summary = results.get(SUMMARY_ID)
+    if summary is not None and summary.error is None:
+        summary_review = (summary.text or "").strip()
+    else:
+        summary_review = f"[ERROR] Summary generation failed: {summary.error if summary else 'missing from batch results'}"
+    _record(SUMMARY_ID, estimate_tokens(summary_agent._build_summary_input(_state)))
+    agent_results["summary"] = AgentResult(agent_name="summary", comments=[], reasoning=summary_review).model_dump()
+
+    print(f"[collect_batch] Collected {len(results)} of {len(record['requests'])} batch results.")
+    return {"agent_results": agent_results, "summary_review": summary_review, "llm_calls": llm_calls}
@@ -0,0 +1,37 @@
+# nodes/collect_file_results.py
+from typing import Dict, List
+from gitkritik2.core.models import AgentResult
+
+
+def collect_file_results(state: dict) -> dict:
+    """
+    Fan-in for the per-file pipeline: folds every file's comments into
+    state['agent_results'] per agent, in changed_files order so the result
+    doesn't depend on which file finished first.
+    """
+    print("[collect_file_results] Collecting per-file review results")
+    results_by_file: Dict[str, dict] = state.get("file_review_results", {})
+
+    comments_by_agent: Dict[str, List[dict]] = {}
+    errors: List[str] = []
+    for filepath in state.get("changed_files", []):
+        result = results_by_file.get(filepath)
+        if not result:
+            continue
+        if result.get("error"):
+            errors.append(f"{filepath}: {result['error']}")
+        for agent_name, comments in result.get("comments", {}).items():
+            comments_by_agent.setdefault(agent_name, []).extend(comments)
+
+    agent_results = {
+        agent_name: AgentResult(agent_name=agent_name, comments=comments).model_dump()
+        for agent_name, comments in comments_by_agent.items()
+    }
+    agent_results["context"] = AgentResult(
+        agent_name="context",
+        comments=[],
+        reasoning="Completed per-file context gathering from imports." if not errors else "; ".join(errors),
+    ).model_dump()
+
+    print(f"[collect_file_results] Collected results for {len(results_by_file)} files.")
+    return {"agent_results": agent_results}
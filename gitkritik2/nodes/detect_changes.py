@@ -2,7 +2,7 @@
 import os
 from typing import List, Optional
 # Import the centralized helpers
-from gitkritik2.core.utils import run_subprocess_command, get_merge_base
+from gitkritik2.core.utils import run_subprocess_command, get_merge_base, arun_subprocess_command, aget_merge_base
 
 def detect_changes(state: dict) -> dict:
     """
@@ -73,4 +73,54 @@ def detect_changes(state: dict) -> dict:
 
     # Ensure key exists even if empty
     state.setdefault("changed_files", [])
-    return state
\ No newline at end of file
+    return state
+
+
+async def adetect_changes(state: dict) -> dict:
+    """Async variant of detect_changes using asyncio git subprocesses."""
+    print("[detect_changes] Detecting changed files based on flags (async)")
+    target_repo_dir = os.getcwd()
+    print(f"[detect_changes] Operating in target directory: {target_repo_dir}")
+
+    review_all = state.get("review_all_files", False)
+    review_unstaged = state.get("review_unstaged", False)
+
+    if review_all:
+        description = "all modified files (staged & unstaged)"
+        changed_files_output, cmd_stderr = await arun_subprocess_command(["git", "diff", "--name-only", "HEAD"], cwd=target_repo_dir)
+    elif review_unstaged:
+        description = "unstaged files"
+        changed_files_output, cmd_stderr = await arun_subprocess_command(["git", "diff", "--name-only"], cwd=target_repo_dir)
+    else:
+        description = "staged files"
+        staged_files_output, staged_cmd_stderr = await arun_subprocess_command(
+            ["git", "diff", "--name-only", "--staged", "--diff-filter=ACMRTUXB"],
+            cwd=target_repo_dir
+        )
+        if staged_cmd_stderr is None and staged_files_output:
+             print("[detect_changes] Found staged changes.")
+             state['changed_files'] = staged_files_output.splitlines()
+             return state
+
+        if staged_cmd_stderr is not None:
+             print(f"[WARN] Failed to get staged diff: {staged_cmd_stderr}")
+        print("[detect_changes] No staged changes found or error occurred. Comparing committed changes against merge base with origin/main.")
+        merge_base = await aget_merge_base(cwd=target_repo_dir)
+        if merge_base:
+            description = f"committed changes since merge-base ({merge_base[:7]})"
+            diff_command = ["git", "diff", "--name-only", f"{merge_base}...HEAD", "--diff-filter=ACMRTUXB"]
+        else:
+            print("[WARN] Could not determine merge base. Falling back to diffing HEAD against its parent (may not be accurate for PRs).")
+            description = "last commit (fallback)"
+            diff_command = ["git", "diff", "--name-only", "HEAD~1...HEAD", "--diff-filter=ACMRTUXB"]
+        changed_files_output, cmd_stderr = await arun_subprocess_command(diff_command, cwd=target_repo_dir)
+
+    if changed_files_output is not None and cmd_stderr is None:
+        state['changed_files'] = changed_files_output.splitlines()
+        print(f"[detect_changes] Found {len(state['changed_files'])} changed files ({description}).")
+    else:
+         state['changed_files'] = []
+         print(f"[detect_changes] Failed to get diff or no changes found for {description}. Error: {cmd_stderr}")
+
+    state.setdefault("changed_files", [])
+    return state
@@ -3,12 +3,24 @@ import os
 from gitkritik2.core.models import ReviewState # Keep for reference/casting if needed internally
 from gitkritik2.core.config import load_config_file
 from gitkritik2.core.utils import ensure_review_state # Keep if casting internally
+from gitkritik2.core.concurrency import resolve_max_concurrency
+from gitkritik2.nodes.agents.summary_agent import DEFAULT_MAP_REDUCE_TOKENS
+from gitkritik2.core.impact import DEFAULT_CALL_SITES_MAX_TOKENS
+from gitkritik2.core.llm_cache import DEFAULT_CACHE_MAX_MB, DEFAULT_CACHE_MAX_AGE_DAYS
+from gitkritik2.core.rate_limit import DEFAULT_MAX_RETRIES, DEFAULT_CIRCUIT_BREAKER_THRESHOLD
+from gitkritik2.core.hf_local import HF_QUANTIZATIONS
+from gitkritik2.core.routing import RULE_CONDITIONS
+from gitkritik2.core.structured import NATIVE_OUTPUT_PROVIDERS
 
 # Default values
 DEFAULT_PLATFORM = "github"
 DEFAULT_STRATEGY = "hybrid"
 DEFAULT_MODEL = "gpt-4-turbo-preview" # Example default
 DEFAULT_LLM_PROVIDER = "openai" # Example default
+DEFAULT_REVIEW_MODE = "separate"
+REVIEW_MODES = ("separate", "combined")
+DEFAULT_PIPELINE = "per_file"
+PIPELINES = ("per_file", "staged")
 
 def init_state(state: dict) -> dict:
     """
@@ -59,10 +71,150 @@ def init_state(state: dict) -> dict:
     except ValueError:
         print("[WARN] Invalid max_tokens value, using default 2048")
         state['max_tokens'] = 2048
+    try:
+        context_window = os.getenv("GITKRITIK_CONTEXT_WINDOW") or yaml_config.get("context_window")
+        state['context_window'] = int(context_window) if context_window else None
+    except ValueError:
+        print("[WARN] Invalid context_window value, using the model's known limit")
+        state['context_window'] = None
+    state['max_concurrency'] = resolve_max_concurrency(yaml_config)
+    try:
+        state['summary_map_reduce_tokens'] = int(os.getenv("GITKRITIK_SUMMARY_MAP_REDUCE_TOKENS")
+                                                 or yaml_config.get("summary_map_reduce_tokens", DEFAULT_MAP_REDUCE_TOKENS))
+    except ValueError:
+        print(f"[WARN] Invalid summary_map_reduce_tokens value, using default {DEFAULT_MAP_REDUCE_TOKENS}")
+        state['summary_map_reduce_tokens'] = DEFAULT_MAP_REDUCE_TOKENS
+
+    # Provider endpoint and rate limiting (limits are shared by all agents calling the provider)
+    state['base_url'] = os.getenv("GITKRITIK_BASE_URL") or yaml_config.get("base_url")
+    rate_limits = yaml_config.get("rate_limits") or {}
+    if not isinstance(rate_limits, dict):
+        print("[WARN] Invalid rate_limits value (expected a mapping per provider), using defaults")
+        rate_limits = {}
+    state['rate_limits'] = rate_limits
+    try:
+        state['max_retries'] = max(0, int(os.getenv("GITKRITIK_MAX_RETRIES") or yaml_config.get("max_retries", DEFAULT_MAX_RETRIES)))
+    except ValueError:
+        print(f"[WARN] Invalid max_retries value, using default {DEFAULT_MAX_RETRIES}")
+        state['max_retries'] = DEFAULT_MAX_RETRIES
+    try:
+        state['circuit_breaker_threshold'] = max(0, int(yaml_config.get("circuit_breaker_threshold", DEFAULT_CIRCUIT_BREAKER_THRESHOLD)))
+    except (TypeError, ValueError):
+        print(f"[WARN] Invalid circuit_breaker_threshold value, using default {DEFAULT_CIRCUIT_BREAKER_THRESHOLD}")
+        state['circuit_breaker_threshold'] = DEFAULT_CIRCUIT_BREAKER_THRESHOLD
+
+    # Tail latency: hedge slow calls and/or fail over to other provider/models
+    hedging = yaml_config.get("hedging") or {}
+    if not isinstance(hedging, dict):
+        print("[WARN] Invalid hedging value (expected a mapping), hedging disabled")
+        hedging = {}
+    hedging_setting = os.getenv("GITKRITIK_HEDGING")
+    if hedging_setting is not None:
+        hedging = {**hedging, "enabled": hedging_setting.lower() not in ("false", "0", "no")}
+    state['hedging'] = hedging
+    fallback_models = yaml_config.get("fallback_models") or []
+    if not isinstance(fallback_models, list) or not all(
+            isinstance(entry, dict) and entry.get("llm_provider") and entry.get("model") for entry in fallback_models):
+        print("[WARN] Invalid fallback_models value (expected a list of {llm_provider, model}), ignoring it")
+        fallback_models = []
+    state['fallback_models'] = fallback_models
+
+    # Model routing per agent and file: first matching rule picks the provider/model
+    routing = yaml_config.get("routing") or {}
+    rules = routing.get("rules") if isinstance(routing, dict) else None
+    valid_rules = []
+    for rule in rules or []:
+        if not isinstance(rule, dict) or not rule.get("llm_provider") or not rule.get("model") or any(
+                key not in (*RULE_CONDITIONS, "llm_provider", "model", "base_url") for key in rule):
+            print(f"[WARN] Ignoring invalid routing rule {rule} (expected {{<conditions>, llm_provider, model}})")
+            continue
+        valid_rules.append(rule)
+    escalate_to = routing.get("escalate_to") if isinstance(routing, dict) else None
+    if escalate_to is not None and not (isinstance(escalate_to, dict) and escalate_to.get("llm_provider") and escalate_to.get("model")):
+        print("[WARN] Invalid routing escalate_to (expected {llm_provider, model}), escalating to the main model")
+        escalate_to = None
+    state['routing'] = {"rules": valid_rules, **({"escalate_to": escalate_to} if escalate_to else {})} if valid_rules else {}
+
+    # Local Hugging Face backend (GITKRITIK_LOCAL_BACKEND=huggingface): CPU threads, quantized weights, batching
+    huggingface = yaml_config.get("huggingface") or {}
+    if not isinstance(huggingface, dict):
+        print("[WARN] Invalid huggingface value (expected a mapping), using defaults")
+        huggingface = {}
+    huggingface = {**huggingface, **{key: value for key, value in (
+        ("threads", os.getenv("GITKRITIK_HF_THREADS")),
+        ("quantization", os.getenv("GITKRITIK_HF_QUANTIZATION")),
+    ) if value}}
+    try:
+        for key in ("threads", "max_batch_size", "batch_wait_ms"):
+            if huggingface.get(key) is not None:
+                huggingface[key] = max(0 if key == "batch_wait_ms" else 1, int(huggingface[key]))
+    except (TypeError, ValueError):
+        print("[WARN] Invalid huggingface threads/max_batch_size/batch_wait_ms, using defaults")
+        huggingface = {key: value for key, value in huggingface.items() if key not in ("threads", "max_batch_size", "batch_wait_ms")}
+    quantization = str(huggingface.get("quantization", "none")).lower()
+    if quantization not in HF_QUANTIZATIONS:
+        print(f"[WARN] Invalid huggingface quantization '{quantization}', use one of: {', '.join(HF_QUANTIZATIONS)}")
+        quantization = "none"
+    state['huggingface'] = {**huggingface, "quantization": quantization}
+
+    # Review mode: separate bug/design/style agents, or one combined call per file
+    review_mode = (os.getenv("GITKRITIK_REVIEW_MODE") or yaml_config.get("review_mode", DEFAULT_REVIEW_MODE)).lower()
+    if review_mode not in REVIEW_MODES:
+        print(f"[WARN] Invalid review_mode '{review_mode}', using default '{DEFAULT_REVIEW_MODE}'")
+        review_mode = DEFAULT_REVIEW_MODE
+    state['review_mode'] = review_mode
+
+    # Pipeline: per-file sub-pipelines (Send) or one graph node per stage
+    pipeline = (os.getenv("GITKRITIK_PIPELINE") or yaml_config.get("pipeline", DEFAULT_PIPELINE)).lower()
+    if pipeline not in PIPELINES:
+        print(f"[WARN] Invalid pipeline '{pipeline}', using default '{DEFAULT_PIPELINE}'")
+        pipeline = DEFAULT_PIPELINE
+    state['pipeline'] = pipeline
+
+    # LLM response cache: --no-cache (initial state) or llm_cache: false / GITKRITIK_LLM_CACHE=false turn it off
+    cache_setting = str(os.getenv("GITKRITIK_LLM_CACHE") or yaml_config.get("llm_cache", True)).lower()
+    state['llm_cache'] = state.get('llm_cache', True) and cache_setting not in ("false", "0", "no")
+    state['llm_cache_path'] = os.getenv("GITKRITIK_LLM_CACHE_PATH") or yaml_config.get("llm_cache_path")
+    try:
+        state['llm_cache_max_mb'] = int(yaml_config.get("llm_cache_max_mb", DEFAULT_CACHE_MAX_MB))
+        state['llm_cache_max_age_days'] = int(yaml_config.get("llm_cache_max_age_days", DEFAULT_CACHE_MAX_AGE_DAYS))
+    except (TypeError, ValueError):
+        print("[WARN] Invalid llm_cache limits, using defaults")
+        state['llm_cache_max_mb'] = DEFAULT_CACHE_MAX_MB
+        state['llm_cache_max_age_days'] = DEFAULT_CACHE_MAX_AGE_DAYS
+
+    # Incremental review cache: per-file agent results keyed by blob SHA + patch-id (--no-cache turns it off too)
+    review_cache_setting = str(os.getenv("GITKRITIK_REVIEW_CACHE") or yaml_config.get("review_cache", True)).lower()
+    state['review_cache'] = state.get('review_cache', True) and review_cache_setting not in ("false", "0", "no")
+    state['review_cache_path'] = os.getenv("GITKRITIK_REVIEW_CACHE_PATH") or yaml_config.get("review_cache_path")
+
+    # Persistent symbol index used by the context agent, refreshed incrementally at the start of a run
+    symbol_index_setting = str(os.getenv("GITKRITIK_SYMBOL_INDEX") or yaml_config.get("symbol_index", True)).lower()
+    state['symbol_index'] = symbol_index_setting not in ("false", "0", "no")
+    state['symbol_index_path'] = os.getenv("GITKRITIK_SYMBOL_INDEX_PATH") or yaml_config.get("symbol_index_path")
+    try:
+        state['call_sites_max_tokens'] = int(os.getenv("GITKRITIK_CALL_SITES_MAX_TOKENS")
+                                             or yaml_config.get("call_sites_max_tokens", DEFAULT_CALL_SITES_MAX_TOKENS))
+    except ValueError:
+        print(f"[WARN] Invalid call_sites_max_tokens value, using default {DEFAULT_CALL_SITES_MAX_TOKENS}")
+        state['call_sites_max_tokens'] = DEFAULT_CALL_SITES_MAX_TOKENS
+
+    # Provider prompt caching of the shared per-file prompt prefix
+    prompt_caching_setting = str(os.getenv("GITKRITIK_PROMPT_CACHING") or yaml_config.get("prompt_caching", True)).lower()
+    state['prompt_caching'] = prompt_caching_setting not in ("false", "0", "no")
+
+    # Native structured output (tool calling) for the review agents, where the provider supports it
+    structured_output_setting = str(os.getenv("GITKRITIK_STRUCTURED_OUTPUT") or yaml_config.get("structured_output", True)).lower()
+    state['structured_output'] = structured_output_setting not in ("false", "0", "no")
+
+    # Batch mode: --batch (initial state) submits the review prompts as one provider batch job
+    state['batch'] = bool(state.get('batch', False))
+    state['batch_backend'] = os.getenv("GITKRITIK_BATCH_BACKEND") or yaml_config.get("batch_backend")
 
     # Ensure core data structures exist if not already present
     state.setdefault("changed_files", [])
     state.setdefault("file_contexts", {})
+    state.setdefault("file_review_results", {})
     state.setdefault("agent_results", {})
     state.setdefault("inline_comments", [])
     state.setdefault("summary_review", None)
@@ -75,6 +227,23 @@ def init_state(state: dict) -> dict:
     print(f"  Repo: {state.get('repo', 'Not Set')}")
     print(f"  PR/MR #: {state.get('pr_number', 'Not Set')}")
     print(f"  Temp: {state['temperature']}, Max Tokens: {state['max_tokens']}")
+    print(f"  Context Window: {state['context_window'] or 'model default'}")
+    print(f"  Max Concurrency: {state['max_concurrency']}, Max Retries: {state['max_retries']}")
+    if state['base_url']:
+        print(f"  Base URL: {state['base_url']}")
+    if state['fallback_models']:
+        fallbacks = ", ".join(f"{m['llm_provider']}/{m['model']}" for m in state['fallback_models'])
+        print(f"  Fallback Models: {fallbacks}")
+    print(f"  Hedging: {'on' if state['hedging'].get('enabled') else 'off'}")
+    if state['routing']:
+        print(f"  Routing Rules: {len(state['routing']['rules'])}")
+    print(f"  Review Mode: {state['review_mode']}")
+    print(f"  Pipeline: {state['pipeline']}")
+    print(f"  LLM Cache: {'on' if state['llm_cache'] else 'off'}, Review Cache: {'on' if state['review_cache'] else 'off'}, "
+          f"Prompt Caching: {'on' if state['prompt_caching'] else 'off'}, "
+          f"Structured Output: {'native' if state['structured_output'] and state['llm_provider'] in NATIVE_OUTPUT_PROVIDERS else 'prompted'}")
+    if state['batch']:
+        print(f"  Batch: on ({state['batch_backend'] or state['llm_provider']})")
     # DO NOT PRINT API KEYS
 
     return state # Return the updated dictionary
\ No newline at end of file
@@ -0,0 +1,76 @@
+# nodes/plan_file_reviews.py
+import os
+from typing import Dict, List, Optional
+from gitkritik2.core.utils import run_subprocess_command, arun_subprocess_command
+from gitkritik2.nodes.prepare_context import resolve_base_ref, aresolve_base_ref
+
+
+def _parse_numstat(numstat_output: Optional[str]) -> Dict[str, int]:
+    """Parses `git diff --numstat` output into {path: added + removed lines}. Binary files count as 0."""
+    sizes: Dict[str, int] = {}
+    for line in (numstat_output or "").splitlines():
+        parts = line.split("\t", 2)
+        if len(parts) != 3:
+            continue
+        added, removed, path = parts
+        sizes[path] = (int(added) if added.isdigit() else 0) + (int(removed) if removed.isdigit() else 0)
+    return sizes
+
+
+def _order_largest_first(changed_files: List[str], sizes: Dict[str, int]) -> List[str]:
+    # Stable sort: equal sizes keep changed_files order
+    return sorted(changed_files, key=lambda path: sizes.get(path, 0), reverse=True)
+
+
+def plan_file_reviews(state: dict) -> dict:
+    """
+    Resolves the base reference once for all files and orders them largest diff first,
+    so the per-file pipeline dispatches the slowest reviews before the quick ones.
+    """
+    print("[plan_file_reviews] Resolving base reference and review order")
+    if state.get("pipeline") == "staged":
+        # Staged pipeline resolves the base reference itself in prepare_context
+        return state
+    target_repo_dir = os.getcwd()
+    changed_files: List[str] = state.get("changed_files", [])
+    if not changed_files:
+        state["review_order"] = []
+        return state
+
+    base_ref = resolve_base_ref(target_repo_dir)
+    numstat, stderr = run_subprocess_command(
+        ["git", "diff", "--numstat", "--no-renames", base_ref, "--", *changed_files],
+        cwd=target_repo_dir
+    )
+    if stderr is not None:
+        print(f"[plan_file_reviews][WARN] Could not size diffs, keeping detected order: {stderr}")
+
+    state["base_ref"] = base_ref
+    state["review_order"] = _order_largest_first(changed_files, _parse_numstat(numstat))
+    print(f"[plan_file_reviews] Base reference: {base_ref}, {len(changed_files)} files to review")
+    return state
+
+
+async def aplan_file_reviews(state: dict) -> dict:
+    """Async variant of plan_file_reviews."""
+    print("[plan_file_reviews] Resolving base reference and review order (async)")
+    if state.get("pipeline") == "staged":
+        return state
+    target_repo_dir = os.getcwd()
+    changed_files: List[str] = state.get("changed_files", [])
+    if not changed_files:
+        state["review_order"] = []
+        return state
+
+    base_ref = await aresolve_base_ref(target_repo_dir)
+    numstat, stderr = await arun_subprocess_command(
+        ["git", "diff", "--numstat", "--no-renames", base_ref, "--", *changed_files],
+        cwd=target_repo_dir
+    )
+    if stderr is not None:
+        print(f"[plan_file_reviews][WARN] Could not size diffs, keeping detected order: {stderr}")
+
+    state["base_ref"] = base_ref
+    state["review_order"] = _order_largest_first(changed_files, _parse_numstat(numstat))
+    print(f"[plan_file_reviews] Base reference: {base_ref}, {len(changed_files)} files to review")
+    return state
@@ -2,8 +2,8 @@
 import os
 from gitkritik2.core.models import ReviewState
 from gitkritik2.core.utils import ensure_review_state
-from gitkritik2.platform.github import post_inline_comment_github
-from gitkritik2.platform.gitlab import post_inline_comment_gitlab
+from gitkritik2.platform.github import post_inline_comment_github, apost_inline_comment_github
+from gitkritik2.platform.gitlab import post_inline_comment_gitlab, apost_inline_comment_gitlab
 
 
 def post_inline(state: dict) -> dict:
@@ -41,3 +41,33 @@ def post_inline(state: dict) -> dict:
 
     return state  # Return original state dict
 
+
+async def apost_inline(state: dict) -> dict:
+    """Async variant of post_inline using the httpx platform clients."""
+    print("[post_inline] Posting inline comments (async)")
+    try:
+        _state = ensure_review_state(state)
+    except Exception as e:
+        print(f"[ERROR] post_inline received invalid state: {e}")
+        return state
+
+    if os.getenv("GITKRITIK_DRY_RUN") == "true":
+        print("[post_inline] Skipping — dry run mode")
+        return state
+
+    if os.getenv("GITKRITIK_INLINE") != "true":
+        print("[post_inline] Skipping inline posting — not requested by GITKRITIK_INLINE env var")
+        return state
+
+    if not _state.inline_comments:
+        print("[post_inline] No inline comments found in state to post")
+        return state
+
+    if _state.platform == "github":
+        await apost_inline_comment_github(_state)
+    elif _state.platform == "gitlab":
+        await apost_inline_comment_gitlab(_state)
+    else:
+        print(f"[post_inline] Unsupported platform for inline comments: {_state.platform}")
+
+    return state
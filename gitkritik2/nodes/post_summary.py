@@ -2,8 +2,8 @@
 import os
 # Ensure ReviewState is imported if you need type hints
 from gitkritik2.core.models import ReviewState
-from gitkritik2.platform.github import post_summary_comment_github
-from gitkritik2.platform.gitlab import post_summary_comment_gitlab
+from gitkritik2.platform.github import post_summary_comment_github, apost_summary_comment_github
+from gitkritik2.platform.gitlab import post_summary_comment_gitlab, apost_summary_comment_gitlab
 from gitkritik2.core.utils import ensure_review_state
 
 def post_summary(state: dict) -> dict:
@@ -41,4 +41,31 @@ def post_summary(state: dict) -> dict:
     else:
         print(f"[post_summary] Unsupported platform for summary comment: {platform}")
 
-    return state # Return original state dict
\ No newline at end of file
+    return state # Return original state dict
+
+
+async def apost_summary(state: dict) -> dict:
+    """Async variant of post_summary using the httpx platform clients."""
+    print("[post_summary] Posting summary comment (async)")
+    try:
+        _state = ensure_review_state(state)
+    except Exception as e:
+        print(f"[ERROR] post_summary received invalid state: {e}")
+        return state
+
+    if os.getenv("GITKRITIK_DRY_RUN") == "true":
+        print("[post_summary] Skipping — dry run mode")
+        return state
+
+    if not _state.summary_review:
+        print("[post_summary] No summary review content found in state to post")
+        return state
+
+    if _state.platform == "github":
+        await apost_summary_comment_github(_state)
+    elif _state.platform == "gitlab":
+        await apost_summary_comment_gitlab(_state)
+    else:
+        print(f"[post_summary] Unsupported platform for summary comment: {_state.platform}")
+
+    return state
@@ -1,13 +1,18 @@
 # nodes/prepare_context.py
 import os
-from typing import List, Optional, Dict
+import asyncio
+import hashlib
+from typing import List, Optional
 # Keep FileContext import if used for type hints internally
 from gitkritik2.core.models import FileContext
 # Import the centralized helpers
-from gitkritik2.core.utils import run_subprocess_command, get_merge_base
+from gitkritik2.core.utils import run_subprocess_command, get_merge_base, arun_subprocess_command, aget_merge_base
 
 # --- Remove local helper functions _run_git_command, _get_merge_base ---
 
+# Cap on concurrent git subprocesses in the async path (two per file in flight)
+MAX_CONCURRENT_GIT_FILES = 8
+
 # --- Refactor file content/diff getters to use centralized helper and CWD ---
 def get_file_content_from_git(ref: str, filepath: str, cwd: str) -> Optional[str]:
     """Gets file content at a specific git reference, using specified CWD."""
@@ -39,6 +44,129 @@ def get_diff_for_file(base_ref: str, filepath: str, cwd: str) -> Optional[str]:
          return None # Safer to return None if diff command had issues
     return stdout
 
+async def aget_file_content_from_git(ref: str, filepath: str, cwd: str) -> Optional[str]:
+    """Async counterpart of get_file_content_from_git."""
+    if ".." in filepath or filepath.startswith("/"):
+        print(f"[WARN] Invalid file path requested: {filepath}")
+        return None
+    stdout, stderr = await arun_subprocess_command(["git", "show", f"{ref}:{filepath}"], cwd=cwd, check=False)
+    if stderr is not None:
+        print(f"[WARN] `git show {ref}:{filepath}` failed: {stderr}")
+        return None
+    return stdout
+
+async def aget_diff_for_file(base_ref: str, filepath: str, cwd: str) -> Optional[str]:
+    """Async counterpart of get_diff_for_file."""
+    if ".." in filepath or filepath.startswith("/"):
+        print(f"[WARN] Invalid file path requested for diff: {filepath}")
+        return None
+    stdout, stderr = await arun_subprocess_command(
+        ["git", "diff", "--patch-with-raw", base_ref, "--", filepath],
+        cwd=cwd,
+        check=False
+    )
+    if stderr is not None:
+         print(f"[WARN] `git diff {base_ref} -- {filepath}` failed: {stderr}")
+         return None
+    return stdout
+
+def compute_blob_sha(content: Optional[str]) -> Optional[str]:
+    """SHA git would assign to `content` as a blob (same as `git hash-object`), without a subprocess."""
+    if content is None:
+        return None
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def get_patch_id(diff: Optional[str], cwd: str) -> Optional[str]:
+    """`git patch-id --stable` of a file diff: unchanged by rebases that don't touch the hunks."""
+    if not diff:
+        return None
+    stdout, stderr = run_subprocess_command(["git", "patch-id", "--stable"], cwd=cwd, input_text=diff + "\n")
+    if stderr is not None or not stdout:
+        print(f"[WARN] `git patch-id` failed: {stderr}")
+        return None
+    return stdout.split()[0]
+
+async def aget_patch_id(diff: Optional[str], cwd: str) -> Optional[str]:
+    """Async counterpart of get_patch_id."""
+    if not diff:
+        return None
+    stdout, stderr = await arun_subprocess_command(["git", "patch-id", "--stable"], cwd=cwd, input_text=diff + "\n")
+    if stderr is not None or not stdout:
+        print(f"[WARN] `git patch-id` failed: {stderr}")
+        return None
+    return stdout.split()[0]
+
+def read_working_tree_file(filepath: str, cwd: str) -> Optional[str]:
+    """Reads the 'after' content of a file from the working directory (None if deleted)."""
+    absolute_filepath = os.path.abspath(os.path.join(cwd, filepath))
+    try:
+        if os.path.exists(absolute_filepath) and os.path.isfile(absolute_filepath):
+            with open(absolute_filepath, "r", encoding="utf-8") as f:
+                return f.read()
+        # File exists in git diff list but not on disk (e.g., deleted)
+        print(f"    File not found in working directory (possibly deleted): {absolute_filepath}")
+        return None # Correct state for deleted file
+    except Exception as e:
+         print(f"    Error reading file from working directory {absolute_filepath}: {e}")
+         return f"[ERROR] Could not read file: {e}"
+
+def load_file_context(filepath: str, base_ref: str, cwd: str, strategy: str = "hybrid") -> dict:
+    """Loads before/after content and the diff for one file as a FileContext-compatible dict."""
+    print(f"  Processing: {filepath}")
+    # Pass CWD to helper functions
+    before_content = get_file_content_from_git(base_ref, filepath, cwd=cwd)
+    # --- Reading 'after' content using absolute path derived from CWD ---
+    after_content = read_working_tree_file(filepath, cwd=cwd)
+    file_diff = get_diff_for_file(base_ref, filepath, cwd=cwd)
+    return {
+        "path": filepath, # Keep relative path as key/identifier
+        "before": before_content,
+        "after": after_content,
+        "diff": file_diff,
+        "strategy": strategy,
+        "symbol_definitions": {}, # Initialize for context_agent
+        "call_sites": {},
+        "blob_sha": compute_blob_sha(after_content),
+        "patch_id": get_patch_id(file_diff, cwd=cwd),
+    }
+
+async def aload_file_context(filepath: str, base_ref: str, cwd: str, strategy: str = "hybrid") -> dict:
+    """Async variant of load_file_context; `git show` and `git diff` run concurrently."""
+    print(f"  Processing: {filepath}")
+    before_content, file_diff = await asyncio.gather(
+        aget_file_content_from_git(base_ref, filepath, cwd=cwd),
+        aget_diff_for_file(base_ref, filepath, cwd=cwd),
+    )
+    after_content = read_working_tree_file(filepath, cwd=cwd)
+    return {
+        "path": filepath,
+        "before": before_content,
+        "after": after_content,
+        "diff": file_diff,
+        "strategy": strategy,
+        "symbol_definitions": {},
+        "call_sites": {},
+        "blob_sha": compute_blob_sha(after_content),
+        "patch_id": await aget_patch_id(file_diff, cwd=cwd),
+    }
+
+def resolve_base_ref(cwd: str) -> str:
+    """Merge base with origin/main, falling back to origin/main itself."""
+    base_ref = get_merge_base(cwd=cwd)
+    if not base_ref:
+        print("[ERROR] Cannot prepare context: Failed to determine merge base. Trying origin/main as fallback.")
+        base_ref = "origin/main" # Fallback
+    return base_ref
+
+async def aresolve_base_ref(cwd: str) -> str:
+    """Async variant of resolve_base_ref."""
+    base_ref = await aget_merge_base(cwd=cwd)
+    if not base_ref:
+        print("[ERROR] Cannot prepare context: Failed to determine merge base. Trying origin/main as fallback.")
+        base_ref = "origin/main" # Fallback
+    return base_ref
+
 # --- Main Node Function ---
 def prepare_context(state: dict) -> dict:
     """
@@ -51,53 +179,50 @@ def prepare_context(state: dict) -> dict:
     print(f"[prepare_context] Operating in target directory: {target_repo_dir}")
 
     changed_files: List[str] = state.get("changed_files", [])
-    file_contexts: Dict[str, dict] = {} # Store FileContext info as dicts
 
     if not changed_files:
         print("[prepare_context] No changed files detected.")
         state["file_contexts"] = {}
         return state
 
-    # Determine the base reference using the utility function with CWD
-    base_ref = get_merge_base(cwd=target_repo_dir)
-    if not base_ref:
-        print("[ERROR] Cannot prepare context: Failed to determine merge base. Trying origin/main as fallback.")
-        base_ref = "origin/main" # Fallback
+    # Reuse the base reference resolved by plan_file_reviews when available
+    base_ref = state.get("base_ref") or resolve_base_ref(target_repo_dir)
+    print(f"[prepare_context] Using base reference: {base_ref}")
+
+    strategy = state.get("strategy", "hybrid")
+    state["file_contexts"] = {
+        filepath: load_file_context(filepath, base_ref, target_repo_dir, strategy)
+        for filepath in changed_files
+    }
+    return state
 
+
+async def aprepare_context(state: dict) -> dict:
+    """
+    Async variant of prepare_context. The `git show` / `git diff` calls for
+    all changed files run concurrently as asyncio subprocesses.
+    """
+    print("[prepare_context] Preparing file context and diffs (async)")
+    target_repo_dir = os.getcwd()
+    print(f"[prepare_context] Operating in target directory: {target_repo_dir}")
+
+    changed_files: List[str] = state.get("changed_files", [])
+    if not changed_files:
+        print("[prepare_context] No changed files detected.")
+        state["file_contexts"] = {}
+        return state
+
+    base_ref = state.get("base_ref") or await aresolve_base_ref(target_repo_dir)
     print(f"[prepare_context] Using base reference: {base_ref}")
 
-    for filepath in changed_files:
-        print(f"  Processing: {filepath}")
-        # Pass CWD to helper functions
-        before_content = get_file_content_from_git(base_ref, filepath, cwd=target_repo_dir)
-
-        after_content: Optional[str] = None
-        # --- Reading 'after' content using absolute path derived from CWD ---
-        absolute_filepath = os.path.abspath(os.path.join(target_repo_dir, filepath))
-        try:
-            if os.path.exists(absolute_filepath) and os.path.isfile(absolute_filepath):
-                with open(absolute_filepath, "r", encoding="utf-8") as f:
-                    after_content = f.read()
-            else:
-                 # File exists in git diff list but not on disk (e.g., deleted)
-                 print(f"    File not found in working directory (possibly deleted): {absolute_filepath}")
-                 after_content = None # Correct state for deleted file
-        except Exception as e:
-             print(f"    Error reading file from working directory {absolute_filepath}: {e}")
-             after_content = f"[ERROR] Could not read file: {e}"
-
-        # Pass CWD to helper function
-        file_diff = get_diff_for_file(base_ref, filepath, cwd=target_repo_dir)
-
-        # Create FileContext data as a dictionary
-        file_contexts[filepath] = {
-            "path": filepath, # Keep relative path as key/identifier
-            "before": before_content,
-            "after": after_content,
-            "diff": file_diff,
-            "strategy": state.get("strategy", "hybrid"),
-            "symbol_definitions": {}, # Initialize for context_agent
-        }
-
-    state["file_contexts"] = file_contexts
-    return state
\ No newline at end of file
+    strategy = state.get("strategy", "hybrid")
+    git_semaphore = asyncio.Semaphore(MAX_CONCURRENT_GIT_FILES)
+
+    async def _load(filepath: str) -> dict:
+        async with git_semaphore:
+            return await aload_file_context(filepath, base_ref, target_repo_dir, strategy)
+
+    # gather() keeps results in changed_files order
+    loaded = await asyncio.gather(*(_load(filepath) for filepath in changed_files))
+    state["file_contexts"] = {fc["path"]: fc for fc in loaded}
+    return state
@@ -1,12 +1,14 @@
 # nodes/resolve_context.py
 import os
+import asyncio
 # import subprocess # No longer needed directly
 import requests
+import httpx
 import json
 from typing import Optional, Tuple
 from gitkritik2.core.models import ReviewState # Keep for internal type hints
 # Import the centralized helpers
-from gitkritik2.core.utils import run_subprocess_command, command_exists
+from gitkritik2.core.utils import run_subprocess_command, command_exists, arun_subprocess_command
 
 # --- Remove local _run_command helper ---
 
@@ -217,4 +219,154 @@ def resolve_context(state: dict) -> dict:
              state['pr_number'] = None
 
     # ... (Final log) ...
-    return state
\ No newline at end of file
+    return state
+
+
+# --- Async variants (used by the async review graph) ---
+
+async def aget_remote_url(remote_name: str = "origin", cwd: str = None) -> Optional[str]:
+    """Async counterpart of get_remote_url."""
+    stdout, stderr = await arun_subprocess_command(["git", "remote", "get-url", remote_name], cwd=cwd)
+    if stderr:
+        print(f"[resolve_context][WARN] Failed to get remote URL for '{remote_name}': {stderr}")
+        return None
+    return stdout
+
+async def aget_current_branch(cwd: str = None) -> Optional[str]:
+    """Async counterpart of get_current_branch."""
+    stdout, stderr = await arun_subprocess_command(["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=cwd)
+    if stdout == "HEAD":
+        print("[resolve_context][WARN] Git is in a detached HEAD state. Cannot determine branch name.")
+        return None
+    if stderr:
+        print(f"[resolve_context][WARN] Failed to get current branch: {stderr}")
+        return None
+    return stdout
+
+async def aget_github_pr_number_via_api(repo_slug: str, branch: str) -> Optional[str]:
+    """Async counterpart of get_github_pr_number_via_api using httpx."""
+    print(f"[resolve_context] Trying GitHub API for branch '{branch}' in repo '{repo_slug}'...")
+    token = os.getenv("GITHUB_TOKEN")
+    if not token:
+        print("[resolve_context][WARN] GITHUB_TOKEN not set. Cannot query API.")
+        return None
+
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github.v3+json",
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+    owner = repo_slug.split('/')[0]
+    url = f"https://api.github.com/repos/{repo_slug}/pulls"
+    params = {"head": f"{owner}:{branch}", "state": "open"}
+
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(url, headers=headers, params=params)
+            response.raise_for_status()
+        pulls = response.json()
+        if pulls and isinstance(pulls, list):
+            found_pr_number = str(pulls[0]["number"])
+            print(f"[resolve_context] Found PR #{found_pr_number} via GitHub API.")
+            return found_pr_number
+        print(f"[resolve_context] No open PR found for branch '{branch}' via API.")
+        return None
+    except httpx.HTTPStatusError as e:
+        print(f"[resolve_context][WARN] GitHub API call failed: {e}")
+        print(f"Response: {e.response.status_code} {e.response.text}")
+        return None
+    except httpx.HTTPError as e:
+        print(f"[resolve_context][WARN] GitHub API call failed: {e}")
+        return None
+    except Exception as e: # Catch JSONDecodeError etc.
+        print(f"[resolve_context][WARN] Error processing GitHub API response: {e}")
+        return None
+
+async def aget_github_pr_number_via_gh_cli(branch: str, cwd: str = None) -> Optional[str]:
+    """Async counterpart of get_github_pr_number_via_gh_cli."""
+    print(f"[resolve_context] Trying GitHub CLI ('gh') to find PR for branch '{branch}'...")
+    command = ["gh", "pr", "list", "--head", branch, "--limit", "1", "--json", "number", "--jq", ".[0].number"]
+    stdout, stderr = await arun_subprocess_command(command, cwd=cwd)
+
+    if stdout is None:
+         # Command not found or could not be started
+         print("[resolve_context][WARN] 'gh' command not found or not executable. Skipping CLI check.")
+         return None
+    if stderr is not None:
+         no_pr_msgs = ["no pull requests found", "no open pull request found"]
+         if not any(msg in stderr.lower() for msg in no_pr_msgs):
+              print(f"[resolve_context][WARN] 'gh pr list' command failed or produced stderr: {stderr}")
+         else:
+             print(f"[resolve_context] No open PR found for branch '{branch}' via GitHub CLI.")
+         return None
+
+    pr_number = stdout.strip()
+    if pr_number.isdigit():
+         print(f"[resolve_context] Found PR #{pr_number} via GitHub CLI.")
+         return pr_number
+    print(f"[resolve_context] No PR number returned by GitHub CLI.")
+    return None
+
+async def aget_gitlab_mr_number(repo_slug: str, branch: str) -> Optional[str]:
+    """Fetches the open MR IID for a branch from the GitLab API using httpx."""
+    token = os.getenv("GITLAB_TOKEN") or os.getenv("CI_JOB_TOKEN")
+    if not token:
+        print("[resolve_context][WARN] GITLAB_TOKEN/CI_JOB_TOKEN not set. Cannot query API.")
+        return None
+    encoded_repo = requests.utils.quote(repo_slug, safe="")
+    url = f"https://gitlab.com/api/v4/projects/{encoded_repo}/merge_requests"
+    params = {"source_branch": branch, "state": "opened"}
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(url, headers={"PRIVATE-TOKEN": token}, params=params)
+            response.raise_for_status()
+        merge_requests = response.json()
+        if merge_requests and isinstance(merge_requests, list):
+            return str(merge_requests[0]["iid"])
+        print(f"[resolve_context] No open MR found for branch '{branch}' via API.")
+        return None
+    except Exception as e:
+        print(f"[resolve_context][WARN] GitLab API call failed: {e}")
+        return None
+
+
+async def aresolve_context(state: dict) -> dict:
+    """Async variant of resolve_context; remote and branch lookups run concurrently."""
+    print("[resolve_context] Resolving platform, repo, and PR/MR context (async)...")
+    target_repo_dir = os.getcwd()
+    print(f"[resolve_context] Operating in target directory: {target_repo_dir}")
+
+    is_ci = state.get("is_ci_mode", False)
+    platform = state.get("platform")
+    repo = state.get("repo")
+    pr_number = state.get("pr_number")
+
+    remote_url, branch = await asyncio.gather(
+        aget_remote_url(cwd=target_repo_dir),
+        aget_current_branch(cwd=target_repo_dir),
+    )
+    detected_platform, detected_repo = detect_platform_and_repo(remote_url)
+
+    if detected_platform and detected_repo:
+        print(f"[resolve_context] Detected via Git: Platform='{detected_platform}', Repo='{detected_repo}'")
+        state['platform'] = detected_platform
+        state['repo'] = detected_repo
+        platform = detected_platform
+        repo = detected_repo
+
+    if not pr_number:
+        if branch and repo:
+            print(f"[resolve_context] Current branch: '{branch}'. Attempting to find associated PR/MR...")
+            if platform == "github":
+                if not is_ci:
+                     pr_number = await aget_github_pr_number_via_gh_cli(branch, cwd=target_repo_dir)
+                if not pr_number:
+                     pr_number = await aget_github_pr_number_via_api(repo, branch)
+            elif platform == "gitlab":
+                pr_number = await aget_gitlab_mr_number(repo, branch)
+            state['pr_number'] = pr_number if pr_number else None
+        else:
+             print("[resolve_context] Cannot fetch PR/MR number without current branch or repo slug.")
+             state['pr_number'] = None
+
+    return state
@@ -0,0 +1,152 @@
+# nodes/review_file.py
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from gitkritik2.core.models import FileContext, Comment, ReviewState
+from gitkritik2.core.llm_interface import get_llm
+from gitkritik2.core.utils import ensure_review_state
+from gitkritik2.core.review_cache import get_review_cache
+from gitkritik2.core.model_limits import prompt_token_budget
+from gitkritik2.core.telemetry import LLMTelemetryHandler, telemetry_config
+from gitkritik2.core.prompts import PROMPT_CACHE_MIN_TOKENS, PROMPT_CACHE_PROVIDERS, shared_prefix_tokens
+from gitkritik2.nodes.prepare_context import load_file_context, aload_file_context, resolve_base_ref, aresolve_base_ref
+from gitkritik2.nodes.agents.context_agent import (
+    gather_single_file_context, agather_single_file_context, gather_call_sites, agather_call_sites, project_symbol_index,
+)
+from gitkritik2.core.tools import find_project_root
+from gitkritik2.nodes.agents.bug_agent import review_single_file as review_bugs, areview_single_file as areview_bugs
+from gitkritik2.nodes.agents.design_agent import review_single_file as review_design, areview_single_file as areview_design
+from gitkritik2.nodes.agents.style_agent import review_single_file as review_style, areview_single_file as areview_style
+from gitkritik2.nodes.agents.combined_agent import review_single_file as review_combined, areview_single_file as areview_combined
+
+# (sync, async) per-file reviewers for each review_mode
+SEPARATE_REVIEWERS = [(review_bugs, areview_bugs), (review_design, areview_design), (review_style, areview_style)]
+COMBINED_REVIEWERS = [(review_combined, areview_combined)]
+
+
+def _reviewers_for(review_mode: Optional[str]) -> list:
+    return COMBINED_REVIEWERS if review_mode == "combined" else SEPARATE_REVIEWERS
+
+
+def _warm_prompt_cache_first(_state: ReviewState, filepath: str, context: FileContext, reviewers: list) -> bool:
+    """
+    Whether to run the first reviewer before the others: its call puts the file's shared
+    prompt prefix into the provider's cache, which calls started at the same time would miss.
+    """
+    return (len(reviewers) > 1 and _state.prompt_caching and _state.llm_provider in PROMPT_CACHE_PROVIDERS
+            and shared_prefix_tokens(filepath, context.diff or "", context.after or "") >= PROMPT_CACHE_MIN_TOKENS)
+
+
+def _file_update(filepath: str, file_context: dict, comments_by_agent: Dict[str, List[Comment]],
+                 error: Optional[str] = None, telemetry: Optional[LLMTelemetryHandler] = None) -> dict:
+    """State update for one file: its context, one entry in file_review_results and its LLM call telemetry."""
+    return {
+        "llm_calls": telemetry.records if telemetry else {},
+        "file_contexts": {filepath: file_context},
+        "file_review_results": {
+            filepath: {
+                "comments": {
+                    agent_name: [c.model_dump() for c in comments]
+                    for agent_name, comments in comments_by_agent.items()
+                },
+                "error": error,
+            }
+        },
+    }
+
+
+def review_file(state: dict) -> dict:
+    """
+    Per-file sub-pipeline, dispatched once per changed file via Send:
+    load git data -> gather symbol context -> run review agents -> filter to the diff.
+    Each file reaches the LLM as soon as its own git data is loaded.
+    """
+    filepath: str = state["review_filepath"]
+    print(f"[review_file] Reviewing {filepath}")
+    _state = ensure_review_state(state)
+    target_repo_dir = os.getcwd()
+    base_ref = state.get("base_ref") or resolve_base_ref(target_repo_dir)
+
+    file_context = load_file_context(filepath, base_ref, target_repo_dir, _state.strategy or "hybrid")
+
+    llm = get_llm(_state)
+    if not llm:
+        print(f"[review_file] LLM not available, skipping review of {filepath}.")
+        return _file_update(filepath, file_context, {}, error="LLM not available")
+
+    review_cache = get_review_cache(_state)
+    token_budget = prompt_token_budget(_state)
+    telemetry = LLMTelemetryHandler(_state)
+    config = telemetry_config(telemetry, file=filepath)
+    project_root = find_project_root(target_repo_dir)
+    index = project_symbol_index(_state, project_root)
+    loaded = FileContext(**file_context)
+    definitions = gather_single_file_context(filepath, loaded, project_root, index)
+    if definitions:
+        file_context["symbol_definitions"] = definitions
+    sites = gather_call_sites(filepath, loaded, index, _state.call_sites_max_tokens)
+    if sites:
+        file_context["call_sites"] = sites
+    context = FileContext(**file_context)
+
+    # Review agents for one file are independent, run them side by side
+    reviewers = _reviewers_for(_state.review_mode)
+    run = lambda reviewer: reviewer[0](llm, filepath, context, review_cache, token_budget, config)
+    outputs = []
+    if _warm_prompt_cache_first(_state, filepath, context, reviewers):
+        outputs.append(run(reviewers[0]))
+        reviewers = reviewers[1:]
+    with ThreadPoolExecutor(max_workers=len(reviewers)) as pool:
+        outputs.extend(pool.map(run, reviewers))
+
+    comments_by_agent: Dict[str, List[Comment]] = {}
+    for output in outputs:
+        comments_by_agent.update(output)
+    return _file_update(filepath, file_context, comments_by_agent, telemetry=telemetry)
+
+
+async def areview_file(state: dict) -> dict:
+    """Async variant of review_file (asyncio git subprocesses, ainvoke on agents)."""
+    filepath: str = state["review_filepath"]
+    print(f"[review_file] Reviewing {filepath} (async)")
+    _state = ensure_review_state(state)
+    target_repo_dir = os.getcwd()
+    base_ref = state.get("base_ref") or await aresolve_base_ref(target_repo_dir)
+
+    file_context = await aload_file_context(filepath, base_ref, target_repo_dir, _state.strategy or "hybrid")
+
+    llm = get_llm(_state)
+    if not llm:
+        print(f"[review_file] LLM not available, skipping review of {filepath}.")
+        return _file_update(filepath, file_context, {}, error="LLM not available")
+
+    review_cache = get_review_cache(_state)
+    token_budget = prompt_token_budget(_state)
+    telemetry = LLMTelemetryHandler(_state)
+    config = telemetry_config(telemetry, file=filepath)
+    project_root = find_project_root(target_repo_dir)
+    index = await asyncio.to_thread(project_symbol_index, _state, project_root)
+    loaded = FileContext(**file_context)
+    definitions, sites = await asyncio.gather(
+        agather_single_file_context(filepath, loaded, project_root, index),
+        agather_call_sites(filepath, loaded, index, _state.call_sites_max_tokens),
+    )
+    if definitions:
+        file_context["symbol_definitions"] = definitions
+    if sites:
+        file_context["call_sites"] = sites
+    context = FileContext(**file_context)
+
+    reviewers = _reviewers_for(_state.review_mode)
+    outputs = []
+    if _warm_prompt_cache_first(_state, filepath, context, reviewers):
+        outputs.append(await reviewers[0][1](llm, filepath, context, review_cache, token_budget, config))
+        reviewers = reviewers[1:]
+    outputs.extend(await asyncio.gather(*(reviewer[1](llm, filepath, context, review_cache, token_budget, config) for reviewer in reviewers)))
+
+    comments_by_agent: Dict[str, List[Comment]] = {}
+    for output in outputs:
+        comments_by_agent.update(output)
+    return _file_update(filepath, file_context, comments_by_agent, telemetry=telemetry)
@@ -1,6 +1,7 @@
 # platform/github.py
 import os
 import requests
+import httpx
 from typing import List
 from gitkritik2.core.models import ReviewState, Comment # Ensure Comment is imported
 
@@ -116,4 +117,91 @@ def post_inline_comment_github(state: ReviewState): # Takes ReviewState now
     except requests.exceptions.RequestException as e:
         print(f"[GitHub] Failed to post review with inline comments: {e}")
         if hasattr(e, 'response') and e.response is not None:
-            print(f"Response: {e.response.status_code} {e.response.text}")
\ No newline at end of file
+            print(f"Response: {e.response.status_code} {e.response.text}")
+
+
+# --- Async variants (httpx), used by the async review graph ---
+
+async def apost_summary_comment_github(state: ReviewState):
+    """Async counterpart of post_summary_comment_github."""
+    print("[GitHub] Posting summary comment to Conversation tab")
+    if not state.repo or not state.pr_number or not state.summary_review:
+        print("[GitHub] Missing repo, PR number, or summary content in state. Skipping.")
+        return
+
+    headers = _get_github_auth_headers()
+    if not headers: return
+
+    url = f"{GITHUB_API}/repos/{state.repo}/issues/{state.pr_number}/comments"
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(url, headers=headers, json={"body": state.summary_review})
+            response.raise_for_status()
+        print("[GitHub] Summary comment posted successfully.")
+    except httpx.HTTPStatusError as e:
+        print(f"[GitHub] Failed to post summary comment: {e}")
+        print(f"Response: {e.response.status_code} {e.response.text}")
+    except httpx.HTTPError as e:
+        print(f"[GitHub] Failed to post summary comment: {e}")
+
+
+async def apost_inline_comment_github(state: ReviewState):
+    """Async counterpart of post_inline_comment_github (single Review API submission)."""
+    print("[GitHub] Posting inline comments via Review API")
+    if not state.repo or not state.pr_number or not state.inline_comments:
+        print("[GitHub] Missing repo, PR number, or inline comments in state. Skipping.")
+        return
+
+    headers = _get_github_auth_headers()
+    if not headers: return
+
+    review_comments = []
+    for comment_obj in state.inline_comments:
+         if hasattr(comment_obj, 'platform_body') and comment_obj.platform_body and comment_obj.file and comment_obj.line is not None:
+            review_comments.append({
+                "path": comment_obj.file,
+                "line": comment_obj.line,
+                "body": comment_obj.platform_body,
+            })
+         else:
+              print(f"[WARN] Skipping invalid comment object for GitHub review: {comment_obj}")
+
+    if not review_comments:
+         print("[GitHub] No valid comments formatted for review submission.")
+         return
+
+    pr_url = f"{GITHUB_API}/repos/{state.repo}/pulls/{state.pr_number}"
+    review_url = f"{pr_url}/reviews"
+    async with httpx.AsyncClient(timeout=60) as client:
+        try:
+            print(f"[GitHub] Fetching PR details from: {pr_url}")
+            pr_response = await client.get(pr_url, headers=headers, timeout=15)
+            pr_response.raise_for_status()
+            commit_id = pr_response.json().get("head", {}).get("sha")
+            if not commit_id:
+                 print(f"[GitHub] Error: Could not retrieve HEAD commit SHA for PR #{state.pr_number}.")
+                 return
+            print(f"[GitHub] Found HEAD commit SHA: {commit_id}")
+        except httpx.HTTPStatusError as e:
+            print(f"[GitHub] Error fetching PR details: {e}")
+            print(f"Response: {e.response.status_code} {e.response.text}")
+            return
+        except Exception as e:
+            print(f"[GitHub] Error processing PR details response: {e}")
+            return
+
+        payload = {
+            "commit_id": commit_id,
+            "event": "COMMENT", # Post comments without changing PR state
+            "comments": review_comments,
+        }
+        try:
+            print(f"[GitHub] Posting review with {len(review_comments)} comments to: {review_url}")
+            response = await client.post(review_url, headers=headers, json=payload)
+            response.raise_for_status()
+            print(f"[GitHub] Successfully posted review.")
+        except httpx.HTTPStatusError as e:
+            print(f"[GitHub] Failed to post review with inline comments: {e}")
+            print(f"Response: {e.response.status_code} {e.response.text}")
+        except httpx.HTTPError as e:
+            print(f"[GitHub] Failed to post review with inline comments: {e}")
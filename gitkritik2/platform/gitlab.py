@@ -1,8 +1,10 @@
 # platform/gitlab.py
 
 import os
+import asyncio
 import requests
-from gitkritik2.core.models import Settings
+import httpx
+from gitkritik2.core.models import Settings, ReviewState
 
 GITLAB_API = "https://gitlab.com/api/v4"
 
@@ -57,3 +59,72 @@ def post_inline_comment_gitlab(config: Settings, comments: list[dict]):
             print(f"[GitLab] Failed to post inline comment: {response.status_code} {response.text}")
 
 
+# --- Async variants (httpx), used by the async review graph ---
+
+def _get_gitlab_headers() -> dict | None:
+    token = os.getenv("GITLAB_TOKEN") or os.getenv("CI_JOB_TOKEN")
+    if not token:
+        print("[GitLab] Error: GITLAB_TOKEN or CI_JOB_TOKEN environment variable not set.")
+        return None
+    return {
+        "PRIVATE-TOKEN": token,
+        "Content-Type": "application/json"
+    }
+
+async def apost_summary_comment_gitlab(state: ReviewState):
+    """Posts the summary comment to the GitLab MR (Overview tab) using httpx."""
+    print("[GitLab] Posting summary comment to Overview tab")
+    if not state.repo or not state.pr_number or not state.summary_review:
+        print("[GitLab] Missing repo, MR number, or summary content in state. Skipping.")
+        return
+
+    headers = _get_gitlab_headers()
+    if not headers: return
+
+    url = f"{GITLAB_API}/projects/{requests.utils.quote(state.repo, safe='')}/merge_requests/{state.pr_number}/notes"
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(url, headers=headers, json={"body": state.summary_review})
+    except httpx.HTTPError as e:
+        print(f"[GitLab] Failed to post summary: {e}")
+        return
+    if response.status_code == 201:
+        print("[GitLab] Summary comment posted")
+    else:
+        print(f"[GitLab] Failed to post summary: {response.status_code} {response.text}")
+
+async def apost_inline_comment_gitlab(state: ReviewState):
+    """
+    Posts inline comments to the Changes tab using discussions (one per comment).
+    Discussions are independent, so they are posted concurrently over one client.
+    """
+    print("[GitLab] Posting inline comments to Changes tab")
+    if not state.repo or not state.pr_number or not state.inline_comments:
+        print("[GitLab] Missing repo, MR number, or inline comments in state. Skipping.")
+        return
+
+    url = f"{GITLAB_API}/projects/{requests.utils.quote(state.repo, safe='')}/merge_requests/{state.pr_number}/discussions"
+    headers = _get_gitlab_headers()
+    if not headers: return
+
+    async def _post(client: httpx.AsyncClient, comment) -> None:
+        body = getattr(comment, "platform_body", None) or comment.message
+        payload = {
+            "body": body,
+            "position": {
+                "position_type": "text",
+                "new_path": comment.file,
+                "new_line": comment.line
+            }
+        }
+        response = await client.post(url, headers=headers, json=payload)
+        if response.status_code == 201:
+            print(f"[GitLab] Inline comment posted on {comment.file}:{comment.line}")
+        else:
+            print(f"[GitLab] Failed to post inline comment: {response.status_code} {response.text}")
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        results = await asyncio.gather(*(_post(client, c) for c in state.inline_comments), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"[GitLab] Failed to post inline comment: {result}")
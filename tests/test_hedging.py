@@ -0,0 +1,68 @@
+# tests/test_hedging.py
+import time
+import asyncio
+import threading
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from gitkritik2.core.hedging import hedged_chain
+from gitkritik2.core.llm_cache import CachedChatModel, ResponseCache
+from gitkritik2.core.llm_interface import _setup_hedging
+from gitkritik2.core.models import ReviewState
+
+SLOW_CALL_S = 2.0
+HEDGE_DELAY_S = 0.1
+_calls_lock = threading.Lock()
+
+
+class SlowFirstCallModel(BaseChatModel):
+    """Answers after SLOW_CALL_S on its first call and right away afterwards; counts calls."""
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-first-call"
+
+    def _next_delay(self) -> float:
+        with _calls_lock:
+            self.calls += 1
+            return SLOW_CALL_S if self.calls == 1 else 0.0
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer {self.calls}"))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._next_delay())
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._next_delay())
+        return self._result()
+
+
+def _hedged_cached_model(tmp_path):
+    provider = SlowFirstCallModel()
+    llm = CachedChatModel(inner=provider, response_cache=ResponseCache(str(tmp_path / "cache.sqlite")), namespace="test")
+    state = ReviewState(llm_provider="test-hedging", model="slow", hedging={
+        "enabled": True, "initial_delay_s": HEDGE_DELAY_S, "min_delay_s": HEDGE_DELAY_S,
+    })
+    _setup_hedging(state, llm)
+    return provider, hedged_chain(llm, lambda model: model)
+
+
+def test_hedge_bypasses_response_cache_in_flight_sharing(tmp_path):
+    provider, chain = _hedged_cached_model(tmp_path)
+    started = time.monotonic()
+    chain.invoke([HumanMessage(content="review this")])
+    assert time.monotonic() - started < SLOW_CALL_S / 2
+    assert provider.calls == 2
+
+
+def test_async_hedge_bypasses_response_cache_in_flight_sharing(tmp_path):
+    provider, chain = _hedged_cached_model(tmp_path)
+    started = time.monotonic()
+    asyncio.run(chain.ainvoke([HumanMessage(content="review this")]))
+    assert time.monotonic() - started < SLOW_CALL_S / 2
+    assert provider.calls == 2
@@ -0,0 +1,55 @@
+# tests/test_rate_limit.py
+import pytest
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from gitkritik2.core.rate_limit import ProviderScheduler
+
+TPM = 40_000
+ESTIMATED = 30_000
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _scheduler() -> ProviderScheduler:
+    return ProviderScheduler("test", tpm=TPM, max_retries=0, breaker_threshold=1)
+
+
+def _chunks(fail_after: int):
+    for i in range(fail_after):
+        yield ChatGenerationChunk(message=AIMessageChunk(content=f"part {i} "))
+    raise StatusError(503)
+
+
+def test_non_retryable_failure_refunds_tokens():
+    scheduler = _scheduler()
+
+    def fail():
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        scheduler.call(fail, ESTIMATED)
+    assert scheduler.tokens._level > TPM - 100
+    assert not scheduler.breaker.is_open
+
+
+def test_mid_stream_failure_refunds_tokens_and_counts_failure():
+    scheduler = _scheduler()
+    with pytest.raises(StatusError):
+        for _ in scheduler.stream(lambda: _chunks(2), ESTIMATED):
+            pass
+    assert scheduler.tokens._level > TPM - 100
+    assert scheduler.breaker.is_open
+
+
+def test_abandoned_stream_refunds_tokens_without_counting_failure():
+    scheduler = _scheduler()
+    stream = scheduler.stream(lambda: _chunks(5), ESTIMATED)
+    next(stream)
+    stream.close()
+    assert scheduler.tokens._level > TPM - 100
+    assert not scheduler.breaker.is_open